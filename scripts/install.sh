@@ -14,7 +14,14 @@ backup_then_link () {
   local dst="$2"
   mkdir -p "$(dirname "$dst")"
   if [[ -e "$dst" || -L "$dst" ]]; then
-    mv "$dst" "${dst}.bak.${TS}"
+    # Same-directory rename (O(1)); never move into an existing backup from this second.
+    local bak="${dst}.bak.${TS}"
+    local n=1
+    while [[ -e "$bak" || -L "$bak" ]]; do
+      bak="${dst}.bak.${TS}.${n}"
+      n=$((n + 1))
+    done
+    mv "$dst" "$bak"
   fi
 
   # Prefer symlinks (source-of-truth), but fallback to copying when symlinks
@@ -26,12 +33,18 @@ backup_then_link () {
 
   echo "warn: failed to symlink; copying instead: $dst <- $src" >&2
 
+  # Copy into a hidden sibling first, then rename into place, so $dst is never
+  # left half-copied.
+  local staging
+  staging="$(dirname "$dst")/.$(basename "$dst").staging.$$"
+  rm -rf "$staging"
   if [[ -d "$src" ]]; then
     # Portable fallback: avoid GNU-only flags.
-    cp -R "$src" "$dst"
+    cp -R "$src" "$staging"
   else
-    cp "$src" "$dst"
+    cp "$src" "$staging"
   fi
+  mv "$staging" "$dst"
   echo "copied: $dst <- $src"
 }
 
@@ -72,17 +85,58 @@ install_external_skills_global () {
 
   mkdir -p "$dest_dir"
 
+  # Expanded as ${profile[@]+...}: bash < 4.4 treats an empty array as unbound under set -u.
+  local profile=()
+  if [[ -n "${AGENT_PACK_SKILL_PROFILE:-}" ]]; then
+    profile=(--profile "$AGENT_PACK_SKILL_PROFILE/global.trace.json")
+  fi
+
   echo "external-skills: installing globally from $lock ..."
   python3 "$ROOT/scripts/skills_install.py" \
     --project-sources "$sources" \
     --project-lock "$lock" \
     --dest "$dest_dir" \
+    ${profile[@]+"${profile[@]}"} \
     || {
       echo "external-skills: install failed; skipping"
       return 0
     }
 }
 
+# Optional: project skills for every project under the directories listed in
+# AGENT_PACK_SKILL_WORKSPACES (colon-separated), in one workspace install.
+install_external_skills_workspaces () {
+  local workspaces="${AGENT_PACK_SKILL_WORKSPACES:-}"
+  if [[ -z "$workspaces" ]]; then
+    return 0
+  fi
+  if ! command -v python3 >/dev/null 2>&1; then
+    echo "external-skills: python3 not found; skipping workspaces"
+    return 0
+  fi
+
+  local args=()
+  local dirs=()
+  local dir
+  IFS=':' read -r -a dirs <<< "$workspaces"
+  for dir in "${dirs[@]}"; do
+    [[ -n "$dir" ]] && args+=(--workspace "$dir")
+  done
+  if [[ ${#args[@]} -eq 0 ]]; then
+    return 0
+  fi
+  if [[ -n "${AGENT_PACK_SKILL_PROFILE:-}" ]]; then
+    args+=(--profile "$AGENT_PACK_SKILL_PROFILE/workspaces.trace.json")
+  fi
+
+  echo "external-skills: installing project skills under $workspaces ..."
+  python3 "$ROOT/scripts/skills_install.py" "${args[@]}" \
+    || {
+      echo "external-skills: workspace install failed; skipping"
+      return 0
+    }
+}
+
 install_superpowers_opencode () {
   local config_dir="$HOME/.config/opencode"
   local sp_dir="$config_dir/superpowers"
@@ -197,6 +251,13 @@ backup_then_link "$ROOT/skill-sources" "$HOME/.config/opencode/skill-sources"
 # - Installs into ~/.config/opencode/skills/
 install_external_skills_global
 
+# 1-3-2) External skills (projects, optional)
+# - Set AGENT_PACK_SKILL_WORKSPACES=/path/to/dir[:/other/dir] to install each project's
+#   .opencode/skills.lock.json into its .opencode/skills
+# - Set AGENT_PACK_SKILL_PROFILE=/path/to/dir to write per-phase timing traces
+#   (global.trace.json, workspaces.trace.json) there
+install_external_skills_workspaces
+
 # 1-4) Superpowers (OpenCode plugin + skills)
 # - Pinned to a commit and verified by sha256 for bootstrap components.
 install_superpowers_opencode
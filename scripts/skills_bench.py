@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import skills_install
+from skills_common import merkle_root, sha256_tree, sha256_tree_files
+from skills_scan import scan_skill_dir, scan_skill_files
+from skills_validate import validate
+
+
+class BenchError(Exception):
+    pass
+
+
+def _repeat_to(unit: str, size: int, *, sep: str = "") -> str:
+    n = max(1, size // (len(unit) + len(sep)))
+    return sep.join([unit] * n)
+
+
+# Adversarial scanner inputs: each builds about `size` characters of text that defeats
+# naive regex evaluation (long lines full of partial rule matches, none completing).
+_SCAN_CASES: dict[str, Callable[[int], str]] = {
+    # secrets-in-plaintext: every "save" and "token" starts a chain, no "plaintext".
+    "secrets-chain": lambda size: _repeat_to("save the token ", size),
+    # print-secrets: trigger words with no secret word after them.
+    "print-chain": lambda size: _repeat_to("print echo output show ", size),
+    # pipe-to-shell: "curl" then pipes followed by long whitespace runs, no shell.
+    "pipe-whitespace": lambda size: "curl " + _repeat_to("|" + " " * 64, size) + "x",
+    # One-line minified JS/JSON with rule keywords sprinkled everywhere.
+    "minified-js": lambda size: _repeat_to(
+        'var a=save(b),c=store.token||{};print(c.secret);curl.get("x|"+show);', size
+    ),
+    # Many prefilter hits that never complete a rule.
+    "prefix-hits": lambda size: _repeat_to("nc rm ~/x sudoer .environ leaks ", size),
+    # rm followed by a huge whitespace run and no -rf.
+    "rm-whitespace": lambda size: "rm" + " " * size + "rf",
+    # The same content split into many short lines.
+    "many-lines": lambda size: _repeat_to("save the token and print it | then", size, sep="\n"),
+}
+
+
+def _bench_scan(*, cases: list[str], size: int, repeat: int) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for name in cases:
+        data = _SCAN_CASES[name](size).encode("utf-8")
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scan_skill_files(files=[("bench.js", data)], allowlist_domains=set())
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+    return results
+
+
+# --- Suite: synthetic skill repos, end-to-end timings, baseline comparison ---------
+
+# Skill repos are published as https://github.com/bench/<repo>.git; during the suite
+# git rewrites that prefix to the local bare repos (url.<base>.insteadOf), so the
+# installer's own _ensure_repo/fetch path runs unchanged over file://, with no network.
+_BENCH_OWNER = "bench"
+_BENCH_URL = f"https://github.com/{_BENCH_OWNER}/"
+_CORPUS_MARKER = "corpus.json"
+_BASELINE_VERSION = 1
+
+# Fixed identity and dates: the same shape always builds the same commits and digests.
+_GIT_BUILD_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.invalid",
+    "GIT_AUTHOR_DATE": "2000-01-01T00:00:00+0000",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.invalid",
+    "GIT_COMMITTER_DATE": "2000-01-01T00:00:00+0000",
+}
+
+# Filler text; none of it comes near a scanner rule.
+_WORDS = (
+    "agent", "apply", "branch", "check", "context", "diff", "edit", "example", "file", "format",
+    "guide", "layout", "lint", "module", "note", "option", "output", "pattern", "review", "run",
+    "section", "step", "style", "summary", "table", "task", "test", "tree", "update", "workflow",
+)
+
+
+@dataclass(frozen=True)
+class CorpusShape:
+    repos: int = 2
+    skills: int = 24
+    files_per_skill: int = 24
+    max_depth: int = 10
+    huge_files: int = 2
+    huge_mb: float = 16.0
+    adversarial_kb: int = 256
+    seed: int = 1
+
+
+@dataclass(frozen=True)
+class Corpus:
+    root: Path
+    shape: CorpusShape
+    skill_dirs: tuple[Path, ...]  # every committed skill tree, in the source worktrees
+    bytes: int  # of all skill_dirs
+    locked_bytes: int  # of the skills in the lock (all but bench-adversarial)
+
+    @property
+    def repos_dir(self) -> Path:
+        return self.root / "repos"
+
+    @property
+    def sources_path(self) -> Path:
+        return self.root / "skill-sources.json"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.root / "skills.lock.json"
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    seconds: float  # best of the repeats
+    bytes: int  # processed per run; 0 when throughput is not meaningful
+
+
+def _git(args: list[str], *, cwd: Path) -> str:
+    p = subprocess.run(
+        ["git", *args], cwd=str(cwd), env={**os.environ, **_GIT_BUILD_ENV}, text=True, capture_output=True
+    )
+    if p.returncode != 0:
+        raise BenchError(f"git {' '.join(args)} failed: {p.stderr.strip()}")
+    return p.stdout
+
+
+def _words(rng: random.Random, size: int) -> str:
+    out: list[str] = []
+    n = 0
+    while n < size:
+        line = " ".join(rng.choices(_WORDS, k=rng.randint(4, 14))) + ".\n"
+        out.append(line)
+        n += len(line)
+    return "".join(out)
+
+
+def _huge_text(rng: random.Random, size: int) -> str:
+    # Incompressible text lines (hex), so fetch and hashing see the full size.
+    data = rng.randbytes(size // 2).hex()
+    return "\n".join(data[i : i + 128] for i in range(0, len(data), 128)) + "\n"
+
+
+def _write_skill(root: Path, *, name: str, index: int, shape: CorpusShape, rng: random.Random) -> None:
+    root.mkdir(parents=True)
+    (root / "SKILL.md").write_text(
+        f"---\nname: {name}\ndescription: Synthetic benchmark skill {index}.\n---\n\n{_words(rng, 2048)}",
+        encoding="utf-8",
+    )
+    for k in range(shape.files_per_skill - 1):
+        depth = rng.randint(0, shape.max_depth)
+        parent = root.joinpath(*[f"d{level}" for level in range(depth)])
+        parent.mkdir(parents=True, exist_ok=True)
+        (parent / f"note-{k:03d}.md").write_text(_words(rng, rng.randint(200, 4096)), encoding="utf-8")
+    if index < shape.huge_files:
+        (root / "assets").mkdir(exist_ok=True)
+        (root / "assets" / "huge.txt").write_text(_huge_text(rng, int(shape.huge_mb * 2**20)), encoding="utf-8")
+
+
+def _write_adversarial_skill(root: Path, *, shape: CorpusShape) -> None:
+    root.mkdir(parents=True)
+    (root / "SKILL.md").write_text(
+        "---\nname: bench-adversarial\ndescription: Worst-case inputs for the scanner rules.\n---\n",
+        encoding="utf-8",
+    )
+    for case, build in sorted(_SCAN_CASES.items()):
+        (root / f"{case}.md").write_text(build(shape.adversarial_kb * 1024), encoding="utf-8")
+
+
+def _load_corpus(root: Path, shape: CorpusShape) -> Optional[Corpus]:
+    try:
+        obj = json.loads((root / _CORPUS_MARKER).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(obj, dict) or obj.get("shape") != asdict(shape):
+        return None
+    try:
+        return Corpus(
+            root=root,
+            shape=shape,
+            skill_dirs=tuple(root / rel for rel in obj["skills"]),
+            bytes=int(obj["bytes"]),
+            locked_bytes=int(obj["lockedBytes"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def build_corpus(root: Path, shape: CorpusShape) -> Corpus:
+    """Build (or reuse, if built with the same shape) the synthetic repos under root.
+
+    Skills `bench-000`... are spread round-robin over `shape.repos` repos as
+    `skills/<name>/`: a SKILL.md plus small text files at random depths, the first
+    `huge_files` skills each with one huge file, and one `bench-adversarial` skill with
+    the scanner's adversarial inputs. Writes a v2 lock and a sources manifest for them;
+    bench-adversarial is left out of the lock (some inputs are real findings, which the
+    installer would refuse) and only hashed and scanned.
+    """
+
+    corpus = _load_corpus(root, shape)
+    if corpus is not None:
+        return corpus
+    if root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(shape.seed)
+    names: dict[str, list[str]] = {f"skills-{r}": [] for r in range(shape.repos)}
+    for i in range(shape.skills):
+        repo = f"skills-{i % shape.repos}"
+        name = f"bench-{i:03d}"
+        _write_skill(root / "src" / repo / "skills" / name, name=name, index=i, shape=shape, rng=rng)
+        names[repo].append(name)
+    _write_adversarial_skill(root / "src" / "skills-0" / "skills" / "bench-adversarial", shape=shape)
+    names["skills-0"].append("bench-adversarial")
+
+    entries: list[dict] = []
+    skill_dirs: list[Path] = []
+    for repo, skills in names.items():
+        work = root / "src" / repo
+        _git(["init", "-q"], cwd=work)
+        _git(["add", "-A"], cwd=work)
+        _git(["commit", "-q", "-m", "bench corpus"], cwd=work)
+        commit = _git(["rev-parse", "HEAD"], cwd=work).strip()
+        bare = root / "repos" / f"{repo}.git"
+        _git(["clone", "-q", "--bare", str(work), str(bare)], cwd=root)
+        # The installer fetches commits by id into a blob-less partial clone.
+        _git(["config", "uploadpack.allowFilter", "true"], cwd=bare)
+        _git(["config", "uploadpack.allowAnySHA1InWant", "true"], cwd=bare)
+        for name in skills:
+            skill_dir = work / "skills" / name
+            skill_dirs.append(skill_dir)
+            if name == "bench-adversarial":
+                continue
+            tree, files = sha256_tree_files(skill_dir)
+            entries.append(
+                {
+                    "name": name,
+                    "sourceId": "bench",
+                    "ref": f"{_BENCH_OWNER}/{repo}@{commit}",
+                    "sha256": tree,
+                    "merkleRoot": merkle_root(files),
+                    "files": dict(sorted(files.items())),
+                }
+            )
+
+    sizes = {d: sum(f.stat().st_size for f in d.rglob("*") if f.is_file()) for d in skill_dirs}
+    corpus = Corpus(
+        root=root,
+        shape=shape,
+        skill_dirs=tuple(skill_dirs),
+        bytes=sum(sizes.values()),
+        locked_bytes=sum(size for d, size in sizes.items() if d.name != "bench-adversarial"),
+    )
+    sources = {
+        "version": 1,
+        "policy": {"mode": "allowlist", "allowlistDomains": ["github.com"]},
+        "sources": [{"id": "bench", "type": "git", "url": _BENCH_URL}],
+    }
+    corpus.sources_path.write_text(json.dumps(sources, indent=2) + "\n", encoding="utf-8")
+    corpus.lock_path.write_text(json.dumps({"version": 2, "skills": entries}, indent=2) + "\n", encoding="utf-8")
+    marker = {
+        "shape": asdict(shape),
+        "skills": [d.relative_to(root).as_posix() for d in skill_dirs],
+        "bytes": corpus.bytes,
+        "lockedBytes": corpus.locked_bytes,
+    }
+    (root / _CORPUS_MARKER).write_text(json.dumps(marker, indent=2) + "\n", encoding="utf-8")
+    return corpus
+
+
+@contextlib.contextmanager
+def _git_redirect(repos_dir: Path) -> Iterator[None]:
+    """Point https://github.com/bench/ at repos_dir (via git's environment config)."""
+
+    keys = ("GIT_CONFIG_COUNT",)
+    n = int(os.environ.get("GIT_CONFIG_COUNT") or 0)
+    keys += (f"GIT_CONFIG_KEY_{n}", f"GIT_CONFIG_VALUE_{n}")
+    saved = {key: os.environ.get(key) for key in keys}
+    os.environ[f"GIT_CONFIG_KEY_{n}"] = f"url.{repos_dir.as_uri()}/.insteadOf"
+    os.environ[f"GIT_CONFIG_VALUE_{n}"] = _BENCH_URL
+    os.environ["GIT_CONFIG_COUNT"] = str(n + 1)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _install(corpus: Corpus, *, jobs: int) -> float:
+    argv = [
+        "--global-sources", str(corpus.sources_path),
+        "--project-sources", str(corpus.sources_path),
+        "--project-lock", str(corpus.lock_path),
+        "--dest", str(corpus.root / "dest"),
+        "--repo-cache", str(corpus.root / "repo-cache"),
+        "--jobs", str(jobs),
+    ]  # fmt: skip
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        rc = skills_install.main(argv)
+    elapsed = time.perf_counter() - start
+    if rc != 0:
+        raise BenchError(f"install failed (rc={rc}):\n{out.getvalue().rstrip()}")
+    return elapsed
+
+
+def _run_install_cold(corpus: Corpus, jobs: int) -> float:
+    for name in ("dest", "repo-cache"):
+        shutil.rmtree(corpus.root / name, ignore_errors=True)
+    return _install(corpus, jobs=jobs)
+
+
+def _run_install_noop(corpus: Corpus, jobs: int) -> float:
+    if not (corpus.root / "dest").is_dir():
+        _install(corpus, jobs=jobs)
+    return _install(corpus, jobs=jobs)
+
+
+def _run_sha256_tree(corpus: Corpus, jobs: int) -> float:
+    start = time.perf_counter()
+    for skill_dir in corpus.skill_dirs:
+        sha256_tree(skill_dir)
+    return time.perf_counter() - start
+
+
+def _run_scan(corpus: Corpus, jobs: int) -> float:
+    start = time.perf_counter()
+    for skill_dir in corpus.skill_dirs:
+        scan_skill_dir(root=skill_dir, allowlist_domains={"github.com"}, jobs=jobs)
+    return time.perf_counter() - start
+
+
+def _run_validate(corpus: Corpus, jobs: int) -> float:
+    start = time.perf_counter()
+    validate(
+        global_path=corpus.sources_path,
+        project_path=corpus.sources_path,
+        global_lock_path=None,
+        project_lock_path=corpus.lock_path,
+        require_lock=True,
+    )
+    return time.perf_counter() - start
+
+
+# name -> (one timed run, bytes it processes or None when throughput is not meaningful)
+_SUITE_CASES: dict[str, tuple[Callable[[Corpus, int], float], Optional[Callable[[Corpus], int]]]] = {
+    "install-cold": (_run_install_cold, lambda corpus: corpus.locked_bytes),
+    "install-noop": (_run_install_noop, None),
+    "sha256_tree": (_run_sha256_tree, lambda corpus: corpus.bytes),
+    "scan_skill_dir": (_run_scan, lambda corpus: corpus.bytes),
+    "validate": (_run_validate, None),
+}
+
+
+def run_suite(corpus: Corpus, *, cases: list[str], repeat: int, jobs: int) -> list[BenchResult]:
+    results = []
+    with _git_redirect(corpus.repos_dir):
+        for name in cases:
+            run, processed = _SUITE_CASES[name]
+            seconds = min(run(corpus, jobs) for _ in range(repeat))
+            results.append(BenchResult(name=name, seconds=seconds, bytes=processed(corpus) if processed else 0))
+    return results
+
+
+def _load_baseline(path: Path, shape: CorpusShape, jobs: int) -> dict[str, float]:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        raise BenchError(f"Invalid baseline {path}: {e}") from e
+    if not isinstance(obj, dict) or obj.get("version") != _BASELINE_VERSION:
+        raise BenchError(f"Unsupported baseline version in {path} (expected {_BASELINE_VERSION})")
+    if obj.get("shape") != asdict(shape):
+        raise BenchError(
+            f"Baseline {path} was recorded for a different corpus ({obj.get('shape')}); "
+            "rerun with the same corpus options or record a new baseline"
+        )
+    if obj.get("jobs") != jobs:
+        raise BenchError(
+            f"Baseline {path} was recorded with --jobs {obj.get('jobs', '(unknown)')}, not {jobs}; "
+            "rerun with the same --jobs or record a new baseline"
+        )
+    return {name: float(r["seconds"]) for name, r in obj.get("results", {}).items()}
+
+
+def _save_baseline(path: Path, shape: CorpusShape, jobs: int, results: list[BenchResult]) -> None:
+    obj = {
+        "version": _BASELINE_VERSION,
+        "shape": asdict(shape),
+        "jobs": jobs,
+        "platform": f"{platform.system()} {platform.machine()}, Python {platform.python_version()}",
+        "results": {r.name: {"seconds": round(r.seconds, 6), "bytes": r.bytes} for r in results},
+    }
+    path.write_text(json.dumps(obj, indent=2) + "\n", encoding="utf-8")
+
+
+def _main_scan(args: argparse.Namespace) -> int:
+    size = int(args.size_mb * 1024 * 1024)
+    results = _bench_scan(cases=args.case or sorted(_SCAN_CASES), size=size, repeat=max(1, args.repeat))
+
+    limit = args.max_seconds_per_mb * args.size_mb
+    failed = False
+    for name, seconds in results.items():
+        status = "OK  " if seconds <= limit else "SLOW"
+        failed = failed or seconds > limit
+        print(f"{status} {name:<16} {seconds:8.3f}s  ({seconds / args.size_mb:.3f}s/MiB)")
+    if failed:
+        print(f"ERROR: scan slower than {args.max_seconds_per_mb}s/MiB", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _main_suite(args: argparse.Namespace) -> int:
+    shape = CorpusShape(
+        repos=args.repos,
+        skills=args.skills,
+        files_per_skill=args.files_per_skill,
+        max_depth=args.max_depth,
+        huge_files=args.huge_files,
+        huge_mb=args.huge_mb,
+        adversarial_kb=args.adversarial_kb,
+        seed=args.seed,
+    )
+    try:
+        baseline = _load_baseline(Path(args.baseline), shape, args.jobs) if args.baseline else None
+        with contextlib.ExitStack() as stack:
+            work = Path(args.work) if args.work else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+            corpus = build_corpus(work / "corpus", shape)
+            print(f"corpus: {len(corpus.skill_dirs)} skills, {corpus.bytes / 2**20:.1f} MiB in {corpus.root}")
+            results = run_suite(
+                corpus, cases=args.case or list(_SUITE_CASES), repeat=max(1, args.repeat), jobs=args.jobs
+            )
+        if args.save_baseline:
+            _save_baseline(Path(args.save_baseline), shape, args.jobs, results)
+    except (BenchError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    regressed = []
+    for r in results:
+        rate = f"{r.bytes / 2**20 / r.seconds:9.1f} MiB/s" if r.bytes and r.seconds > 0 else f"{'':>15}"
+        status, versus = "OK  ", ""
+        base = baseline.get(r.name) if baseline is not None else None
+        if base is not None:
+            versus = f"  baseline {base:8.3f}s ({(r.seconds / base - 1) * 100 if base > 0 else 0.0:+.0f}%)"
+            # Both a relative and an absolute margin, so timer noise on fast cases does not fail.
+            if r.seconds > base * (1 + args.max_regression) and r.seconds - base > args.min_delta_seconds:
+                status = "SLOW"
+                regressed.append(r.name)
+        print(f"{status} {r.name:<16} {r.seconds:8.3f}s  {rate}{versus}")
+    if args.save_baseline:
+        print(f"baseline written to {args.save_baseline}")
+    if regressed:
+        print(
+            f"ERROR: slower than baseline by more than {args.max_regression:.0%}: {', '.join(regressed)}",
+            file=sys.stderr,
+        )
+        return 2
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks for the skill tooling.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Scanner worst-case time on adversarial inputs")
+    scan.add_argument("--case", action="append", choices=sorted(_SCAN_CASES), help="Case to run (repeatable; default: all)")
+    scan.add_argument("--size-mb", type=float, default=4.0, help="Input size per case in MiB (default: 4)")
+    scan.add_argument("--repeat", type=int, default=1, help="Runs per case; the best time is reported (default: 1)")
+    scan.add_argument(
+        "--max-seconds-per-mb",
+        type=float,
+        default=2.0,
+        help="Fail if any case scans slower than this (default: 2.0)",
+    )
+
+    defaults = CorpusShape()
+    suite = sub.add_parser(
+        "suite",
+        help="Install, hash, scan and validate a synthetic corpus served over file://; compare to a baseline",
+    )
+    suite.add_argument(
+        "--case", action="append", choices=list(_SUITE_CASES), help="Case to run (repeatable; default: all)"
+    )
+    suite.add_argument("--repeat", type=int, default=3, help="Runs per case; the best time is reported (default: 3)")
+    suite.add_argument("--jobs", type=int, default=1, help="--jobs for the installer and scanner (default: 1)")
+    suite.add_argument(
+        "--work",
+        metavar="DIR",
+        help="Build the corpus and caches under DIR and keep them (reused while the corpus options match); "
+        "default: a temporary dir",
+    )
+    suite.add_argument("--repos", type=int, default=defaults.repos, help=f"Repos (default: {defaults.repos})")
+    suite.add_argument("--skills", type=int, default=defaults.skills, help=f"Skills (default: {defaults.skills})")
+    suite.add_argument(
+        "--files-per-skill",
+        type=int,
+        default=defaults.files_per_skill,
+        help=f"Small files per skill (default: {defaults.files_per_skill})",
+    )
+    suite.add_argument(
+        "--max-depth", type=int, default=defaults.max_depth, help=f"Deepest dir nesting (default: {defaults.max_depth})"
+    )
+    suite.add_argument(
+        "--huge-files",
+        type=int,
+        default=defaults.huge_files,
+        help=f"Skills with one huge file (default: {defaults.huge_files})",
+    )
+    suite.add_argument(
+        "--huge-mb", type=float, default=defaults.huge_mb, help=f"Size of each huge file (default: {defaults.huge_mb})"
+    )
+    suite.add_argument(
+        "--adversarial-kb",
+        type=int,
+        default=defaults.adversarial_kb,
+        help=f"Size of each adversarial scanner input (default: {defaults.adversarial_kb})",
+    )
+    suite.add_argument("--seed", type=int, default=defaults.seed, help=f"Corpus RNG seed (default: {defaults.seed})")
+    suite.add_argument("--baseline", metavar="FILE", help="Compare against results saved with --save-baseline")
+    suite.add_argument("--save-baseline", metavar="FILE", help="Write this run's results as a baseline")
+    suite.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Fail if a case is slower than the baseline by more than this fraction (default: 0.25)",
+    )
+    suite.add_argument(
+        "--min-delta-seconds",
+        type=float,
+        default=0.05,
+        help="...and by more than this many seconds, to ignore noise on fast cases (default: 0.05)",
+    )
+    args = ap.parse_args(argv)
+
+    if args.command == "suite":
+        return _main_suite(args)
+    return _main_scan(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import tarfile
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Optional
+
+INDEX_NAME = "index.json"
+_INDEX_VERSION = 1
+
+
+class BundleError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class BundleEntry:
+    name: str
+    ref: str  # owner/repo@<commit>
+    sha256: str  # sha256_tree of the skill, also the bundle file's name
+    root: str  # the skill's path in its repo
+    file: str  # relative to the bundle dir
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return (self.ref, self.name, self.sha256)
+
+
+class BundleDir:
+    """A directory of exported skills: one deterministic `<sha256>.tar.gz` per distinct
+    skill tree, plus `index.json` mapping (ref, name, sha256) to its file.
+
+    Bundles are content-addressed by the lock's tree digest, so a skill pinned at many
+    refs, or exported repeatedly, is stored once. Reading verifies nothing by itself;
+    the installer hashes every skill against its lock as it would for git objects.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str, str], BundleEntry] = {}
+        index = path / INDEX_NAME
+        if index.exists():
+            self._load(index)
+
+    def _load(self, index: Path) -> None:
+        try:
+            obj = json.loads(index.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            raise BundleError(f"Invalid bundle index {index}: {e}") from e
+        if not isinstance(obj, dict) or obj.get("version") != _INDEX_VERSION:
+            raise BundleError(f"Unsupported bundle index version in {index} (expected {_INDEX_VERSION})")
+        skills = obj.get("skills")
+        if not isinstance(skills, list):
+            raise BundleError(f"{index}: skills must be a list")
+        for idx, item in enumerate(skills):
+            try:
+                entry = BundleEntry(**{k: str(item[k]) for k in ("name", "ref", "sha256", "root", "file")})
+            except (KeyError, TypeError) as e:
+                raise BundleError(f"{index}: skills[{idx}] is missing {e}") from e
+            self._entries[entry.key] = entry
+
+    def lookup(self, *, ref: str, name: str, sha256: str) -> Optional[BundleEntry]:
+        entry = self._entries.get((ref, name, sha256.lower()))
+        if entry is None or not (self.path / entry.file).is_file():
+            return None
+        return entry
+
+    def add(self, *, ref: str, name: str, sha256: str, root: str, files: list[tuple[str, bytes]]) -> BundleEntry:
+        """Write a skill's files (unless a bundle with this digest exists) and index it."""
+
+        sha256 = sha256.lower()
+        file = f"{sha256}.tar.gz"
+        dst = self.path / file
+        if not dst.is_file():
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(f".{file}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+            try:
+                # Fixed mtimes/owners and sorted members: same files, same bytes.
+                with open(tmp, "wb") as raw, gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+                    with tarfile.open(fileobj=gz, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                        for rel, data in sorted(files):
+                            info = tarfile.TarInfo(rel)
+                            info.size = len(data)
+                            info.mode = 0o644
+                            tar.addfile(info, io.BytesIO(data))
+                os.replace(tmp, dst)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+        entry = BundleEntry(name=name, ref=ref, sha256=sha256, root=root, file=file)
+        with self._lock:
+            self._entries[entry.key] = entry
+        return entry
+
+    def save_index(self) -> None:
+        with self._lock:
+            skills = [asdict(e) for e in sorted(self._entries.values(), key=lambda e: e.key)]
+        self.path.mkdir(parents=True, exist_ok=True)
+        index = self.path / INDEX_NAME
+        tmp = index.with_name(f".{INDEX_NAME}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+        tmp.write_text(json.dumps({"version": _INDEX_VERSION, "skills": skills}, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, index)
+
+    def iter_files(self, entry: BundleEntry) -> Iterator[tuple[str, bytes]]:
+        """Stream (relpath, bytes) out of a bundle; only plain files with safe relative paths."""
+
+        path = self.path / entry.file
+        try:
+            with tarfile.open(path, mode="r|gz") as tar:
+                for member in tar:
+                    rel = PurePosixPath(member.name)
+                    if not member.isreg():
+                        raise BundleError(f"{path}: not a regular file: {member.name!r}")
+                    if rel.is_absolute() or any(part in {"", ".", ".."} for part in member.name.split("/")):
+                        raise BundleError(f"{path}: unsafe path: {member.name!r}")
+                    f = tar.extractfile(member)
+                    assert f is not None
+                    yield member.name, f.read()
+        except (OSError, tarfile.TarError, EOFError) as e:
+            raise BundleError(f"Cannot read bundle {path}: {e}") from e
@@ -2,33 +2,269 @@
 
 from __future__ import annotations
 
+import contextlib
+import fcntl
 import hashlib
+import os
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Iterator, Optional
 
+import skills_trace
+from skills_digest_cache import DigestCache
 
-def sha256_tree(root: Path) -> str:
-    """Deterministic sha256 over a directory tree.
+# Repo cache layout, shared by the installer and gc: <cache>/<owner>__<repo> per repo,
+# one object store shared by all of them, and lock files beside them.
+SHARED_OBJECTS_DIR = ".objects"
 
-    Hash input = for each file in sorted(path):
-      relpath (POSIX) + NUL + file_bytes + NUL
 
-    - Ignores directories.
-    - Treats file contents as raw bytes (no newline normalization).
+def repo_lock_path(cache_root: Path, key: str) -> Path:
+    return cache_root / f".{key}.lock"
+
+
+def objects_lock_path(cache_root: Path) -> Path:
+    """Held shared by anything using the cache, exclusively by gc while it rewrites the store."""
+
+    return cache_root / ".objects.lock"
+
+
+@contextlib.contextmanager
+def file_lock(path: Path, *, shared: bool = False) -> Iterator[None]:
+    """Advisory lock (flock) on `path`, created if needed; blocks until acquired."""
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+class TreeHasher:
+    """Incremental form of sha256_tree for files that arrive as a stream.
+
+    Files must be added in sorted relpath order, which is also git tree order for the
+    files under one directory, so a git tree walk can be hashed without materializing it.
+    A file is either added whole (`add`) or in pieces (`begin`, `update`..., `end`).
     """
 
+    def __init__(self) -> None:
+        self._h = hashlib.sha256()
+        self._last: Optional[str] = None
+
+    def add(self, rel: str, data: bytes) -> None:
+        self.begin(rel)
+        self._h.update(data)
+        self.end()
+
+    def begin(self, rel: str) -> None:
+        if self._last is not None and rel <= self._last:
+            raise ValueError(f"sha256_tree input out of order: {rel!r} after {self._last!r}")
+        self._last = rel
+        self._h.update(rel.encode("utf-8"))
+        self._h.update(b"\0")
+
+    def update(self, chunk: bytes) -> None:
+        self._h.update(chunk)
+
+    def end(self) -> None:
+        self._h.update(b"\0")
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+# Files are streamed in chunks of this size, so hashing memory does not grow with file
+# size. Trees larger than _READ_AHEAD_MIN_BYTES are read on a separate thread, up to
+# _READ_AHEAD chunks ahead of the hasher (file reads and hashlib both release the GIL).
+_CHUNK = 1024 * 1024
+_READ_AHEAD = 8
+_READ_AHEAD_MIN_BYTES = 4 * 1024 * 1024
+
+# Files modified this recently may change again within the filesystem's timestamp
+# granularity without changing their stat signature, so such trees are not cached.
+_RACY_NS = 2_000_000_000
+
+_TreeFile = tuple[str, str, os.stat_result]  # (POSIX relpath, path, stat)
+
+
+def _walk_files(root: Path) -> list[_TreeFile]:
+    """Files under root in sha256_tree order: symlinks to files are followed, symlinked
+    dirs are not descended into (as Path.rglob does)."""
+
     if not root.exists():
         raise FileNotFoundError(root)
     if not root.is_dir():
         raise NotADirectoryError(root)
 
-    files: list[Path] = [p for p in root.rglob("*") if p.is_file()]
-    files.sort(key=lambda p: p.relative_to(root).as_posix())
+    files: list[_TreeFile] = []
+    stack = [("", str(root))]
+    while stack:
+        prefix, path = stack.pop()
+        with os.scandir(path) as it:
+            for entry in it:
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((rel + "/", entry.path))
+                elif entry.is_file():
+                    files.append((rel, entry.path, entry.stat()))
+    files.sort(key=lambda f: f[0])
+    return files
+
 
+def _signature(files: list[_TreeFile]) -> str:
     h = hashlib.sha256()
-    for p in files:
-        rel = p.relative_to(root).as_posix().encode("utf-8")
-        h.update(rel)
-        h.update(b"\0")
-        h.update(p.read_bytes())
-        h.update(b"\0")
+    for rel, _path, st in files:
+        h.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\0{st.st_ino}\0{st.st_dev}\n".encode("utf-8"))
     return h.hexdigest()
+
+
+def _iter_chunks(files: list[_TreeFile], *, digests: bool) -> Iterator[tuple[str, Optional[bytes], Optional[str]]]:
+    """(rel, None, None) to start a file, (rel, chunk, None) per chunk, (rel, None, sha256 or
+    None) to end it."""
+
+    for rel, path, _st in files:
+        yield rel, None, None
+        h = hashlib.sha256() if digests else None
+        with open(path, "rb") as f:
+            while chunk := f.read(_CHUNK):
+                if h is not None:
+                    h.update(chunk)
+                yield rel, chunk, None
+        yield rel, None, h.hexdigest() if h is not None else ""
+
+
+def _iter_chunks_ahead(
+    files: list[_TreeFile], *, digests: bool
+) -> Iterator[tuple[str, Optional[bytes], Optional[str]]]:
+    """_iter_chunks, produced on a reader thread (which also computes per-file digests)."""
+
+    q: queue.Queue = queue.Queue(maxsize=_READ_AHEAD)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read() -> None:
+        try:
+            for item in _iter_chunks(files, digests=digests):
+                if not put(item):
+                    return
+        except BaseException as e:  # noqa: BLE001 - re-raised on the consumer side
+            put(e)
+            return
+        put(done)
+
+    reader = threading.Thread(target=read, name="sha256_tree-reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+def _hash_tree(files: list[_TreeFile], *, digests: bool) -> tuple[str, dict[str, str]]:
+    total = sum(st.st_size for _rel, _path, st in files)
+    skills_trace.add(bytes=total)
+    chunks = _iter_chunks_ahead if total >= _READ_AHEAD_MIN_BYTES else _iter_chunks
+    h = TreeHasher()
+    out: dict[str, str] = {}
+    for rel, chunk, digest in chunks(files, digests=digests):
+        if chunk is not None:
+            h.update(chunk)
+        elif digest is None:
+            h.begin(rel)
+        else:
+            h.end()
+            if digests:
+                out[rel] = digest
+    return h.hexdigest(), out
+
+
+def _tree_digest(
+    root: Path, *, digests: bool, cache: Optional[DigestCache]
+) -> tuple[str, Optional[dict[str, str]]]:
+    start_ns = time.time_ns()
+    files = _walk_files(root)
+    if cache is None:
+        tree, out = _hash_tree(files, digests=digests)
+        return tree, out if digests else None
+
+    key = str(root.resolve())
+    signature = _signature(files)
+    hit = cache.get(root=key, signature=signature)
+    if hit is not None and (hit[1] is not None or not digests):
+        return hit
+    tree, out = _hash_tree(files, digests=digests)
+    if not any(st.st_mtime_ns >= start_ns - _RACY_NS for _rel, _path, st in files):
+        cache.put(root=key, signature=signature, sha256=tree, files=out if digests else None)
+    return tree, out if digests else None
+
+
+def tree_relpaths(root: Path) -> list[str]:
+    """POSIX relpaths of the files sha256_tree(root) would hash, in its order (stat only)."""
+
+    return [rel for rel, _path, _st in _walk_files(root)]
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+        skills_trace.add(bytes=f.tell())
+    return h.hexdigest()
+
+
+def merkle_root(digests: dict[str, str]) -> str:
+    """Root over per-file digests (lock v2): sha256_tree's framing, with each file's
+    sha256 (lowercase hex) in place of its bytes.
+
+    It commits to the same paths and contents as sha256_tree, but each file can be
+    checked on its own against its leaf digest.
+    """
+
+    h = TreeHasher()
+    for rel in sorted(digests):
+        h.add(rel, digests[rel].lower().encode("ascii"))
+    return h.hexdigest()
+
+
+def sha256_tree(root: Path, *, cache: Optional[DigestCache] = None) -> str:
+    """Deterministic sha256 over a directory tree.
+
+    Hash input = for each file in sorted(path):
+      relpath (POSIX) + NUL + file_bytes + NUL
+
+    - Ignores directories.
+    - Treats file contents as raw bytes (no newline normalization).
+
+    Files are streamed in bounded memory. With a cache, an unchanged tree (same relpaths,
+    sizes, mtimes and inodes) is not read at all.
+    """
+
+    return _tree_digest(root, digests=False, cache=cache)[0]
+
+
+def sha256_tree_files(root: Path, *, cache: Optional[DigestCache] = None) -> tuple[str, dict[str, str]]:
+    """sha256_tree(root) plus the sha256 of each file (keyed by POSIX relpath), in one read."""
+
+    tree, digests = _tree_digest(root, digests=True, cache=cache)
+    assert digests is not None
+    return tree, digests
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tree_digests (
+    root TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    files TEXT,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tree_digests_last_used ON tree_digests (last_used);
+"""
+
+
+class DigestCacheError(Exception):
+    pass
+
+
+class DigestCache:
+    """Persistent sha256_tree results in a SQLite database, one row per tree root.
+
+    A row holds the tree's stat signature (relpath, size, mtime_ns, inode and device of
+    every file), the tree digest and optionally the per-file digests. A lookup only hits
+    when the signature is unchanged, so any added, removed, resized, touched or replaced
+    file makes the tree be read again. Trimmed to max_entries most recently used rows on
+    close. Safe to share between threads.
+    """
+
+    DEFAULT_MAX_ENTRIES = 10_000
+
+    def __init__(self, path: Path, *, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db: Optional[sqlite3.Connection] = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            raise DigestCacheError(f"Cannot open digest cache {path}: {e}") from e
+
+    def __enter__(self) -> "DigestCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def get(self, *, root: str, signature: str) -> Optional[tuple[str, Optional[dict[str, str]]]]:
+        """(tree sha256, per-file digests or None) if root was hashed with this signature."""
+
+        with self._lock, self._errors():
+            db = self._conn()
+            row = db.execute(
+                "SELECT sha256, files FROM tree_digests WHERE root = ? AND signature = ?", (root, signature)
+            ).fetchone()
+            if row is None:
+                return None
+            with db:
+                db.execute("UPDATE tree_digests SET last_used = ? WHERE root = ?", (time.time_ns(), root))
+        sha256, files = row
+        return sha256, (json.loads(files) if files is not None else None)
+
+    def put(self, *, root: str, signature: str, sha256: str, files: Optional[dict[str, str]] = None) -> None:
+        data = json.dumps(files, separators=(",", ":"), sort_keys=True) if files is not None else None
+        with self._lock, self._errors():
+            db = self._conn()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO tree_digests (root, signature, sha256, files, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (root, signature, sha256, data, time.time_ns()),
+                )
+
+    def close(self) -> None:
+        with self._lock, self._errors():
+            if self._db is None:
+                return
+            try:
+                db = self._db
+                with db:
+                    db.execute(
+                        "DELETE FROM tree_digests WHERE root NOT IN "
+                        "(SELECT root FROM tree_digests ORDER BY last_used DESC LIMIT ?)",
+                        (self.max_entries,),
+                    )
+            finally:
+                self._db.close()
+                self._db = None
+
+    @contextlib.contextmanager
+    def _errors(self) -> Iterator[None]:
+        try:
+            yield
+        except sqlite3.Error as e:
+            raise DigestCacheError(f"Digest cache {self.path}: {e}") from e
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise DigestCacheError(f"Digest cache {self.path} is closed")
+        return self._db
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import skills_trace
+from skills_common import SHARED_OBJECTS_DIR, file_lock, objects_lock_path, repo_lock_path
+from skills_git import git_env
+from skills_validate import ValidationError, discover_projects
+
+
+class GcError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Backup:
+    path: Path
+    name: str  # the backed-up entry, e.g. a skill name or "opencode.json"
+    created: float  # from the timestamp in the backup name
+    seq: int  # the .<n> suffix of same-second backups
+
+
+@dataclass(frozen=True)
+class CachedRepo:
+    key: str  # <owner>__<repo>
+    path: Path
+    last_used: float
+    size: int
+
+
+@dataclass(frozen=True)
+class GcPolicy:
+    keep_backups: Optional[int] = None  # newest backups kept per entry
+    max_backup_age_days: Optional[float] = None
+    max_backup_bytes: Optional[int] = None  # total over all backup dirs
+    max_repo_age_days: Optional[float] = None  # unreferenced repos unused this long are evicted
+    cache_budget: Optional[int] = None  # evict unreferenced repos, LRU, while the cache is larger
+    prune_objects: bool = False
+    stale_temp_days: float = 1.0
+
+
+# `<name>.bak.<YYYYmmddHHMMSS>[.<n>]`: written by skills_install.py and install.sh.
+_BACKUP_RE = re.compile(r"^(?P<name>.+)\.bak\.(?P<ts>\d{14})(?:\.(?P<seq>\d+))?$")
+# Leftovers of interrupted runs: repo inits in the cache, staging dirs in dests.
+_TEMP_RE = re.compile(r"^\..+\.(?:init|staging)-\d+-[0-9a-f]{8}$")
+
+
+def _run_git(args: list[str], *, cwd: Path, input: Optional[str] = None) -> str:
+    skills_trace.add(subprocesses=1)
+    p = subprocess.run(["git", *args], cwd=str(cwd), env=git_env(), text=True, input=input, capture_output=True)
+    if p.returncode != 0:
+        raise GcError(f"git {' '.join(args)} failed: {p.stderr.strip()}")
+    return p.stdout
+
+
+def _tree_bytes(path: Path) -> int:
+    if path.is_symlink() or not path.is_dir():
+        try:
+            return path.lstat().st_size
+        except OSError:
+            return 0
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for fn in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, fn)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def reclaimable_bytes(paths: Iterable[Path]) -> int:
+    """Bytes freed by deleting all of `paths`: files hardlinked from elsewhere free nothing."""
+
+    links: dict[tuple[int, int], list[int]] = {}  # (dev, ino) -> [size, nlink, links seen]
+    for path in paths:
+        if path.is_symlink() or not path.is_dir():
+            walk: Iterable[tuple[str, list[str], list[str]]] = [(str(path.parent), [], [path.name])]
+        else:
+            walk = os.walk(path)
+        for dirpath, _dirnames, filenames in walk:
+            for fn in filenames:
+                try:
+                    st = os.lstat(os.path.join(dirpath, fn))
+                except OSError:
+                    continue
+                entry = links.setdefault((st.st_dev, st.st_ino), [st.st_size, st.st_nlink, 0])
+                entry[2] += 1
+    return sum(size for size, nlink, seen in links.values() if seen >= nlink)
+
+
+def format_bytes(n: int) -> str:
+    size = float(n)
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{n} B"
+
+
+def parse_size(text: str) -> int:
+    """'500M', '2G', '1.5GiB' or a plain byte count (binary units)."""
+
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*", text.lower())
+    if not m:
+        raise ValueError(f"Invalid size: {text!r} (expected e.g. 500M or 2G)")
+    scale = 1024 ** " kmgt".index(m.group(2) or " ")
+    return int(float(m.group(1)) * scale)
+
+
+def find_backups(dirs: Iterable[Path]) -> list[Backup]:
+    out: list[Backup] = []
+    for d in dirs:
+        try:
+            names = os.listdir(d)
+        except FileNotFoundError:
+            continue
+        for fn in names:
+            m = _BACKUP_RE.match(fn)
+            if not m:
+                continue
+            try:
+                created = time.mktime(time.strptime(m.group("ts"), "%Y%m%d%H%M%S"))
+            except ValueError:
+                continue
+            out.append(Backup(path=d / fn, name=m.group("name"), created=created, seq=int(m.group("seq") or 0)))
+    return out
+
+
+def select_backups(backups: list[Backup], *, policy: GcPolicy, now: float) -> list[Backup]:
+    """Backups to delete: beyond the per-entry count, older than the age limit, then oldest
+    first while the remaining ones exceed the byte budget."""
+
+    doomed: dict[Path, Backup] = {}
+    groups: dict[tuple[Path, str], list[Backup]] = {}
+    for b in backups:
+        groups.setdefault((b.path.parent, b.name), []).append(b)
+    for group in groups.values():
+        group.sort(key=lambda b: (b.created, b.seq), reverse=True)
+        for idx, b in enumerate(group):
+            if policy.keep_backups is not None and idx >= policy.keep_backups:
+                doomed[b.path] = b
+            elif policy.max_backup_age_days is not None and now - b.created > policy.max_backup_age_days * 86400:
+                doomed[b.path] = b
+
+    if policy.max_backup_bytes is not None:
+        remaining = sorted((b for b in backups if b.path not in doomed), key=lambda b: (b.created, b.seq))
+        total = sum(_tree_bytes(b.path) for b in remaining)
+        for b in remaining:
+            if total <= policy.max_backup_bytes:
+                break
+            doomed[b.path] = b
+            total -= _tree_bytes(b.path)
+    return sorted(doomed.values(), key=lambda b: (str(b.path.parent), b.name, b.created, b.seq))
+
+
+def find_repos(cache_root: Path) -> list[CachedRepo]:
+    out: list[CachedRepo] = []
+    try:
+        names = sorted(os.listdir(cache_root))
+    except FileNotFoundError:
+        return out
+    for fn in names:
+        path = cache_root / fn
+        if fn.startswith(".") or not (path / ".git").is_dir():
+            continue
+        # The installer touches the repo's lock file on every use.
+        lock = repo_lock_path(cache_root, fn)
+        last_used = (lock if lock.exists() else path).stat().st_mtime
+        out.append(CachedRepo(key=fn, path=path, last_used=last_used, size=_tree_bytes(path)))
+    return out
+
+
+def select_repos(
+    repos: list[CachedRepo], *, referenced: set[str], cache_bytes: int, policy: GcPolicy, now: float
+) -> list[CachedRepo]:
+    """Unreferenced repos to evict: unused past the age limit, then least recently used
+    first while the cache (repos + shared objects) exceeds the budget.
+
+    Evicting a repo frees its own directory only; the shared objects and the referenced
+    repos stay. When the budget cannot be reached even by evicting every candidate, no
+    repo is evicted for it.
+    """
+
+    doomed: list[CachedRepo] = []
+    candidates = sorted((r for r in repos if r.key not in referenced), key=lambda r: r.last_used)
+    for r in candidates:
+        if policy.max_repo_age_days is not None and now - r.last_used > policy.max_repo_age_days * 86400:
+            doomed.append(r)
+            cache_bytes -= r.size
+    floor = cache_bytes - sum(r.size for r in candidates if r not in doomed)
+    for r in candidates:
+        if policy.cache_budget is None or cache_bytes <= policy.cache_budget or floor > policy.cache_budget:
+            break
+        if r not in doomed:
+            doomed.append(r)
+            cache_bytes -= r.size
+    return doomed
+
+
+def find_stale_temp(dirs: Iterable[Path], *, older_than: float, now: float) -> list[Path]:
+    out: list[Path] = []
+    for d in dirs:
+        try:
+            names = sorted(os.listdir(d))
+        except FileNotFoundError:
+            continue
+        for fn in names:
+            path = d / fn
+            if _TEMP_RE.match(fn) and now - path.lstat().st_mtime > older_than:
+                out.append(path)
+    return out
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def _evict_repo(*, cache_root: Path, repo: CachedRepo) -> None:
+    with file_lock(objects_lock_path(cache_root), shared=True), file_lock(repo_lock_path(cache_root, repo.key)):
+        if repo.path.exists():
+            shutil.rmtree(repo.path)
+
+
+def prune_objects(*, cache_root: Path, roots: dict[str, set[str]], dry_run: bool) -> tuple[int, int, int]:
+    """Repack the shared object store with only what `roots` (repo key -> commits) reach.
+
+    Each root commit keeps its own tree and the blobs of it that were fetched; history
+    is never walked (the cache holds depth-1 commits). Repos' shallow lists are trimmed
+    to the commits that remain. Holds the object store lock exclusively, so no install
+    runs meanwhile. Returns (store bytes before, after, bytes freed); with dry_run
+    nothing changes and "after" and "freed" are estimates. Freed only counts replaced
+    files that are not hardlinked from outside the store, since those stay on disk.
+    """
+
+    shared = cache_root / SHARED_OBJECTS_DIR
+    if not (shared / "pack").is_dir():
+        return 0, 0, 0
+
+    with file_lock(objects_lock_path(cache_root)):
+        before = _tree_bytes(shared)
+        removable = reclaimable_bytes([shared])
+        with tempfile.TemporaryDirectory(dir=cache_root, prefix=".gc-") as tmp_name:
+            tmp = Path(tmp_name).resolve()
+            # A scratch repo that sees only the shared store.
+            _run_git(["init", "-q", "--bare", "view.git"], cwd=tmp)
+            view = tmp / "view.git"
+            (view / "objects" / "info" / "alternates").write_text(f"{shared.resolve()}\n", encoding="utf-8")
+
+            wanted = sorted({c for commits in roots.values() for c in commits})
+            types = _run_git(
+                ["-c", "protocol.allow=never", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+                cwd=view,
+                input="".join(f"{c}\n" for c in wanted),
+            )
+            commits = [line.split(" ")[0] for line in types.splitlines() if line.endswith(" commit")]
+            oids: list[str] = []
+            if commits:
+                listed = _run_git(
+                    ["-c", "protocol.allow=never", "rev-list", "--objects", "--no-walk", "--missing=allow-any", "--stdin"],
+                    cwd=view,
+                    input="".join(f"{c}\n" for c in commits),
+                )
+                oids = sorted({line.split(" ", 1)[0] for line in listed.splitlines() if line})
+
+            if dry_run:
+                sizes = _run_git(
+                    ["cat-file", "--batch-check=%(objectsize:disk)"],
+                    cwd=view,
+                    input="".join(f"{oid}\n" for oid in oids),
+                )
+                after = sum(int(x) for x in sizes.split())
+                return before, after, max(0, removable - after)
+
+            old = sorted(p for p in (shared / "pack").iterdir() if p.is_file())
+            new: list[Path] = []
+            if oids:
+                name = _run_git(
+                    ["pack-objects", "-q", str(tmp / "pack")], cwd=view, input="".join(f"{oid}\n" for oid in oids)
+                ).strip()
+                # The objects came from promisor remotes (blobs may be missing); keep the marker.
+                (tmp / f"pack-{name}.promisor").write_text("", encoding="utf-8")
+                new = [tmp / f"pack-{name}.{ext}" for ext in ("pack", "promisor", "idx")]
+            kept_names = {p.name for p in new}
+            for src in new:  # .idx last: never an index without its pack
+                if not (shared / "pack" / src.name).exists():
+                    os.rename(src, shared / "pack" / src.name)
+            for path in sorted((p for p in old if p.name not in kept_names), key=lambda p: p.suffix != ".idx"):
+                path.unlink()
+            for loose in shared.iterdir():
+                if re.fullmatch(r"[0-9a-f]{2}", loose.name) and loose.is_dir():
+                    shutil.rmtree(loose)
+
+        kept = set(commits)
+        for key in roots:
+            shallow = cache_root / key / ".git" / "shallow"
+            try:
+                lines = shallow.read_text(encoding="utf-8").split()
+            except FileNotFoundError:
+                continue
+            keep = [c for c in lines if c in kept]
+            if keep != lines:
+                tmp_file = shallow.with_name(f"shallow.tmp-{os.getpid()}")
+                tmp_file.write_text("".join(f"{c}\n" for c in keep), encoding="utf-8")
+                os.replace(tmp_file, shallow)
+        after = _tree_bytes(shared)
+        return before, after, max(0, removable - after)
+
+
+def _lock_pins(lock_paths: Iterable[Path]) -> dict[str, set[str]]:
+    """Repo key -> pinned commits, for every `owner/repo@commit` ref in the given locks."""
+
+    pins: dict[str, set[str]] = {}
+    for path in lock_paths:
+        try:
+            obj = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError as e:
+            raise GcError(f"File not found: {path}") from e
+        except json.JSONDecodeError as e:
+            raise GcError(f"Invalid JSON: {path}: {e}") from e
+        skills = obj.get("skills") if isinstance(obj, dict) else None
+        if not isinstance(skills, list):
+            raise GcError(f"{path}: skills must be a list")
+        for item in skills:
+            ref = item.get("ref") if isinstance(item, dict) else None
+            if not isinstance(ref, str) or "@" not in ref:
+                continue
+            repo_part, commit = ref.rsplit("@", 1)
+            owner, _, repo = repo_part.partition("/")
+            if owner.strip() and repo.strip() and commit.strip():
+                pins.setdefault(f"{owner.strip()}__{repo.strip()}", set()).add(commit.strip().lower())
+    return pins
+
+
+def run_gc(
+    *,
+    cache_root: Optional[Path],
+    pins: Optional[dict[str, set[str]]],
+    backup_dirs: list[Path],
+    policy: GcPolicy,
+    dry_run: bool = False,
+    log: Callable[[str], None] = print,
+) -> int:
+    """Apply `policy` and return the bytes reclaimed (or that would be, with dry_run).
+
+    pins (repo key -> commits of every known lock) drives the repo cache: repos without
+    pins are eviction candidates and pruning keeps only what pinned commits reach. With
+    pins=None the repo cache is left alone.
+    """
+
+    now = time.time()
+    verb = "WOULD REMOVE" if dry_run else "REMOVE"
+    reclaimed = 0
+
+    backups = select_backups(find_backups(backup_dirs), policy=policy, now=now)
+    temp_dirs = list(backup_dirs) + ([cache_root] if cache_root is not None else [])
+    stale = find_stale_temp(temp_dirs, older_than=policy.stale_temp_days * 86400, now=now)
+    for path in [*(b.path for b in backups), *stale]:
+        size = reclaimable_bytes([path])
+        log(f"{verb} {path} ({format_bytes(size)})")
+        reclaimed += size
+        if not dry_run:
+            _remove(path)
+
+    if cache_root is None or pins is None:
+        return reclaimed
+
+    repos = find_repos(cache_root)
+    cache_bytes = sum(r.size for r in repos) + _tree_bytes(cache_root / SHARED_OBJECTS_DIR)
+    evicted = select_repos(repos, referenced=set(pins), cache_bytes=cache_bytes, policy=policy, now=now)
+    for r in evicted:
+        days = (now - r.last_used) / 86400
+        log(f"{'WOULD EVICT' if dry_run else 'EVICT'} {r.key} ({format_bytes(r.size)}, unused for {days:.0f} days)")
+        reclaimed += r.size
+        if not dry_run:
+            _evict_repo(cache_root=cache_root, repo=r)
+    left = cache_bytes - sum(r.size for r in evicted)
+
+    if policy.prune_objects:
+        # Keep what known locks pin, plus whatever the remaining unreferenced repos fetched.
+        roots = {k: set(v) for k, v in pins.items()}
+        gone = {r.key for r in evicted}
+        for r in repos:
+            if r.key not in pins and r.key not in gone:
+                try:
+                    roots[r.key] = set((r.path / ".git" / "shallow").read_text(encoding="utf-8").split())
+                except FileNotFoundError:
+                    roots[r.key] = set()
+        before, after, freed = prune_objects(cache_root=cache_root, roots=roots, dry_run=dry_run)
+        label = "WOULD PRUNE" if dry_run else "PRUNE"
+        log(f"{label} shared objects ({format_bytes(before)} -> {format_bytes(after)}, {format_bytes(freed)} freed)")
+        reclaimed += freed
+        left -= before - after
+    if policy.cache_budget is not None and left > policy.cache_budget:
+        log(
+            f"NOTE: the repo cache stays over budget ({format_bytes(left)} > {format_bytes(policy.cache_budget)}): "
+            "the rest is pinned repos and shared objects"
+            + ("" if policy.prune_objects else "; `skills_gc.py` with every lock also prunes shared objects")
+        )
+    return reclaimed
+
+
+def _size_arg(text: str) -> int:
+    try:
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(
+        description="Reclaim disk used by the skill repo cache and by install backups (*.bak.<timestamp>)."
+    )
+    ap.add_argument(
+        "--repo-cache",
+        default=str(Path.home() / ".config" / "opencode" / "skill-repos"),
+        help="Local git repo cache directory",
+    )
+    ap.add_argument("--lock", action="append", default=[], help="A skills lock whose repos stay cached (repeatable)")
+    ap.add_argument(
+        "--workspace",
+        action="append",
+        default=[],
+        help="Use the lock and the .opencode/skills backups of every project under this directory (repeatable)",
+    )
+    ap.add_argument(
+        "--backups",
+        action="append",
+        default=[],
+        help="Directory holding <name>.bak.<timestamp> backups, e.g. a skills dir or ~/.claude (repeatable)",
+    )
+    ap.add_argument("--keep-backups", type=int, default=3, help="Newest backups kept per entry (default: 3)")
+    ap.add_argument("--max-backup-age-days", type=float, help="Also remove backups older than this")
+    ap.add_argument("--max-backup-bytes", type=_size_arg, help="Also remove oldest backups while they exceed this (e.g. 500M)")
+    ap.add_argument(
+        "--max-repo-age-days",
+        type=float,
+        default=30.0,
+        help="Evict cached repos no known lock pins after this many days unused (default: 30)",
+    )
+    ap.add_argument(
+        "--cache-budget",
+        type=_size_arg,
+        help="Also evict unpinned repos, least recently used first, while the cache is larger (e.g. 2G)",
+    )
+    ap.add_argument("--no-prune", action="store_true", help="Do not repack the shared object store")
+    ap.add_argument("--dry-run", action="store_true", help="Only report what would be removed and the space reclaimed")
+    args = ap.parse_args(argv)
+
+    backup_dirs = [Path(d) for d in args.backups]
+    lock_paths = [Path(p) for p in args.lock]
+    try:
+        for sources, lock in discover_projects(Path(w) for w in args.workspace):
+            backup_dirs.append(sources.parent / "skills")
+            if lock is not None:
+                lock_paths.append(lock)
+        pins = _lock_pins(lock_paths) if lock_paths else None
+        if pins is None:
+            print("NOTE: no --lock/--workspace given; leaving the repo cache alone", file=sys.stderr)
+
+        policy = GcPolicy(
+            keep_backups=max(0, args.keep_backups),
+            max_backup_age_days=args.max_backup_age_days,
+            max_backup_bytes=args.max_backup_bytes,
+            max_repo_age_days=args.max_repo_age_days,
+            cache_budget=args.cache_budget,
+            prune_objects=not args.no_prune,
+        )
+        reclaimed = run_gc(
+            cache_root=Path(args.repo_cache),
+            pins=pins,
+            backup_dirs=backup_dirs,
+            policy=policy,
+            dry_run=bool(args.dry_run),
+        )
+    except (GcError, ValidationError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{'Would reclaim' if args.dry_run else 'Reclaimed'} {format_bytes(reclaimed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+import skills_trace
+
+
+class GitError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    oid: str
+    type: str  # blob | tree | commit | tag
+    size: int
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    mode: str  # e.g. 100644, 100755, 120000, 160000
+    type: str  # blob | tree | commit (submodule)
+    oid: str
+    path: str  # full path from the repo root (POSIX)
+
+
+def git_env() -> dict[str, str]:
+    env = os.environ.copy()
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    env["GCM_INTERACTIVE"] = "never"
+    return env
+
+
+class _BatchProcess:
+    """One long-lived `git cat-file <mode>` process speaking the batch protocol."""
+
+    def __init__(self, *, repo_dir: Path, mode: str, allow_fetch: bool) -> None:
+        # In a partial clone, reading a missing blob lazily fetches it from the promisor
+        # remote; protocol.allow=never turns that into an error instead.
+        config = [] if allow_fetch else ["-c", "protocol.allow=never"]
+        skills_trace.add(subprocesses=1)
+        self._proc = subprocess.Popen(
+            ["git", *config, "cat-file", mode],
+            cwd=str(repo_dir),
+            env=git_env(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @property
+    def stdout(self) -> IO[bytes]:
+        assert self._proc.stdout is not None
+        return self._proc.stdout
+
+    def request(self, spec: str) -> Optional[ObjectInfo]:
+        if "\n" in spec:
+            raise GitError(f"Invalid object name: {spec!r}")
+        assert self._proc.stdin is not None
+        try:
+            self._proc.stdin.write(spec.encode("utf-8") + b"\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise GitError(f"git cat-file exited unexpectedly: {e}") from e
+
+        header = self.stdout.readline()
+        if not header:
+            raise GitError("git cat-file exited unexpectedly")
+        parts = header.decode("utf-8", errors="replace").rstrip("\n").split(" ")
+        if parts[-1] in {"missing", "ambiguous"}:
+            return None
+        if len(parts) != 3:
+            raise GitError(f"Unexpected git cat-file output: {header!r}")
+        return ObjectInfo(oid=parts[0], type=parts[1], size=int(parts[2]))
+
+    def close(self) -> None:
+        if self._proc.stdin is not None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self._proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+        if self._proc.stdout is not None:
+            self._proc.stdout.close()
+
+
+class GitObjectReader:
+    """Read objects from one repo through persistent `git cat-file` pipes.
+
+    A single `--batch-check` process answers existence/size queries and a single
+    `--batch` process streams object contents, so reading a whole skill costs two
+    process spawns instead of one per file. Both processes start lazily; calls are
+    serialized, so one reader can be shared between threads. With allow_fetch=False
+    the reader never touches the network, even in a partial clone.
+    """
+
+    def __init__(self, repo_dir: Path, *, allow_fetch: bool = True) -> None:
+        self.repo_dir = repo_dir
+        self._allow_fetch = allow_fetch
+        self._lock = threading.Lock()
+        self._check: Optional[_BatchProcess] = None
+        self._batch: Optional[_BatchProcess] = None
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for proc in (self._check, self._batch):
+                if proc is not None:
+                    proc.close()
+            self._check = None
+            self._batch = None
+
+    def info(self, spec: str) -> Optional[ObjectInfo]:
+        """Return type/size for an object name (e.g. `<commit>:<path>`), or None if missing."""
+
+        with self._lock:
+            if self._check is None:
+                self._check = _BatchProcess(
+                    repo_dir=self.repo_dir, mode="--batch-check", allow_fetch=self._allow_fetch
+                )
+            return self._check.request(spec)
+
+    def read(self, spec: str) -> tuple[ObjectInfo, bytes]:
+        with self._lock:
+            if self._batch is None:
+                self._batch = _BatchProcess(
+                    repo_dir=self.repo_dir, mode="--batch", allow_fetch=self._allow_fetch
+                )
+            info = self._batch.request(spec)
+            if info is None:
+                raise GitError(f"Object not found: {spec}")
+            data = self._batch.stdout.read(info.size)
+            trailer = self._batch.stdout.read(1)
+            if len(data) != info.size or trailer != b"\n":
+                raise GitError(f"Truncated git cat-file output for {spec}")
+            return info, data
+
+    def read_blob(self, spec: str) -> bytes:
+        info, data = self.read(spec)
+        if info.type != "blob":
+            raise GitError(f"Expected a blob at {spec}, got {info.type}")
+        return data
+
+    def lookup(self, commit: str, path: str) -> Optional[TreeEntry]:
+        """Find one path at `commit` by reading its parent tree (never needs the blob itself)."""
+
+        parent, _, name = path.rpartition("/")
+        try:
+            info, data = self.read(f"{commit}:{parent}" if parent else f"{commit}^{{tree}}")
+        except GitError:
+            return None
+        if info.type != "tree":
+            return None
+        for entry in self._entries(data, prefix=f"{parent}/" if parent else "", oid_len=len(info.oid) // 2):
+            if entry.path == path:
+                return entry
+        return None
+
+    def iter_tree(self, commit: str, root: str) -> Iterator[TreeEntry]:
+        """Recursively list the files under `root` at `commit`, in git tree (sorted path) order."""
+
+        info, data = self.read(f"{commit}:{root}" if root else f"{commit}^{{tree}}")
+        if info.type != "tree":
+            raise GitError(f"Expected a tree at {commit}:{root}, got {info.type}")
+        yield from self._walk(data, prefix=f"{root}/" if root else "", oid_len=len(info.oid) // 2)
+
+    def _walk(self, data: bytes, *, prefix: str, oid_len: int) -> Iterator[TreeEntry]:
+        for entry in self._entries(data, prefix=prefix, oid_len=oid_len):
+            if entry.type == "tree":
+                _, sub = self.read(entry.oid)
+                yield from self._walk(sub, prefix=f"{entry.path}/", oid_len=oid_len)
+            else:
+                yield entry
+
+    @staticmethod
+    def _entries(data: bytes, *, prefix: str, oid_len: int) -> Iterator[TreeEntry]:
+        # Raw tree object: repeated "<mode> <name>\0<binary oid>".
+        pos = 0
+        while pos < len(data):
+            sp = data.index(b" ", pos)
+            nul = data.index(b"\0", sp)
+            mode = data[pos:sp].decode("ascii")
+            name = data[sp + 1 : nul].decode("utf-8", errors="surrogateescape")
+            oid = data[nul + 1 : nul + 1 + oid_len].hex()
+            pos = nul + 1 + oid_len
+
+            path = prefix + name
+            if mode == "40000":
+                yield TreeEntry(mode="040000", type="tree", oid=oid, path=path)
+            elif mode == "160000":
+                yield TreeEntry(mode=mode, type="commit", oid=oid, path=path)
+            else:
+                yield TreeEntry(mode=mode.rjust(6, "0"), type="blob", oid=oid, path=path)
@@ -3,19 +3,43 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
 import json
 import os
+import re
 import shutil
 import subprocess
 import sys
-import tempfile
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
+from urllib.parse import urlparse
 
-from skills_common import sha256_tree
-from skills_scan import scan_skill_dir
+import skills_trace
+from skills_bundle import BundleDir, BundleError
+from skills_common import (
+    SHARED_OBJECTS_DIR,
+    TreeHasher,
+    file_lock,
+    merkle_root,
+    objects_lock_path,
+    repo_lock_path,
+    sha256_file,
+    sha256_tree,
+    sha256_tree_files,
+    tree_relpaths,
+)
+from skills_digest_cache import DigestCache, DigestCacheError
+from skills_gc import GcError, GcPolicy, parse_size, run_gc
+from skills_git import GitError, GitObjectReader, TreeEntry, git_env
+from skills_scan import iter_skill_files, scan_policy_fingerprint
+from skills_scan_cache import ScanCache, ScanCacheError
+from skills_store import ObjectStore, reflink_or_copy
+from skills_validate import ValidationError, discover_projects, load_global_policy, validate_many
 from skills_validate import validate as validate_sources_and_locks
 
 
@@ -29,6 +53,20 @@ class SkillLock:
     source_id: str
     ref: str  # owner/repo@<commit>
     sha256: str
+    # Lock v2 only: per-file sha256 by POSIX relpath, and the merkle_root over them.
+    merkle_root: Optional[str] = None
+    files: Optional[dict[str, str]] = field(default=None, compare=False)
+
+
+@dataclass(frozen=True)
+class RepoPlan:
+    owner: str
+    repo: str
+    commits: tuple[str, ...]  # distinct pinned commits, in lock order
+
+    @property
+    def key(self) -> str:
+        return f"{self.owner}__{self.repo}"
 
 
 def _load_json(path: Path) -> dict:
@@ -40,10 +78,29 @@ def _load_json(path: Path) -> dict:
         raise InstallError(f"Invalid JSON: {path}: {e}") from e
 
 
-def _parse_lock(path: Path) -> list[SkillLock]:
+_LOCK_VERSIONS = (1, 2)
+
+
+def _parse_lock_files(idx: int, it: dict) -> tuple[str, dict[str, str]]:
+    root = it.get("merkleRoot")
+    files = it.get("files")
+    if not isinstance(root, str) or not root.strip():
+        raise InstallError(f"Lock.skills[{idx}].merkleRoot must be a non-empty string")
+    if not isinstance(files, dict) or not files:
+        raise InstallError(f"Lock.skills[{idx}].files must be a non-empty object")
+    if not all(isinstance(k, str) and isinstance(v, str) for k, v in files.items()):
+        raise InstallError(f"Lock.skills[{idx}].files must map paths to sha256 strings")
+    digests = {rel: digest.lower() for rel, digest in files.items()}
+    if merkle_root(digests) != root.strip().lower():
+        raise InstallError(f"Lock.skills[{idx}].merkleRoot does not match its files")
+    return root.strip().lower(), digests
+
+
+def parse_lock(path: Path) -> list[SkillLock]:
     obj = _load_json(path)
-    if obj.get("version") != 1:
-        raise InstallError(f"Unsupported lock version: {obj.get('version')!r} (expected 1)")
+    version = obj.get("version")
+    if version not in _LOCK_VERSIONS:
+        raise InstallError(f"Unsupported lock version: {version!r} (expected 1 or 2)")
     skills = obj.get("skills")
     if not isinstance(skills, list):
         raise InstallError("Lock: skills must be a list")
@@ -66,19 +123,102 @@ def _parse_lock(path: Path) -> list[SkillLock]:
             raise InstallError(f"Lock.skills[{idx}].sha256 must be a non-empty string")
         if not all(x.strip() for x in [name, source_id, ref, sha256]):
             raise InstallError(f"Lock.skills[{idx}] must contain non-empty name/sourceId/ref/sha256")
-        out.append(SkillLock(name=name.strip(), source_id=source_id.strip(), ref=ref.strip(), sha256=sha256.strip()))
+        root, files = _parse_lock_files(idx, it) if version == 2 else (None, None)
+        out.append(
+            SkillLock(
+                name=name.strip(),
+                source_id=source_id.strip(),
+                ref=ref.strip(),
+                sha256=sha256.strip(),
+                merkle_root=root,
+                files=files,
+            )
+        )
     return out
 
 
-def _run_git(args: list[str], *, cwd: Path) -> str:
-    env = os.environ.copy()
-    env["GIT_TERMINAL_PROMPT"] = "0"
-    env["GCM_INTERACTIVE"] = "never"
+class _Concurrency:
+    """Locks shared by install workers.
+
+    - One lock per cached repo dir: git work inside a repo is serialized, both between
+      threads and, through an advisory file lock beside the repo, between processes
+      sharing the repo cache. The shared object store is held shared meanwhile, so gc
+      never rewrites it under a running install.
+    - One semaphore per remote host: bounds concurrent network fetches.
+    """
+
+    def __init__(self, *, per_host: int, lock_dir: Path) -> None:
+        self._per_host = max(1, per_host)
+        self._lock_dir = lock_dir
+        self._guard = threading.Lock()
+        self._repo_locks: dict[str, threading.Lock] = {}
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+
+    @contextlib.contextmanager
+    def repo_lock(self, key: str) -> Iterator[None]:
+        with self._guard:
+            lock = self._repo_locks.get(key)
+            if lock is None:
+                lock = self._repo_locks[key] = threading.Lock()
+        lock_path = repo_lock_path(self._lock_dir, key)
+        with lock, file_lock(objects_lock_path(self._lock_dir), shared=True), file_lock(lock_path):
+            # The lock file's mtime records when the repo was last used (gc evicts LRU).
+            os.utime(lock_path)
+            yield
+
+    def host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._guard:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self._per_host)
+            return slot
+
+
+def _repo_url(owner: str, repo: str) -> str:
+    return f"https://github.com/{owner}/{repo}.git"
+
+
+def _parse_ref(ref: str) -> tuple[str, str, str]:
+    if "@" not in ref:
+        raise InstallError(f"Invalid ref (expected owner/repo@commit): {ref!r}")
+    repo_part, commit = ref.rsplit("@", 1)
+    if "/" not in repo_part:
+        raise InstallError(f"Invalid ref (expected owner/repo@commit): {ref!r}")
+    owner, repo = repo_part.split("/", 1)
+    owner = owner.strip()
+    repo = repo.strip()
+    commit = commit.strip().lower()
+    if not owner or not repo or not commit:
+        raise InstallError(f"Invalid ref (expected owner/repo@commit): {ref!r}")
+    return owner, repo, commit
+
+
+def _plan_repos(locks: list[SkillLock]) -> dict[str, RepoPlan]:
+    """Group lock entries by repo so each repo is fetched once, for all of its commits."""
+
+    commits_by_repo: dict[tuple[str, str], list[str]] = {}
+    for lock in locks:
+        owner, repo, commit = _parse_ref(lock.ref)
+        commits = commits_by_repo.setdefault((owner, repo), [])
+        if commit not in commits:
+            commits.append(commit)
+
+    plans = [RepoPlan(owner=o, repo=r, commits=tuple(c)) for (o, r), c in commits_by_repo.items()]
+    return {p.key: p for p in plans}
+
+
+def _repo_host(owner: str, repo: str) -> str:
+    return urlparse(_repo_url(owner, repo)).hostname or ""
+
+
+def _run_git(args: list[str], *, cwd: Path, input: Optional[str] = None) -> str:
+    skills_trace.add(subprocesses=1)
     p = subprocess.run(
         ["git", *args],
         cwd=str(cwd),
-        env=env,
+        env=git_env(),
         text=True,
+        input=input,
         capture_output=True,
     )
     if p.returncode != 0:
@@ -86,58 +226,366 @@ def _run_git(args: list[str], *, cwd: Path) -> str:
     return p.stdout
 
 
+# Object directory shared by every cached repo through git alternates: objects fetched
+# for one repo are visible to all others, so forks and repos pinned by many installers
+# reuse each other's fetches. Fetched packs are moved there from the repo's own store.
+# This is its alternates entry, relative to <cache>/<owner>__<repo>/.git/objects.
+_SHARED_ALTERNATE = f"../../../{SHARED_OBJECTS_DIR}"
+
+
 def _ensure_repo(*, cache_root: Path, owner: str, repo: str) -> Path:
-    repo_dir = cache_root / f"{owner}__{repo}"
+    """Create (if needed) the cached repo and link it to the shared object store.
+
+    Caller holds the repo lock. The repo is initialized in a temporary dir and renamed
+    into place, so an interrupted init never leaves a half-configured repo behind.
+    """
+
+    repo_dir = _repo_dir(cache_root=cache_root, owner=owner, repo=repo)
     if repo_dir.exists() and not (repo_dir / ".git").exists():
         raise InstallError(f"Repo cache path exists but is not a git repo: {repo_dir}")
 
     if not repo_dir.exists():
-        repo_dir.mkdir(parents=True, exist_ok=True)
-        _run_git(["init"], cwd=repo_dir)
-        _run_git(["remote", "add", "origin", f"https://github.com/{owner}/{repo}.git"], cwd=repo_dir)
+        tmp = cache_root / f".{repo_dir.name}.init-{os.getpid()}-{os.urandom(4).hex()}"
+        try:
+            tmp.mkdir(parents=True)
+            _run_git(["init", "-q"], cwd=tmp)
+            _run_git(["remote", "add", "origin", _repo_url(owner, repo)], cwd=tmp)
+            os.rename(tmp, repo_dir)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    (cache_root / SHARED_OBJECTS_DIR / "pack").mkdir(parents=True, exist_ok=True)
+    alternates = repo_dir / ".git" / "objects" / "info" / "alternates"
+    try:
+        current = alternates.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        current = []
+    if _SHARED_ALTERNATE not in current:
+        alternates.parent.mkdir(parents=True, exist_ok=True)
+        alternates.write_text("".join(f"{line}\n" for line in [*current, _SHARED_ALTERNATE]), encoding="utf-8")
+    _share_objects(repo_dir)
     return repo_dir
 
 
-def _fetch_commit(*, repo_dir: Path, commit: str) -> None:
-    # Fetch just the commit we need.
-    _run_git(["fetch", "--depth", "1", "origin", commit], cwd=repo_dir)
+@skills_trace.traced("share_objects")
+def _share_objects(repo_dir: Path) -> None:
+    """Move the repo's packs into the shared object store (caller holds the repo lock).
 
+    Each pack's .idx moves last, so other repos never see an index without its pack.
+    """
 
-def _git_has_path(*, repo_dir: Path, commit: str, path: str) -> bool:
-    p = subprocess.run(
-        ["git", "cat-file", "-e", f"{commit}:{path}"],
-        cwd=str(repo_dir),
-        text=True,
-        capture_output=True,
+    pack_dir = repo_dir / ".git" / "objects" / "pack"
+    shared = repo_dir.parent / SHARED_OBJECTS_DIR / "pack"
+    if not shared.is_dir():
+        return
+    for idx in sorted(pack_dir.glob("pack-*.idx")):
+        stem = idx.name[: -len(".idx")]
+        parts = [p for p in pack_dir.glob(f"{stem}.*") if p.suffix != ".idx"] + [idx]
+        for src in parts:
+            dst = shared / src.name
+            if dst.exists():
+                src.unlink()  # same name, same content (packs are named by their hash)
+            else:
+                os.rename(src, dst)
+
+
+def _repo_dir(*, cache_root: Path, owner: str, repo: str) -> Path:
+    return cache_root / f"{owner}__{repo}"
+
+
+def _missing_commits(*, repo_dir: Path, commits: tuple[str, ...]) -> list[str]:
+    """Return the commits that are not yet in the cached repo (local check, no network)."""
+
+    if not (repo_dir / ".git").exists():
+        return list(commits)
+    # Pinned commits never change, so presence in the object store is enough.
+    # protocol.allow=never keeps a partial clone from lazily fetching a missing commit.
+    out = _run_git(
+        ["-c", "protocol.allow=never", "cat-file", "--batch-check=%(objectname)"],
+        cwd=repo_dir,
+        input="".join(f"{c}^{{commit}}\n" for c in commits),
+    )
+    found = {line.strip() for line in out.splitlines() if not line.endswith(" missing")}
+    return [c for c in commits if c not in found]
+
+
+@skills_trace.traced("fetch_commits")
+def _fetch_commits(*, repo_dir: Path, commits: tuple[str, ...]) -> None:
+    # Fetch just the commits we need, in a single round trip. Partial clone: commits and
+    # trees only; blobs are fetched per skill by _fetch_missing_blobs. unpackLimit=1
+    # keeps even tiny fetches as one pack, which _share_objects can move as a unit.
+    _run_git(
+        ["-c", "fetch.unpackLimit=1", "fetch", "--depth", "1", "--filter=blob:none", "origin", *commits],
+        cwd=repo_dir,
+    )
+    _share_objects(repo_dir)
+
+
+@skills_trace.traced("fetch_blobs")
+def _fetch_missing_blobs(
+    *,
+    repo_dir: Path,
+    commit: str,
+    root: str,
+    entries: list[TreeEntry],
+    offline: bool,
+    host_slot: threading.BoundedSemaphore,
+) -> None:
+    """Fetch, in one request, the blobs under a skill root that the partial clone lacks."""
+
+    # rev-list --missing=print lists absent objects ("?<oid>") without lazily fetching them.
+    # Listing the skill's tree (not the commit) walks no history: a commit borrowed from
+    # the shared object store has no shallow boundary in this repo.
+    out = _run_git(
+        ["-c", "protocol.allow=never", "rev-list", "--objects", "--missing=print", f"{commit}:{root}"],
+        cwd=repo_dir,
     )
-    return p.returncode == 0
+    absent = {line[1:].strip() for line in out.splitlines() if line.startswith("?")}
+    missing = [e for e in entries if e.oid in absent]
+    if not missing:
+        return
+    if offline:
+        paths = "\n".join(f"  {e.path}" for e in missing)
+        raise InstallError(f"Offline mode: blobs missing from the repo cache at {commit}:\n{paths}")
+
+    oids = sorted({e.oid for e in missing})
+    with host_slot:
+        _run_git(
+            [
+                "-c",
+                "fetch.negotiationAlgorithm=noop",
+                "-c",
+                "fetch.unpackLimit=1",
+                "fetch",
+                "origin",
+                "--no-tags",
+                "--no-write-fetch-head",
+                "--recurse-submodules=no",
+                "--filter=blob:none",
+                "--stdin",
+            ],
+            cwd=repo_dir,
+            input="".join(f"{oid}\n" for oid in oids),
+        )
+    _share_objects(repo_dir)
+
+
+@skills_trace.traced("prepare_repo")
+def _prepare_repo(
+    *,
+    repo_cache_root: Path,
+    plan: RepoPlan,
+    prepared: dict[str, GitObjectReader],
+    limits: _Concurrency,
+    offline: bool,
+) -> GitObjectReader:
+    """Ensure the cached repo holds every commit of its plan (caller holds the repo lock).
+
+    Commits already in the cache are never fetched again; in offline mode a missing
+    commit is an error instead of a fetch. Returns the repo's shared object reader.
+    """
+
+    reader = prepared.get(plan.key)
+    if reader is not None:
+        return reader
+
+    if offline:
+        repo_dir = _repo_dir(cache_root=repo_cache_root, owner=plan.owner, repo=plan.repo)
+        missing = _missing_commits(repo_dir=repo_dir, commits=plan.commits)
+        if missing:
+            raise InstallError(_format_missing({plan.key: plan}, {plan.key: missing}))
+    else:
+        repo_dir = _ensure_repo(cache_root=repo_cache_root, owner=plan.owner, repo=plan.repo)
+        missing = _missing_commits(repo_dir=repo_dir, commits=plan.commits)
+        if missing:
+            with limits.host_slot(_repo_host(plan.owner, plan.repo)):
+                _fetch_commits(repo_dir=repo_dir, commits=tuple(missing))
+    reader = prepared[plan.key] = GitObjectReader(repo_dir, allow_fetch=not offline)
+    return reader
+
+
+_GIT_COMMIT_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _match_ls_remote(ref: str, listing: dict[str, str]) -> Optional[str]:
+    # A full refname or HEAD first, then a branch, then a tag (peeled to its commit).
+    for name in (ref, f"refs/heads/{ref}", f"refs/tags/{ref}^{{}}", f"refs/tags/{ref}"):
+        if name in listing:
+            return listing[name]
+    return None
+
+
+def resolve_refs(
+    *,
+    repo_cache_root: Path,
+    refs: list[tuple[str, str, str]],
+    jobs: int = 1,
+    per_host_jobs: int = 4,
+) -> dict[tuple[str, str, str], str]:
+    """Resolve (owner, repo, ref) to 40-hex commits with one `git ls-remote` per repo.
+
+    ref is "HEAD" (the default branch), a branch, a tag or a full refname; a 40-hex
+    commit is returned as is, without any git work. Repos are queried concurrently.
+    """
+
+    out: dict[tuple[str, str, str], str] = {}
+    by_repo: dict[tuple[str, str], list[str]] = {}
+    for owner, repo, ref in refs:
+        if _GIT_COMMIT_RE.fullmatch(ref.lower()):
+            out[(owner, repo, ref)] = ref.lower()
+        elif ref not in by_repo.setdefault((owner, repo), []):
+            by_repo[(owner, repo)].append(ref)
+    limits = _Concurrency(per_host=per_host_jobs, lock_dir=repo_cache_root)
+
+    def resolve(item: tuple[tuple[str, str], list[str]]) -> dict[tuple[str, str, str], str]:
+        (owner, repo), names = item
+        with limits.repo_lock(f"{owner}__{repo}"):
+            repo_dir = _ensure_repo(cache_root=repo_cache_root, owner=owner, repo=repo)
+            with limits.host_slot(_repo_host(owner, repo)):
+                text = _run_git(["ls-remote", "origin", *names], cwd=repo_dir)
+        listing: dict[str, str] = {}
+        for line in text.splitlines():
+            commit, _, name = line.partition("\t")
+            listing[name.strip()] = commit.strip().lower()
+        resolved: dict[tuple[str, str, str], str] = {}
+        for name in names:
+            commit = _match_ls_remote(name, listing)
+            if commit is None:
+                raise InstallError(f"Cannot resolve {owner}/{repo}@{name}: no such branch or tag")
+            resolved[(owner, repo, name)] = commit
+        return resolved
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for resolved in pool.map(resolve, list(by_repo.items())):
+            out.update(resolved)
+    return out
+
+
+def _format_missing(plans: dict[str, RepoPlan], missing: dict[str, list[str]]) -> str:
+    refs = [f"{plans[k].owner}/{plans[k].repo}@{c}" for k, commits in missing.items() for c in commits]
+    return "Offline mode: commits missing from the repo cache:\n" + "\n".join(f"  {r}" for r in refs)
+
+
+def _check_offline(*, repo_cache_root: Path, plans: dict[str, RepoPlan]) -> None:
+    """Fail fast, before installing anything, if the cache cannot satisfy every plan."""
+
+    missing: dict[str, list[str]] = {}
+    for plan in plans.values():
+        repo_dir = _repo_dir(cache_root=repo_cache_root, owner=plan.owner, repo=plan.repo)
+        if repo_dir.exists() and not (repo_dir / ".git").exists():
+            raise InstallError(f"Repo cache path exists but is not a git repo: {repo_dir}")
+        commits = _missing_commits(repo_dir=repo_dir, commits=plan.commits)
+        if commits:
+            missing[plan.key] = commits
+    if missing:
+        raise InstallError(_format_missing(plans, missing))
+
+
+def _git_has_path(*, reader: GitObjectReader, commit: str, path: str) -> bool:
+    # Tree lookup only: in a partial clone the blob itself may not be fetched yet.
+    try:
+        return reader.lookup(commit, path) is not None
+    except GitError as e:
+        raise InstallError(str(e)) from e
 
 
-def _resolve_skill_root(*, repo_dir: Path, commit: str, skill_name: str) -> str:
+def _resolve_skill_root(*, reader: GitObjectReader, commit: str, skill_name: str) -> str:
     candidates = [f"{skill_name}/SKILL.md", f"skills/{skill_name}/SKILL.md"]
     for c in candidates:
-        if _git_has_path(repo_dir=repo_dir, commit=commit, path=c):
+        if _git_has_path(reader=reader, commit=commit, path=c):
             return c[: -len("/SKILL.md")]
     raise InstallError(
         f"Skill '{skill_name}' not found at '{skill_name}/SKILL.md' or 'skills/{skill_name}/SKILL.md' in commit {commit}"
     )
 
 
-def _git_list_files(*, repo_dir: Path, commit: str, root: str) -> list[str]:
-    out = _run_git(["ls-tree", "-r", "--name-only", commit, root], cwd=repo_dir)
-    files = [line.strip() for line in out.splitlines() if line.strip()]
+def _git_list_files(*, reader: GitObjectReader, commit: str, root: str) -> list[TreeEntry]:
+    try:
+        files = list(reader.iter_tree(commit, root))
+    except GitError as e:
+        raise InstallError(f"Failed to list {commit}:{root}: {e}") from e
+    for entry in files:
+        if entry.type != "blob":
+            raise InstallError(f"Submodules are not supported in skills: {entry.path}")
     return files
 
 
-def _git_read_file(*, repo_dir: Path, commit: str, path: str) -> bytes:
-    p = subprocess.run(
-        ["git", "show", f"{commit}:{path}"],
-        cwd=str(repo_dir),
-        capture_output=True,
+def _git_read_file(*, reader: GitObjectReader, entry: TreeEntry) -> bytes:
+    try:
+        return reader.read_blob(entry.oid)
+    except GitError as e:
+        raise InstallError(f"Failed to read {entry.path}: {e}") from e
+
+
+@skills_trace.traced("diff")
+def _diff_skill(*, repo_dir: Path, old: str, new: str, root: str) -> Optional[tuple[list[TreeEntry], list[str]]]:
+    """Files under root that differ between two commits: (added/modified blobs, removed paths).
+
+    Compares trees only, so no blob is read (or fetched). None if the diff cannot be
+    computed locally, e.g. the old commit is no longer in the repo cache.
+    """
+
+    try:
+        out = _run_git(
+            [
+                "-c",
+                "protocol.allow=never",
+                "--literal-pathspecs",
+                "diff-tree",
+                "-r",
+                "-z",
+                "--no-renames",
+                old,
+                new,
+                "--",
+                root,
+            ],
+            cwd=repo_dir,
+        )
+    except InstallError:
+        return None
+
+    # -z raw format: ":<old mode> <new mode> <old oid> <new oid> <status>\0<path>\0" per file.
+    changed: list[TreeEntry] = []
+    removed: list[str] = []
+    fields = out.split("\0")
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if not meta.startswith(":"):
+            break
+        _old_mode, new_mode, _old_oid, new_oid, status = meta[1:].split(" ")
+        if status == "D":
+            removed.append(path)
+        elif new_mode == "160000":
+            raise InstallError(f"Submodules are not supported in skills: {path}")
+        else:
+            changed.append(TreeEntry(mode=new_mode, type="blob", oid=new_oid, path=path))
+    return changed, removed
+
+
+@skills_trace.traced("read_blobs")
+def _read_blobs(
+    *,
+    reader: GitObjectReader,
+    commit: str,
+    root: str,
+    entries: list[TreeEntry],
+    plan: RepoPlan,
+    limits: _Concurrency,
+    offline: bool,
+) -> list[tuple[str, bytes]]:
+    """(relpath under root, bytes) for entries, fetching absent blobs first (caller holds the repo lock)."""
+
+    _fetch_missing_blobs(
+        repo_dir=reader.repo_dir,
+        commit=commit,
+        root=root,
+        entries=entries,
+        offline=offline,
+        host_slot=limits.host_slot(_repo_host(plan.owner, plan.repo)),
     )
-    if p.returncode != 0:
-        raise InstallError(f"git show failed for {commit}:{path}")
-    return p.stdout
+    blobs = [(e.path[len(root) + 1 :], _git_read_file(reader=reader, entry=e)) for e in entries]
+    skills_trace.add(bytes=sum(len(data) for _rel, data in blobs))
+    return blobs
 
 
 def _write_bytes(path: Path, data: bytes) -> None:
@@ -145,74 +593,964 @@ def _write_bytes(path: Path, data: bytes) -> None:
     path.write_bytes(data)
 
 
+_MANIFEST_VERSION = 1
+
+
+def _manifest_path(*, dest_root: Path, name: str) -> Path:
+    # Kept beside (not inside) the skill dir so it never changes the skill's tree digest.
+    return dest_root / f".{name}.manifest.json"
+
+
+def _stat_tree(root: Path) -> dict[str, os.stat_result]:
+    stats: dict[str, os.stat_result] = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for fn in filenames:
+            p = os.path.join(dirpath, fn)
+            stats[os.path.relpath(p, root).replace(os.sep, "/")] = os.stat(p)
+    return stats
+
+
+def _write_manifest(
+    *,
+    dest_root: Path,
+    lock: SkillLock,
+    digests: dict[str, str],
+    root: Optional[str] = None,
+    scan_policy: Optional[str] = None,
+) -> None:
+    """Record what was installed: lock ref/sha256 plus size, mtime, inode and digest per file.
+
+    root (the skill's path in the repo) and scan_policy (the scan policy fingerprint the
+    files passed under) are recorded when known; they enable incremental upgrades.
+    """
+
+    stats = _stat_tree(dest_root / lock.name)
+    obj: dict[str, object] = {
+        "version": _MANIFEST_VERSION,
+        "name": lock.name,
+        "ref": lock.ref,
+        "sha256": lock.sha256.lower(),
+        "files": {
+            rel: {
+                "size": st.st_size,
+                "mtimeNs": st.st_mtime_ns,
+                "ino": st.st_ino,
+                "sha256": digests[rel],
+            }
+            for rel, st in sorted(stats.items())
+        },
+    }
+    if root is not None:
+        obj["root"] = root
+    if scan_policy is not None:
+        obj["scanPolicy"] = scan_policy
+    path = _manifest_path(dest_root=dest_root, name=lock.name)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_manifest(*, dest_root: Path, name: str) -> Optional[dict]:
+    try:
+        obj = json.loads(_manifest_path(dest_root=dest_root, name=name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(obj, dict) or obj.get("version") != _MANIFEST_VERSION:
+        return None
+    if not isinstance(obj.get("files"), dict):
+        return None
+    return obj
+
+
+def _manifest_files_match(*, manifest: dict, dest_dir: Path) -> bool:
+    """Stat-only check that no installed file changed since the manifest was written."""
+
+    files = manifest["files"]
+    try:
+        stats = _stat_tree(dest_dir)
+    except OSError:
+        return False
+    if set(stats) != set(files):
+        return False
+    for rel, st in stats.items():
+        entry = files[rel]
+        if not isinstance(entry, dict):
+            return False
+        if (entry.get("size"), entry.get("mtimeNs"), entry.get("ino")) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return False
+    return True
+
+
+def _manifest_matches(*, dest_root: Path, lock: SkillLock, scan_policy: str) -> bool:
+    """Stat-only up-to-date check: the manifest pins this lock entry, the files passed the
+    security scan under the current scan policy, and no file changed."""
+
+    manifest = _read_manifest(dest_root=dest_root, name=lock.name)
+    if manifest is None:
+        return False
+    if manifest.get("ref") != lock.ref or manifest.get("sha256") != lock.sha256.lower():
+        return False
+    if manifest.get("scanPolicy") != scan_policy:
+        return False
+    return _manifest_files_match(manifest=manifest, dest_dir=dest_root / lock.name)
+
+
+def _upgradable_from(*, dest_root: Path, lock: SkillLock, scan_policy: str) -> Optional[dict]:
+    """The manifest of an installed skill that `lock` can be applied to as a diff, if any.
+
+    That is an install of another commit of the same repo, recorded with its skill root,
+    scanned under the current scan policy, and unchanged on disk since.
+    """
+
+    manifest = _read_manifest(dest_root=dest_root, name=lock.name)
+    if manifest is None or not isinstance(manifest.get("root"), str):
+        return None
+    if manifest.get("scanPolicy") != scan_policy:
+        return None
+    try:
+        owner, repo, commit = _parse_ref(str(manifest.get("ref")))
+    except InstallError:
+        return None
+    new_owner, new_repo, new_commit = _parse_ref(lock.ref)
+    if (owner, repo) != (new_owner, new_repo) or commit == new_commit:
+        return None
+    if not _manifest_files_match(manifest=manifest, dest_dir=dest_root / lock.name):
+        return None
+    return manifest
+
+
+def _stage_skill(
+    *,
+    dest_root: Path,
+    name: str,
+    files: list[tuple[str, bytes]],
+    digests: dict[str, str],
+    store: Optional[ObjectStore],
+    keep_from: Optional[Path] = None,
+    keep: Iterable[str] = (),
+) -> Path:
+    """Write a verified skill into a hidden staging dir next to its final location.
+
+    Staging on the same filesystem as dest lets the final switch be a rename, so a
+    skill directory is never observed half-written. With an object store, files are
+    reflinked or hardlinked from the store instead of written. Files in `keep` come from
+    the installed skill at keep_from: through the store, else reflinked or copied (never
+    hardlinked, since that install becomes the backup).
+    """
+
+    staging = dest_root / f".{name}.staging-{os.getpid()}-{os.urandom(4).hex()}"
+    staging.mkdir()
+    try:
+        for rel in keep:
+            assert keep_from is not None
+            if store is None:
+                (staging / rel).parent.mkdir(parents=True, exist_ok=True)
+                reflink_or_copy(keep_from / rel, staging / rel)
+            else:
+                store.put(digests[rel], (keep_from / rel).read_bytes())
+                store.materialize(digests[rel], staging / rel)
+        for rel, data in files:
+            if store is None:
+                _write_bytes(staging / rel, data)
+            else:
+                store.put(digests[rel], data)
+                store.materialize(digests[rel], staging / rel)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return staging
+
+
+def _backup_path(*, dest_root: Path, name: str) -> Path:
+    ts = time.strftime("%Y%m%d%H%M%S")
+    bak = dest_root / f"{name}.bak.{ts}"
+    n = 1
+    while bak.exists():
+        bak = dest_root / f"{name}.bak.{ts}.{n}"
+        n += 1
+    return bak
+
+
+def _no_wait() -> None:
+    pass
+
+
+def _replace_dir(
+    *, staging: Path, dest_dir: Path, bak: Optional[Path], wait_turn: Callable[[], None] = _no_wait
+) -> None:
+    """Move `staging` into place with renames only, backing up any existing dest to `bak`.
+
+    wait_turn (see _run_in_order) is called first; if it raises, staging is discarded.
+    """
+
+    try:
+        wait_turn()
+        if bak is not None:
+            os.rename(dest_dir, bak)
+        try:
+            os.rename(staging, dest_dir)
+        except OSError:
+            if bak is not None:
+                os.rename(bak, dest_dir)
+            raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+# HIGH findings listed when a skill fails the security scan.
+_MAX_REPORTED_FINDINGS = 20
+
+
+def _format_drift(*, changed: list[str], missing: list[str], unexpected: list[str]) -> str:
+    groups = (("changed", changed), ("missing", missing), ("unexpected", unexpected))
+    return "; ".join(f"{label}: {', '.join(paths)}" for label, paths in groups if paths)
+
+
+def _file_drift(*, expected: dict[str, str], actual: dict[str, str]) -> str:
+    """Which paths differ between a v2 lock's file digests and actual ones ("" if none)."""
+
+    return _format_drift(
+        changed=sorted(rel for rel in expected.keys() & actual.keys() if expected[rel] != actual[rel]),
+        missing=sorted(expected.keys() - actual.keys()),
+        unexpected=sorted(actual.keys() - expected.keys()),
+    )
+
+
+@skills_trace.traced("hash")
+def _check_against_lock(*, lock: SkillLock, files: list[tuple[str, bytes]]) -> dict[str, str]:
+    """Hash a skill's files (in sha256_tree order) against its lock entry; returns per-file digests.
+
+    With a v2 lock the error names the paths that differ.
+    """
+
+    expected = lock.sha256.lower()
+    hasher = TreeHasher()
+    for rel, data in files:
+        hasher.add(rel, data)
+    computed = hasher.hexdigest()
+    digests = {rel: hashlib.sha256(data).hexdigest() for rel, data in files}
+    skills_trace.add(bytes=sum(len(data) for _rel, data in files))
+    drift = _file_drift(expected=lock.files, actual=digests) if lock.files is not None else ""
+    if computed != expected:
+        detail = f" ({drift})" if drift else ""
+        raise InstallError(f"sha256 mismatch for skill {lock.name!r}: expected {expected}, got {computed}{detail}")
+    if drift:
+        raise InstallError(f"Lock files of skill {lock.name!r} do not match its sha256 ({drift})")
+    return digests
+
+
+@skills_trace.traced("scan")
+def _scan_or_raise(
+    *,
+    name: str,
+    files: list[tuple[str, bytes]],
+    digests: dict[str, str],
+    allowlist_domains: set[str],
+    scan_cache: Optional[ScanCache],
+) -> None:
+    # Only HIGH findings gate the install, and only the first 20 are reported: stop
+    # scanning as soon as we have them.
+    skills_trace.add(bytes=sum(len(data) for _rel, data in files))
+    high = [
+        f
+        for f in iter_skill_files(
+            files=files,
+            allowlist_domains=allowlist_domains,
+            stop_at="HIGH",
+            max_findings=_MAX_REPORTED_FINDINGS,
+            cache=scan_cache,
+            digests=digests,
+        )
+        if f.severity == "HIGH"
+    ]
+    if high:
+        high.sort(key=lambda f: (f.file, f.rule))
+        msg = "\n".join(f"{f.severity}: {f.file}: {f.rule}: {f.message}" for f in high)
+        raise InstallError(
+            f"Security scan failed for skill {name!r} (HIGH findings).\n{msg}\n"
+            "If you trust this skill, you must explicitly waive scanning (not supported by default policy)."
+        )
+
+
+@skills_trace.traced("upgrade")
+def _upgrade_skill(
+    *,
+    dest_root: Path,
+    lock: SkillLock,
+    previous: dict,
+    changed: list[tuple[str, bytes]],
+    removed: list[str],
+    allowlist_domains: set[str],
+    scan_policy: str,
+    store: Optional[ObjectStore],
+    scan_cache: Optional[ScanCache],
+    log: Callable[[str], None],
+    wait_turn: Callable[[], None] = _no_wait,
+) -> bool:
+    """Apply a commit-to-commit diff to an installed skill; False if the result would not match the lock.
+
+    Only changed files are scanned and written; unchanged files were scanned under the
+    same policy when installed and are reflinked or copied into the new version. The complete
+    resulting tree is still hashed against the lock before anything is replaced.
+    """
+
+    dest_dir = dest_root / lock.name
+    old_files: dict[str, dict] = previous["files"]
+    new_data = dict(changed)
+    gone = set(removed)
+    keep = [rel for rel in old_files if rel not in new_data and rel not in gone]
+
+    digests = {rel: hashlib.sha256(data).hexdigest() for rel, data in changed}
+    hasher = TreeHasher()
+    try:
+        for rel in sorted([*keep, *new_data]):
+            if rel in new_data:
+                hasher.add(rel, new_data[rel])
+            else:
+                digests[rel] = str(old_files[rel].get("sha256"))
+                hasher.add(rel, (dest_dir / rel).read_bytes())
+    except OSError:
+        return False
+    if hasher.hexdigest() != lock.sha256.lower():
+        return False
+    if lock.files is not None and digests != lock.files:
+        return False
+    if not changed and not removed:
+        _write_manifest(
+            dest_root=dest_root, lock=lock, digests=digests, root=previous["root"], scan_policy=scan_policy
+        )
+        log(f"SKIP  {lock.name} (already matches lock)")
+        return True
+
+    _scan_or_raise(
+        name=lock.name, files=changed, digests=digests, allowlist_domains=allowlist_domains, scan_cache=scan_cache
+    )
+
+    bak = _backup_path(dest_root=dest_root, name=lock.name)
+    staging = _stage_skill(
+        dest_root=dest_root,
+        name=lock.name,
+        files=changed,
+        digests=digests,
+        store=store,
+        keep_from=dest_dir,
+        keep=keep,
+    )
+    _replace_dir(staging=staging, dest_dir=dest_dir, bak=bak, wait_turn=wait_turn)
+    _write_manifest(
+        dest_root=dest_root, lock=lock, digests=digests, root=previous["root"], scan_policy=scan_policy
+    )
+    log(f"UPDATE {lock.name} ({len(changed)} changed, {len(removed)} removed; backed up to {bak.name})")
+    log(f"INSTALL {lock.name}")
+    return True
+
+
+@skills_trace.traced("check_installed")
+def _check_installed(
+    *,
+    dest_root: Path,
+    lock: SkillLock,
+    allowlist_domains: set[str],
+    scan_policy: str,
+    scan_cache: Optional[ScanCache],
+    log: Callable[[str], None],
+) -> tuple[bool, Optional[dict]]:
+    """Up-to-date check before any git work: (already installed, upgradable manifest).
+
+    Stat-only against the manifest, falling back to a full rehash for installs without
+    a (valid) manifest or scanned under another scan policy (allowlist or rules); those
+    are scanned again from disk before they count as installed.
+    """
+
+    dest_dir = dest_root / lock.name
+    if not dest_dir.exists():
+        return False, None
+    if _manifest_matches(dest_root=dest_root, lock=lock, scan_policy=scan_policy):
+        log(f"SKIP  {lock.name} (already matches lock)")
+        return True, None
+    previous = _upgradable_from(dest_root=dest_root, lock=lock, scan_policy=scan_policy)
+    if previous is None:
+        try:
+            existing, existing_digests = sha256_tree_files(dest_dir)
+        except Exception:
+            existing = None
+        if existing == lock.sha256.lower():
+            files = [(rel, (dest_dir / rel).read_bytes()) for rel in sorted(existing_digests)]
+            _scan_or_raise(
+                name=lock.name,
+                files=files,
+                digests=existing_digests,
+                allowlist_domains=allowlist_domains,
+                scan_cache=scan_cache,
+            )
+            manifest = _read_manifest(dest_root=dest_root, name=lock.name) or {}
+            root = manifest.get("root") if isinstance(manifest.get("root"), str) else None
+            _write_manifest(
+                dest_root=dest_root, lock=lock, digests=existing_digests, root=root, scan_policy=scan_policy
+            )
+            log(f"SKIP  {lock.name} (already matches lock)")
+            return True, None
+    return False, previous
+
+
+@skills_trace.traced("place")
+def _place_skill(
+    *,
+    dest_root: Path,
+    lock: SkillLock,
+    files: list[tuple[str, bytes]],
+    digests: dict[str, str],
+    skill_root: str,
+    scan_policy: str,
+    store: Optional[ObjectStore],
+    log: Callable[[str], None],
+    wait_turn: Callable[[], None] = _no_wait,
+) -> None:
+    dest_dir = dest_root / lock.name
+    bak: Optional[Path] = None
+    if dest_dir.exists():
+        bak = _backup_path(dest_root=dest_root, name=lock.name)
+
+    staging = _stage_skill(dest_root=dest_root, name=lock.name, files=files, digests=digests, store=store)
+    skills_trace.add(bytes=sum(len(data) for _rel, data in files))
+    _replace_dir(staging=staging, dest_dir=dest_dir, bak=bak, wait_turn=wait_turn)
+    _write_manifest(dest_root=dest_root, lock=lock, digests=digests, root=skill_root, scan_policy=scan_policy)
+    if bak is not None:
+        log(f"UPDATE {lock.name} (backed up to {bak.name})")
+    log(f"INSTALL {lock.name}")
+
+
 def _install_skill(
     *,
     repo_cache_root: Path,
-    dest_root: Path,
+    targets: list[tuple[Path, Callable[[str], None]]],
     allowlist_domains: set[str],
     lock: SkillLock,
+    plans: dict[str, RepoPlan],
+    prepared: dict[str, GitObjectReader],
+    limits: _Concurrency,
+    offline: bool = False,
+    store: Optional[ObjectStore] = None,
+    scan_cache: Optional[ScanCache] = None,
+    bundle: Optional[BundleDir] = None,
+    wait_turn: Callable[[], None] = _no_wait,
 ) -> None:
-    if "@" not in lock.ref:
-        raise InstallError(f"Invalid ref (expected owner/repo@commit): {lock.ref!r}")
-    repo_part, commit = lock.ref.rsplit("@", 1)
-    if "/" not in repo_part:
-        raise InstallError(f"Invalid ref (expected owner/repo@commit): {lock.ref!r}")
-    owner, repo = repo_part.split("/", 1)
-    owner = owner.strip()
-    repo = repo.strip()
-    commit = commit.strip().lower()
-    if not owner or not repo or not commit:
-        raise InstallError(f"Invalid ref (expected owner/repo@commit): {lock.ref!r}")
+    """Install one lock entry into every (dest_root, log) target that does not have it yet.
 
-    repo_dir = _ensure_repo(cache_root=repo_cache_root, owner=owner, repo=repo)
-    _fetch_commit(repo_dir=repo_dir, commit=commit)
+    The skill is read, hashed and scanned once however many targets need it. With a
+    bundle dir, files come from its bundle instead of git (no repo cache needed).
+    Nothing is moved into place before wait_turn() returns (see _run_in_order).
+    """
 
-    skill_root = _resolve_skill_root(repo_dir=repo_dir, commit=commit, skill_name=lock.name)
-    files = _git_list_files(repo_dir=repo_dir, commit=commit, root=skill_root)
-    if not files:
-        raise InstallError(f"No files found under skill root '{skill_root}'")
-
-    # Materialize to a temp dir so we can compute hash + scan.
-    with tempfile.TemporaryDirectory() as td:
-        td_root = Path(td) / lock.name
-        for p in files:
-            rel = Path(p).relative_to(skill_root)
-            data = _git_read_file(repo_dir=repo_dir, commit=commit, path=p)
-            _write_bytes(td_root / rel, data)
-
-        computed = sha256_tree(td_root)
-        expected = lock.sha256.lower()
-        if computed != expected:
-            raise InstallError(
-                f"sha256 mismatch for skill {lock.name!r}: expected {expected}, got {computed}"
+    owner, repo, commit = _parse_ref(lock.ref)
+    plan = plans[f"{owner}__{repo}"]
+    scan_policy = scan_policy_fingerprint(allowlist_domains)
+
+    pending: list[tuple[Path, Callable[[str], None], Optional[dict]]] = []
+    for dest_root, log in targets:
+        done, upgradable = _check_installed(
+            dest_root=dest_root,
+            lock=lock,
+            allowlist_domains=allowlist_domains,
+            scan_policy=scan_policy,
+            scan_cache=scan_cache,
+            log=log,
+        )
+        if not done:
+            pending.append((dest_root, log, upgradable))
+    if not pending:
+        return
+    # A diff only pays off for a single target; several targets share one full read.
+    previous = pending[0][2] if len(pending) == 1 and bundle is None else None
+
+    def read_all(reader: GitObjectReader, skill_root: str) -> list[tuple[str, bytes]]:
+        files = _git_list_files(reader=reader, commit=commit, root=skill_root)
+        if not files:
+            raise InstallError(f"No files found under skill root '{skill_root}'")
+        return _read_blobs(
+            reader=reader, commit=commit, root=skill_root, entries=files, plan=plan, limits=limits, offline=offline
+        )
+
+    diff: Optional[tuple[list[TreeEntry], list[str]]] = None
+    if bundle is not None:
+        skill_root, blobs = _read_bundle(bundle=bundle, lock=lock)
+    else:
+        # Git work inside one cached repo is serialized; the first skill of a repo fetches
+        # all of the repo's pinned commits, later skills read from that fetch.
+        with limits.repo_lock(plan.key):
+            reader = _prepare_repo(
+                repo_cache_root=repo_cache_root,
+                plan=plan,
+                prepared=prepared,
+                limits=limits,
+                offline=offline,
             )
 
-        findings = scan_skill_dir(root=td_root, allowlist_domains=allowlist_domains)
-        high = [f for f in findings if f.severity == "HIGH"]
-        if high:
-            msg = "\n".join(f"{f.severity}: {f.file}: {f.rule}: {f.message}" for f in high[:20])
-            raise InstallError(
-                f"Security scan failed for skill {lock.name!r} (HIGH findings).\n{msg}\n"
-                "If you trust this skill, you must explicitly waive scanning (not supported by default policy)."
+            skill_root = _resolve_skill_root(reader=reader, commit=commit, skill_name=lock.name)
+            if previous is not None and previous["root"] == skill_root:
+                # Upgrade from another commit: only read what the diff touches.
+                _owner, _repo, old_commit = _parse_ref(previous["ref"])
+                diff = _diff_skill(repo_dir=reader.repo_dir, old=old_commit, new=commit, root=skill_root)
+            if diff is not None:
+                changed_entries, removed_paths = diff
+                blobs = _read_blobs(
+                    reader=reader,
+                    commit=commit,
+                    root=skill_root,
+                    entries=changed_entries,
+                    plan=plan,
+                    limits=limits,
+                    offline=offline,
+                )
+            else:
+                blobs = read_all(reader, skill_root)
+
+    if diff is not None:
+        assert previous is not None
+        dest_root, log, _ = pending[0]
+        removed = [path[len(skill_root) + 1 :] for path in removed_paths]
+        if _upgrade_skill(
+            dest_root=dest_root,
+            lock=lock,
+            previous=previous,
+            changed=blobs,
+            removed=removed,
+            allowlist_domains=allowlist_domains,
+            scan_policy=scan_policy,
+            store=store,
+            scan_cache=scan_cache,
+            log=log,
+            wait_turn=wait_turn,
+        ):
+            return
+        # The installed files did not add up to the lock (changed on disk since the
+        # manifest was written, or a bad lock): do a full install, which verifies the
+        # commit's own files.
+        with limits.repo_lock(plan.key):
+            reader = _prepare_repo(
+                repo_cache_root=repo_cache_root, plan=plan, prepared=prepared, limits=limits, offline=offline
             )
+            blobs = read_all(reader, skill_root)
+
+    # Verify hash + scan straight from the git objects; nothing touches disk until both pass.
+    digests = _check_against_lock(lock=lock, files=blobs)
+    _scan_or_raise(
+        name=lock.name, files=blobs, digests=digests, allowlist_domains=allowlist_domains, scan_cache=scan_cache
+    )
+
+    for dest_root, log, _ in pending:
+        _place_skill(
+            dest_root=dest_root,
+            lock=lock,
+            files=blobs,
+            digests=digests,
+            skill_root=skill_root,
+            scan_policy=scan_policy,
+            store=store,
+            log=log,
+            wait_turn=wait_turn,
+        )
+
+
+# A task logs through its first argument and calls its second, wait_turn, before any
+# change that must not happen once an earlier task has failed.
+_Task = Callable[[Callable[[str], None], Callable[[], None]], None]
+
+
+def _run_in_order(tasks: list[_Task], *, jobs: int) -> None:
+    """Run tasks that log through the callback they are given, printing logs in task order.
 
-        dest_dir = dest_root / lock.name
-        if dest_dir.exists():
-            try:
-                existing = sha256_tree(dest_dir)
-            except Exception:
-                existing = None
-            if existing == expected:
-                print(f"SKIP  {lock.name} (already matches lock)")
+    With jobs > 1, tasks run concurrently but their output is buffered and replayed in
+    order, so the log matches a sequential run. So do the effects: wait_turn() blocks
+    until every earlier task has finished, and raises if one of them failed, so no task
+    commits anything after the first failure. The first failing task (in order) is
+    raised after the output of all tasks before it.
+    """
+
+    if jobs <= 1:
+        for task in tasks:
+            task(print, _no_wait)
+        return
+
+    finished = [threading.Event() for _ in tasks]
+    succeeded = [False] * len(tasks)
+
+    def run_buffered(index: int, task: _Task) -> list[str]:
+        lines: list[str] = []
+
+        def wait_turn() -> None:
+            # The pool starts tasks in order, so every earlier task is running or done.
+            for k in range(index):
+                finished[k].wait()
+                if not succeeded[k]:
+                    raise InstallError("Cancelled: an earlier skill failed")
+
+        try:
+            task(lines.append, wait_turn)
+            succeeded[index] = True
+        finally:
+            finished[index].set()
+        return lines
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_buffered, index, task) for index, task in enumerate(tasks)]
+        try:
+            for fut in futures:
+                for line in fut.result():
+                    print(line)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+
+
+def _install_all(
+    *,
+    repo_cache_root: Path,
+    dest_root: Path,
+    allowlist_domains: set[str],
+    locks: list[SkillLock],
+    jobs: int,
+    per_host_jobs: int,
+    offline: bool = False,
+    store: Optional[ObjectStore] = None,
+    scan_cache: Optional[ScanCache] = None,
+    bundle: Optional[BundleDir] = None,
+) -> None:
+    """Install every lock entry, printing results in lock order (see _run_in_order)."""
+
+    _install_workspace(
+        repo_cache_root=repo_cache_root,
+        projects=[(None, dest_root, locks)],
+        allowlist_domains=allowlist_domains,
+        jobs=jobs,
+        per_host_jobs=per_host_jobs,
+        offline=offline,
+        store=store,
+        scan_cache=scan_cache,
+        bundle=bundle,
+    )
+
+
+def _install_workspace(
+    *,
+    repo_cache_root: Path,
+    projects: list[tuple[Optional[str], Path, list[SkillLock]]],
+    allowlist_domains: set[str],
+    jobs: int,
+    per_host_jobs: int,
+    offline: bool = False,
+    store: Optional[ObjectStore] = None,
+    scan_cache: Optional[ScanCache] = None,
+    bundle: Optional[BundleDir] = None,
+) -> None:
+    """Install the locks of many (label, dest_root, locks) projects from one shared plan.
+
+    Lock entries are deduplicated across projects by (ref, name, sha256): each unique
+    skill is fetched, hashed and scanned once, then placed into every project that
+    pins it. Log lines are prefixed with the project label (if any), in plan order.
+    """
+
+    placements: dict[tuple[str, str, str], list[tuple[Path, Optional[str]]]] = {}
+    unique: dict[tuple[str, str, str], SkillLock] = {}
+    for label, dest_root, locks in projects:
+        for lock in locks:
+            key = (lock.ref, lock.name, lock.sha256.lower())
+            unique.setdefault(key, lock)
+            placements.setdefault(key, []).append((dest_root, label))
+
+    plans = _plan_repos(list(unique.values()))
+    if offline and bundle is None:
+        _check_offline(repo_cache_root=repo_cache_root, plans=plans)
+    prepared: dict[str, GitObjectReader] = {}
+    limits = _Concurrency(per_host=per_host_jobs, lock_dir=repo_cache_root)
+
+    def task_for(key: tuple[str, str, str]) -> _Task:
+        def run(log: Callable[[str], None], wait_turn: Callable[[], None]) -> None:
+            with skills_trace.span("install", skill=unique[key].name):
+                _install_skill(
+                    repo_cache_root=repo_cache_root,
+                    targets=[(dest_root, _prefixed(log, label)) for dest_root, label in placements[key]],
+                    allowlist_domains=allowlist_domains,
+                    lock=unique[key],
+                    plans=plans,
+                    prepared=prepared,
+                    limits=limits,
+                    offline=offline,
+                    store=store,
+                    scan_cache=scan_cache,
+                    bundle=bundle,
+                    wait_turn=wait_turn,
+                )
+
+        return run
+
+    try:
+        _run_in_order([task_for(key) for key in unique], jobs=jobs)
+    finally:
+        for reader in prepared.values():
+            reader.close()
+
+
+def _read_bundle(*, bundle: BundleDir, lock: SkillLock) -> tuple[str, list[tuple[str, bytes]]]:
+    """(skill root, files in sha256_tree order) for a lock entry from a bundle dir."""
+
+    entry = bundle.lookup(ref=lock.ref, name=lock.name, sha256=lock.sha256)
+    if entry is None:
+        raise InstallError(f"Skill {lock.name!r} ({lock.ref}) is not in bundle dir {bundle.path}")
+    try:
+        files = sorted(bundle.iter_files(entry))
+    except BundleError as e:
+        raise InstallError(str(e)) from e
+    for (a, _), (b, _) in zip(files, files[1:]):
+        if a == b:
+            raise InstallError(f"Duplicate file in bundle {entry.file}: {a!r}")
+    if not files:
+        raise InstallError(f"Empty bundle for skill {lock.name!r}: {entry.file}")
+    return entry.root, files
+
+
+def read_locked_skills(
+    *,
+    repo_cache_root: Path,
+    locks: list[SkillLock],
+    handle: Callable[[SkillLock, str, list[tuple[str, bytes]], Callable[[str], None]], None],
+    skip: Optional[Callable[[SkillLock], Optional[str]]] = None,
+    jobs: int = 1,
+    per_host_jobs: int = 4,
+    offline: bool = False,
+    verify: bool = True,
+    allowlist_domains: Optional[set[str]] = None,
+) -> None:
+    """Read each distinct lock entry from the repo cache and pass it to `handle`.
+
+    handle(lock, skill root, files in sha256_tree order, log) only sees files verified
+    against the lock (unless verify is False, for entries whose digests are not known
+    yet) and, given allowlist_domains, that passed the security scan. Reads work
+    exactly like an install (fetching unless offline), and run concurrently; log lines
+    are printed in lock order. skip(lock) may return a reason to leave an entry out
+    without any git work.
+    """
+
+    unique = list({(lock.ref, lock.name, lock.sha256.lower()): lock for lock in locks}.values())
+    plans = _plan_repos(unique)
+    if offline:
+        _check_offline(repo_cache_root=repo_cache_root, plans=plans)
+    prepared: dict[str, GitObjectReader] = {}
+    limits = _Concurrency(per_host=per_host_jobs, lock_dir=repo_cache_root)
+
+    def task_for(lock: SkillLock) -> _Task:
+        def run(log: Callable[[str], None], wait_turn: Callable[[], None]) -> None:
+            with skills_trace.span("read_skill", skill=lock.name):
+                read(log, wait_turn)
+
+        def read(log: Callable[[str], None], wait_turn: Callable[[], None]) -> None:
+            reason = skip(lock) if skip is not None else None
+            if reason is not None:
+                log(f"SKIP  {lock.name} ({reason})")
                 return
+            owner, repo, commit = _parse_ref(lock.ref)
+            plan = plans[f"{owner}__{repo}"]
+            with limits.repo_lock(plan.key):
+                reader = _prepare_repo(
+                    repo_cache_root=repo_cache_root, plan=plan, prepared=prepared, limits=limits, offline=offline
+                )
+                skill_root = _resolve_skill_root(reader=reader, commit=commit, skill_name=lock.name)
+                entries = _git_list_files(reader=reader, commit=commit, root=skill_root)
+                if not entries:
+                    raise InstallError(f"No files found under skill root '{skill_root}'")
+                blobs = _read_blobs(
+                    reader=reader,
+                    commit=commit,
+                    root=skill_root,
+                    entries=entries,
+                    plan=plan,
+                    limits=limits,
+                    offline=offline,
+                )
+            if verify:
+                digests = _check_against_lock(lock=lock, files=blobs)
+            else:
+                digests = {rel: hashlib.sha256(data).hexdigest() for rel, data in blobs}
+            if allowlist_domains is not None:
+                _scan_or_raise(
+                    name=lock.name, files=blobs, digests=digests, allowlist_domains=allowlist_domains, scan_cache=None
+                )
+            wait_turn()
+            handle(lock, skill_root, blobs, log)
+
+        return run
+
+    try:
+        _run_in_order([task_for(lock) for lock in unique], jobs=jobs)
+    finally:
+        for reader in prepared.values():
+            reader.close()
+
+
+def _export_bundle(
+    *,
+    repo_cache_root: Path,
+    out: BundleDir,
+    locks: list[SkillLock],
+    jobs: int,
+    per_host_jobs: int,
+    offline: bool = False,
+) -> None:
+    """Write every distinct lock entry to a bundle dir, verified against its lock digest.
+
+    Skills already in the bundle dir are skipped. The index is saved even if an entry fails.
+    """
+
+    def exported(lock: SkillLock) -> Optional[str]:
+        if out.lookup(ref=lock.ref, name=lock.name, sha256=lock.sha256) is not None:
+            return "already exported"
+        return None
+
+    def export(lock: SkillLock, skill_root: str, files: list[tuple[str, bytes]], log: Callable[[str], None]) -> None:
+        entry = out.add(ref=lock.ref, name=lock.name, sha256=lock.sha256, root=skill_root, files=files)
+        log(f"EXPORT {lock.name} ({entry.file})")
+
+    try:
+        read_locked_skills(
+            repo_cache_root=repo_cache_root,
+            locks=locks,
+            handle=export,
+            skip=exported,
+            jobs=jobs,
+            per_host_jobs=per_host_jobs,
+            offline=offline,
+        )
+    finally:
+        out.save_index()
+
+
+def _prefixed(log: Callable[[str], None], label: Optional[str]) -> Callable[[str], None]:
+    if label is None:
+        return log
+    return lambda line: log(f"{label}: {line}")
 
-            ts = time.strftime("%Y%m%d%H%M%S")
-            bak = dest_root / f"{lock.name}.bak.{ts}"
-            dest_dir.rename(bak)
-            print(f"UPDATE {lock.name} (backed up to {bak.name})")
 
-        shutil.copytree(td_root, dest_dir, dirs_exist_ok=False)
-        print(f"INSTALL {lock.name}")
+def _verify_skill(*, dest_root: Path, lock: SkillLock, digest_cache: Optional[DigestCache] = None) -> str:
+    with skills_trace.span("verify", skill=lock.name):
+        return _verify_tree(dest_root=dest_root, lock=lock, digest_cache=digest_cache)
+
+
+def _verify_tree(*, dest_root: Path, lock: SkillLock, digest_cache: Optional[DigestCache]) -> str:
+    dest_dir = dest_root / lock.name
+    if not dest_dir.is_dir():
+        return f"MISSING {lock.name}"
+    expected = lock.sha256.lower()
+    try:
+        if lock.files is not None:
+            computed, digests = sha256_tree_files(dest_dir, cache=digest_cache)
+            drift = _file_drift(expected=lock.files, actual=digests)
+            if drift:
+                return f"DRIFT {lock.name} ({drift})"
+        else:
+            computed = sha256_tree(dest_dir, cache=digest_cache)
+    except OSError as e:
+        return f"DRIFT {lock.name} (unreadable: {e})"
+    if computed != expected:
+        return f"DRIFT {lock.name} (expected {expected}, got {computed})"
+    return f"OK    {lock.name}"
+
+
+def _verify_files(
+    *, pool: ThreadPoolExecutor, dest_root: Path, lock: SkillLock, fail_fast: bool
+) -> Callable[[], str]:
+    """Check a v2-locked skill file by file on `pool`; returns a callable giving its result line.
+
+    Added and removed paths are found from a stat-only walk, then every other file is
+    hashed as its own task against its digest in the lock. With fail_fast, the remaining
+    files of a skill are skipped once one of them drifted.
+    """
+
+    assert lock.files is not None
+    expected = lock.files
+    dest_dir = dest_root / lock.name
+    if not dest_dir.is_dir():
+        return lambda: f"MISSING {lock.name}"
+    try:
+        present = set(tree_relpaths(dest_dir))
+    except OSError as e:
+        line = f"DRIFT {lock.name} (unreadable: {e})"
+        return lambda: line
+    missing = sorted(expected.keys() - present)
+    unexpected = sorted(present - expected.keys())
+    stop = threading.Event()
+    if fail_fast and (missing or unexpected):
+        stop.set()
+
+    def check(rel: str) -> Optional[bool]:
+        if stop.is_set():
+            return None
+        try:
+            with skills_trace.span("verify_file", skill=lock.name, file=rel):
+                ok = sha256_file(dest_dir / rel) == expected[rel]
+        except OSError:
+            ok = False
+        if not ok and fail_fast:
+            stop.set()
+        return ok
+
+    rels = sorted(expected.keys() & present)
+    futures = [pool.submit(check, rel) for rel in rels]
+
+    def result() -> str:
+        outcomes = [f.result() for f in futures]
+        changed = [rel for rel, ok in zip(rels, outcomes) if ok is False]
+        drift = _format_drift(changed=changed, missing=missing, unexpected=unexpected)
+        if not drift:
+            return f"OK    {lock.name}"
+        if None in outcomes:
+            drift += f"; {outcomes.count(None)} files not checked"
+        return f"DRIFT {lock.name} ({drift})"
+
+    return result
+
+
+def _verify_all(
+    *,
+    dest_root: Path,
+    locks: list[SkillLock],
+    jobs: int,
+    label: Optional[str] = None,
+    digest_cache: Optional[DigestCache] = None,
+    fail_fast: bool = False,
+) -> bool:
+    """Fully rehash every installed skill against the lock (ignores manifests).
+
+    Skills are hashed concurrently; results are printed in lock order. Returns True
+    when every skill matches. With a digest cache, skills whose files are unchanged
+    since they were last hashed (same stat signature) are not read again. Skills with
+    per-file digests (lock v2) are otherwise checked file by file, in parallel, and
+    drift is reported by path.
+    """
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        pending: list[Callable[[], str]] = []
+        for lock in locks:
+            if lock.files is not None and digest_cache is None:
+                pending.append(_verify_files(pool=pool, dest_root=dest_root, lock=lock, fail_fast=fail_fast))
+            else:
+                pending.append(
+                    pool.submit(_verify_skill, dest_root=dest_root, lock=lock, digest_cache=digest_cache).result
+                )
+        results = [result() for result in pending]
+    for line in results:
+        print(line if label is None else f"{label}: {line}")
+    return all(line.startswith("OK ") for line in results)
+
+
+@contextlib.contextmanager
+def _open_digest_cache(args: argparse.Namespace) -> Iterator[Optional[DigestCache]]:
+    if not args.digest_cache:
+        yield None
+        return
+    with DigestCache(Path(args.digest_cache)) as cache:
+        yield cache
 
 
 def _load_allowlist_domains(global_sources_path: Path) -> set[str]:
@@ -226,6 +1564,149 @@ def _load_allowlist_domains(global_sources_path: Path) -> set[str]:
     return {d.lower() for d in allowlist}
 
 
+_PROJECT_SOURCES = Path(".opencode") / "skill-sources.json"
+_PROJECT_LOCK = Path(".opencode") / "skills.lock.json"
+_PROJECT_DEST = Path(".opencode") / "skills"
+
+
+def _workspace_roots(*, project_roots: list[str], workspaces: list[str]) -> list[Path]:
+    """Project roots given explicitly plus those discovered under each workspace dir, deduplicated."""
+
+    roots = [Path(r) for r in project_roots]
+    try:
+        roots.extend(sources.parent.parent for sources, _lock in discover_projects(Path(w) for w in workspaces))
+    except ValidationError as e:
+        raise InstallError(str(e)) from e
+    seen: set[Path] = set()
+    out: list[Path] = []
+    for root in roots:
+        resolved = root.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            out.append(root)
+    return out
+
+
+def _validate_workspace(*, global_sources_path: Path, roots: list[Path]) -> list[str]:
+    """Validate every project against the global policy (parsed once); returns error lines."""
+
+    try:
+        policy = load_global_policy(global_path=global_sources_path, global_lock_path=None)
+    except ValidationError as e:
+        return [str(e)]
+    results = validate_many(
+        policy=policy,
+        projects=[(root / _PROJECT_SOURCES, root / _PROJECT_LOCK) for root in roots],
+        require_lock=True,
+    )
+    return [f"{r.project}: {r.error}" for r in results if not r.ok]
+
+
+@skills_trace.traced("gc")
+def _auto_gc(
+    args: argparse.Namespace, *, repo_cache_root: Path, dest_roots: list[Path], locks: list[SkillLock]
+) -> None:
+    """After a successful install: the opt-in retention policy of --keep-backups/--cache-budget.
+
+    Only this run's locks are known here, so the repo cache is trimmed by budget (LRU)
+    and never pruned; `skills_gc.py` with every lock does the full job.
+    """
+
+    if args.keep_backups is None and args.cache_budget is None:
+        return
+    pins: Optional[dict[str, set[str]]] = None
+    if args.cache_budget is not None:
+        pins = {}
+        for lock in locks:
+            owner, repo, commit = _parse_ref(lock.ref)
+            pins.setdefault(f"{owner}__{repo}", set()).add(commit)
+    run_gc(
+        cache_root=repo_cache_root,
+        pins=pins,
+        backup_dirs=dest_roots,
+        policy=GcPolicy(keep_backups=args.keep_backups, cache_budget=args.cache_budget),
+    )
+
+
+def _main_workspace(args: argparse.Namespace, *, allowlist_domains: set[str]) -> int:
+    roots = _workspace_roots(project_roots=args.project_root, workspaces=args.workspace)
+    if not roots:
+        print("ERROR: no projects found (no .opencode/skill-sources.json under --workspace)", file=sys.stderr)
+        return 2
+
+    errors = _validate_workspace(global_sources_path=Path(args.global_sources), roots=roots)
+    if errors:
+        for line in errors:
+            print(f"ERROR: validation failed: {line}", file=sys.stderr)
+        return 2
+
+    projects: list[tuple[Optional[str], Path, list[SkillLock]]] = []
+    for root in roots:
+        lock_path = root / _PROJECT_LOCK
+        try:
+            locks = parse_lock(lock_path)
+        except InstallError as e:
+            raise InstallError(f"{lock_path}: {e}") from e
+        projects.append((str(root), root / _PROJECT_DEST, locks))
+
+    if args.verify:
+        ok = True
+        with _open_digest_cache(args) as digest_cache:
+            for label, dest_root, locks in projects:
+                ok = _verify_all(
+                    dest_root=dest_root,
+                    locks=locks,
+                    jobs=args.jobs,
+                    label=label,
+                    digest_cache=digest_cache,
+                    fail_fast=bool(args.fail_fast),
+                ) and ok
+        return 0 if ok else 2
+
+    repo_cache_root = Path(args.repo_cache)
+    repo_cache_root.mkdir(parents=True, exist_ok=True)
+    if args.export_bundle:
+        _export_bundle(
+            repo_cache_root=repo_cache_root,
+            out=BundleDir(Path(args.export_bundle)),
+            locks=[lock for _label, _dest_root, locks in projects for lock in locks],
+            jobs=args.jobs,
+            per_host_jobs=args.per_host_jobs,
+            offline=bool(args.offline),
+        )
+        print(f"OK ({len(projects)} projects)")
+        return 0
+    for _label, dest_root, _locks in projects:
+        dest_root.mkdir(parents=True, exist_ok=True)
+
+    scan_cache: Optional[ScanCache] = None
+    try:
+        if args.scan_cache:
+            scan_cache = ScanCache(Path(args.scan_cache))
+        _install_workspace(
+            repo_cache_root=repo_cache_root,
+            projects=projects,
+            allowlist_domains=allowlist_domains,
+            jobs=args.jobs,
+            per_host_jobs=args.per_host_jobs,
+            offline=bool(args.offline),
+            store=ObjectStore(Path(args.object_store)) if args.object_store else None,
+            scan_cache=scan_cache,
+            bundle=BundleDir(Path(args.from_bundle)) if args.from_bundle else None,
+        )
+        _auto_gc(
+            args,
+            repo_cache_root=repo_cache_root,
+            dest_roots=[dest_root for _label, dest_root, _locks in projects],
+            locks=[lock for _label, _dest_root, locks in projects for lock in locks],
+        )
+    finally:
+        if scan_cache is not None:
+            scan_cache.close()
+    print(f"OK ({len(projects)} projects)")
+    return 0
+
+
 def main(argv: list[str]) -> int:
     ap = argparse.ArgumentParser(
         description="Install external Agent Skills with strict pin+hash validation and basic security scanning."
@@ -235,45 +1716,138 @@ def main(argv: list[str]) -> int:
         default=str(Path(__file__).resolve().parents[1] / "skill-sources" / "global.sources.json"),
         help="Path to global.sources.json (default: repo skill-sources/global.sources.json)",
     )
-    ap.add_argument("--project-sources", required=True, help="Path to project .opencode/skill-sources.json")
-    ap.add_argument("--project-lock", required=True, help="Path to project .opencode/skills.lock.json")
+    ap.add_argument("--project-sources", help="Path to project .opencode/skill-sources.json")
+    ap.add_argument("--project-lock", help="Path to project .opencode/skills.lock.json")
     ap.add_argument(
         "--dest",
         help="Destination dir to install skills into (default: <project-root>/.opencode/skills)",
     )
     ap.add_argument(
         "--project-root",
-        help="Project root; used to default dest to .opencode/skills",
+        action="append",
+        default=[],
+        help="Project root; used to default dest to .opencode/skills. Repeat for a workspace install",
+    )
+    ap.add_argument(
+        "--workspace",
+        action="append",
+        default=[],
+        help="Install every project (dir with .opencode/skill-sources.json) under this directory (repeatable)",
     )
     ap.add_argument(
         "--repo-cache",
         default=str(Path.home() / ".config" / "opencode" / "skill-repos"),
         help="Local git repo cache directory",
     )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of skills to install concurrently (default: 1)",
+    )
+    ap.add_argument(
+        "--per-host-jobs",
+        type=int,
+        default=4,
+        help="Max concurrent fetches against one remote host (default: 4)",
+    )
+    ap.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never touch the network; fail if a pinned commit is not already in the repo cache",
+    )
+    ap.add_argument(
+        "--verify",
+        action="store_true",
+        help="Do not install; fully rehash installed skills against the lock and report drift",
+    )
+    ap.add_argument(
+        "--object-store",
+        help="Opt-in shared content-addressed file store; installs are reflinks (else read-only hardlinks) into it",
+    )
+    ap.add_argument(
+        "--scan-cache",
+        help="Opt-in SQLite cache of security scan results keyed by file sha256, ruleset and allowlist",
+    )
+    ap.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="With --verify and a v2 lock, stop checking a skill at its first drifted file",
+    )
+    ap.add_argument(
+        "--digest-cache",
+        metavar="FILE",
+        help="Opt-in SQLite cache of tree digests for --verify; skills with unchanged file stats are not reread",
+    )
+    ap.add_argument(
+        "--export-bundle",
+        metavar="DIR",
+        help="Do not install; write each locked skill (verified) to a bundle dir for --from-bundle",
+    )
+    ap.add_argument(
+        "--from-bundle",
+        metavar="DIR",
+        help="Install from a bundle dir written by --export-bundle instead of git (no network, no repo cache)",
+    )
+    ap.add_argument(
+        "--keep-backups",
+        type=int,
+        help="After installing, keep only this many <name>.bak.<timestamp> backups per skill",
+    )
+    ap.add_argument(
+        "--cache-budget",
+        type=parse_size,
+        help="After installing, evict repos this lock does not pin (LRU) while the repo cache is larger (e.g. 2G)",
+    )
+    ap.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON (per-phase, per-skill timing) to FILE and print a summary to stderr",
+    )
     args = ap.parse_args(argv)
 
-    if shutil.which("git") is None:
+    with skills_trace.profiling(Path(args.profile) if args.profile else None, name="skills_install"):
+        return _run(ap, args)
+
+
+def _run(ap: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    if args.export_bundle and args.from_bundle:
+        ap.error("--export-bundle and --from-bundle are mutually exclusive")
+    if not args.verify and not args.from_bundle and shutil.which("git") is None:
         print("ERROR: git is required to install external skills", file=sys.stderr)
         return 2
 
     global_sources_path = Path(args.global_sources)
+    allowlist_domains = _load_allowlist_domains(global_sources_path)
+
+    if args.workspace or len(args.project_root) > 1:
+        # Workspace mode: each project uses its own .opencode/{skill-sources,skills.lock}.json.
+        if args.dest or args.project_sources or args.project_lock:
+            ap.error("--dest/--project-sources/--project-lock cannot be combined with a workspace install")
+        try:
+            return _main_workspace(args, allowlist_domains=allowlist_domains)
+        except (InstallError, ScanCacheError, DigestCacheError, GcError, BundleError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+
+    if not args.project_sources or not args.project_lock:
+        ap.error("--project-sources and --project-lock are required (or use --workspace)")
     project_sources_path = Path(args.project_sources)
     project_lock_path = Path(args.project_lock)
     global_lock_path: Optional[Path] = None
 
-    allowlist_domains = _load_allowlist_domains(global_sources_path)
-
-    dest: Optional[Path]
+    dest: Optional[Path] = None
     if args.dest:
         dest = Path(args.dest)
     elif args.project_root:
-        dest = Path(args.project_root) / ".opencode" / "skills"
-    else:
+        dest = Path(args.project_root[0]) / _PROJECT_DEST
+    elif not args.export_bundle:
         raise SystemExit("ERROR: provide --dest or --project-root")
 
     repo_cache_root = Path(args.repo_cache)
     repo_cache_root.mkdir(parents=True, exist_ok=True)
-    dest.mkdir(parents=True, exist_ok=True)
+    if dest is not None:
+        dest.mkdir(parents=True, exist_ok=True)
 
     # Enforce policy: sources + locks must validate, and lock is required.
     try:
@@ -288,18 +1862,52 @@ def main(argv: list[str]) -> int:
         print(f"ERROR: validation failed: {e}", file=sys.stderr)
         return 2
 
+    scan_cache: Optional[ScanCache] = None
     try:
-        locks = _parse_lock(project_lock_path)
-        for lock in locks:
-            _install_skill(
+        locks = parse_lock(project_lock_path)
+        if args.export_bundle:
+            _export_bundle(
                 repo_cache_root=repo_cache_root,
-                dest_root=dest,
-                allowlist_domains=allowlist_domains,
-                lock=lock,
+                out=BundleDir(Path(args.export_bundle)),
+                locks=locks,
+                jobs=args.jobs,
+                per_host_jobs=args.per_host_jobs,
+                offline=bool(args.offline),
             )
-    except InstallError as e:
+            print("OK")
+            return 0
+        assert dest is not None
+        if args.verify:
+            with _open_digest_cache(args) as digest_cache:
+                ok = _verify_all(
+                    dest_root=dest,
+                    locks=locks,
+                    jobs=args.jobs,
+                    digest_cache=digest_cache,
+                    fail_fast=bool(args.fail_fast),
+                )
+            return 0 if ok else 2
+        if args.scan_cache:
+            scan_cache = ScanCache(Path(args.scan_cache))
+        _install_all(
+            repo_cache_root=repo_cache_root,
+            dest_root=dest,
+            allowlist_domains=allowlist_domains,
+            locks=locks,
+            jobs=args.jobs,
+            per_host_jobs=args.per_host_jobs,
+            offline=bool(args.offline),
+            store=ObjectStore(Path(args.object_store)) if args.object_store else None,
+            scan_cache=scan_cache,
+            bundle=BundleDir(Path(args.from_bundle)) if args.from_bundle else None,
+        )
+        _auto_gc(args, repo_cache_root=repo_cache_root, dest_roots=[dest], locks=locks)
+    except (InstallError, ScanCacheError, DigestCacheError, GcError, BundleError) as e:
         print(f"ERROR: {e}", file=sys.stderr)
         return 2
+    finally:
+        if scan_cache is not None:
+            scan_cache.close()
 
     print("OK")
     return 0
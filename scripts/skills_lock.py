@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from skills_common import TreeHasher, merkle_root
+from skills_install import InstallError, SkillLock, parse_lock, read_locked_skills, resolve_refs
+from skills_validate import ValidationError, load_global_policy, validate_project
+
+LOCK_VERSION = 2
+_V2_KEYS = ("merkleRoot", "files")
+
+
+class LockError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SkillSpec:
+    name: str
+    owner: str
+    repo: str
+    ref: str  # "HEAD", a branch, a tag, a full refname or a 40-hex commit
+
+
+def parse_spec(text: str) -> SkillSpec:
+    """`name@owner/repo[@ref]`; ref defaults to HEAD (the repo's default branch)."""
+
+    parts = [part.strip() for part in text.strip().split("@", 2)]
+    if len(parts) < 2:
+        raise LockError(f"Invalid spec (expected name@owner/repo[@ref]): {text!r}")
+    name, repo_part = parts[0], parts[1]
+    ref = parts[2] if len(parts) == 3 else "HEAD"
+    owner, _, repo = repo_part.partition("/")
+    if not name or not owner.strip() or not repo.strip() or "/" in repo or not ref:
+        raise LockError(f"Invalid spec (expected name@owner/repo[@ref]): {text!r}")
+    return SkillSpec(name=name, owner=owner.strip(), repo=repo.strip(), ref=ref)
+
+
+def read_spec_lines(lines: list[str]) -> list[str]:
+    """Specs from a file's lines: one per line, blank lines and `#` comments ignored."""
+
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def _specs_from_lock(obj: dict) -> list[SkillSpec]:
+    """Every entry of a lock, tracking its repo's default branch."""
+
+    specs = []
+    for idx, item in enumerate(obj["skills"]):
+        name = item.get("name") if isinstance(item, dict) else None
+        ref = item.get("ref") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not isinstance(ref, str) or "@" not in ref:
+            raise LockError(f"skills[{idx}] needs a name and an owner/repo@commit ref")
+        specs.append(parse_spec(f"{name}@{ref.rsplit('@', 1)[0]}"))
+    return specs
+
+
+def _load_lock_json(path: Path) -> dict:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError as e:
+        raise LockError(f"File not found: {path}") from e
+    except json.JSONDecodeError as e:
+        raise LockError(f"Invalid JSON: {path}: {e}") from e
+    if not isinstance(obj, dict) or not isinstance(obj.get("skills"), list):
+        raise LockError(f"{path}: expected an object with a skills list")
+    return obj
+
+
+def write_lock(path: Path, obj: dict, *, validate: Optional[Callable[[Path], None]] = None) -> None:
+    """Atomically replace `path`; validate(tmp path) may reject the new lock first."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+    try:
+        tmp.write_text(json.dumps(obj, indent=2) + "\n", encoding="utf-8")
+        if validate is not None:
+            validate(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def upgrade_lock(
+    *,
+    lock_path: Path,
+    out_path: Path,
+    repo_cache_root: Path,
+    jobs: int = 1,
+    per_host_jobs: int = 4,
+    offline: bool = False,
+) -> int:
+    """Rewrite a lock as version 2, adding `merkleRoot` and per-file `files` digests.
+
+    Each v1 entry is read from git at its pinned commit and must still match its
+    `sha256`, which is kept unchanged. Entries that already have file digests are left
+    as they are, as are all other keys. Returns the number of entries upgraded.
+    """
+
+    obj = _load_lock_json(lock_path)
+    try:
+        locks = parse_lock(lock_path)
+    except InstallError as e:
+        raise LockError(f"{lock_path}: {e}") from e
+
+    todo = [lock for lock in locks if lock.files is None]
+    digests: dict[tuple[str, str, str], dict[str, str]] = {}
+
+    def record(lock: SkillLock, _root: str, files: list[tuple[str, bytes]], log: Callable[[str], None]) -> None:
+        digests[(lock.ref, lock.name, lock.sha256.lower())] = {
+            rel: hashlib.sha256(data).hexdigest() for rel, data in files
+        }
+        log(f"HASH  {lock.name} ({len(files)} files)")
+
+    if todo:
+        repo_cache_root.mkdir(parents=True, exist_ok=True)
+        read_locked_skills(
+            repo_cache_root=repo_cache_root,
+            locks=todo,
+            handle=record,
+            jobs=jobs,
+            per_host_jobs=per_host_jobs,
+            offline=offline,
+        )
+
+    for item, lock in zip(obj["skills"], locks):
+        if lock.files is not None:
+            continue
+        files = digests[(lock.ref, lock.name, lock.sha256.lower())]
+        item["merkleRoot"] = merkle_root(files)
+        item["files"] = dict(sorted(files.items()))
+    obj["version"] = LOCK_VERSION
+    write_lock(out_path, obj)
+    return len(todo)
+
+
+def _resolve_specs(
+    *, specs: list[SkillSpec], repo_cache_root: Path, jobs: int, per_host_jobs: int, offline: bool
+) -> dict[str, str]:
+    """Spec name -> pinned `owner/repo@<commit>`."""
+
+    names = [spec.name for spec in specs]
+    dupes = sorted({name for name in names if names.count(name) > 1})
+    if dupes:
+        raise LockError(f"Skills given more than once: {', '.join(dupes)}")
+    if offline:
+        unpinned = [f"{s.name}@{s.owner}/{s.repo}@{s.ref}" for s in specs if not _is_commit(s.ref)]
+        if unpinned:
+            listing = "\n".join(f"  {spec}" for spec in unpinned)
+            raise LockError(f"Offline mode: refs cannot be resolved without the network:\n{listing}")
+    repo_cache_root.mkdir(parents=True, exist_ok=True)
+    resolved = resolve_refs(
+        repo_cache_root=repo_cache_root,
+        refs=[(s.owner, s.repo, s.ref) for s in specs],
+        jobs=jobs,
+        per_host_jobs=per_host_jobs,
+    )
+    return {s.name: f"{s.owner}/{s.repo}@{resolved[(s.owner, s.repo, s.ref)]}" for s in specs}
+
+
+def _is_commit(ref: str) -> bool:
+    return len(ref) == 40 and all(c in "0123456789abcdef" for c in ref.lower())
+
+
+def _short(ref: str) -> str:
+    return ref.rsplit("@", 1)[-1][:12]
+
+
+def check_lock(*, obj: dict, pins: dict[str, str]) -> list[str]:
+    """One report line per spec: OK, STALE (pinned commit differs) or NEW (not in the lock)."""
+
+    current = {item.get("name"): item.get("ref") for item in obj["skills"] if isinstance(item, dict)}
+    lines = []
+    for name, ref in pins.items():
+        pinned = current.get(name)
+        if pinned is None:
+            lines.append(f"NEW   {name} (not in lock; upstream {_short(ref)})")
+        elif pinned != ref:
+            lines.append(f"STALE {name} ({_short(pinned)} -> {_short(ref)}, {ref.rsplit('@', 1)[0]})")
+        else:
+            lines.append(f"OK    {name} ({_short(ref)})")
+    return lines
+
+
+def update_lock(
+    *,
+    obj: dict,
+    pins: dict[str, str],
+    version: int,
+    source_id: Optional[str],
+    repo_cache_root: Path,
+    allowlist_domains: set[str],
+    jobs: int = 1,
+    per_host_jobs: int = 4,
+    offline: bool = False,
+) -> int:
+    """Pin skills (name -> owner/repo@commit) in a lock object, computing their digests.
+
+    Each distinct commit is fetched once; skills are read from git objects, hashed
+    and security-scanned concurrently, exactly as the installer would read them.
+    Entries already pinned to their commit (with the digests `version` needs) are
+    not read again, and other entries are kept as they are. Returns the number of
+    entries written.
+    """
+
+    entries: dict[str, dict] = {}
+    for item in obj["skills"]:
+        if isinstance(item, dict) and isinstance(item.get("name"), str):
+            entries[item["name"]] = item
+
+    todo: list[SkillLock] = []
+    for name, ref in pins.items():
+        current = entries.get(name)
+        if current is not None and current.get("ref") == ref and current.get("sha256"):
+            if version == 1 or all(k in current for k in _V2_KEYS):
+                print(f"SKIP  {name} (already at {_short(ref)})")
+                continue
+        source = current.get("sourceId") if current is not None else source_id
+        if not isinstance(source, str) or not source:
+            raise LockError(f"No sourceId for new skill {name!r}: pass --source-id")
+        todo.append(SkillLock(name=name, source_id=source, ref=ref, sha256=""))
+    if version == 2:
+        # Entries the specs do not touch still need per-file digests in a v2 lock.
+        for name, item in entries.items():
+            if name not in pins and not all(k in item for k in _V2_KEYS):
+                source = str(item.get("sourceId"))
+                todo.append(SkillLock(name=name, source_id=source, ref=str(item.get("ref")), sha256=""))
+
+    written: dict[str, dict] = {}
+
+    def record(lock: SkillLock, _root: str, files: list[tuple[str, bytes]], log: Callable[[str], None]) -> None:
+        hasher = TreeHasher()
+        for rel, data in files:
+            hasher.add(rel, data)
+        item: dict[str, object] = {
+            "name": lock.name,
+            "sourceId": lock.source_id,
+            "ref": lock.ref,
+            "sha256": hasher.hexdigest(),
+        }
+        previous = entries.get(lock.name)
+        if previous is not None and previous.get("ref") == lock.ref and previous.get("sha256"):
+            if str(previous["sha256"]).lower() != item["sha256"]:
+                raise LockError(
+                    f"Skill {lock.name!r} at {lock.ref} no longer matches its locked sha256 "
+                    f"(locked {previous['sha256']}, got {item['sha256']})"
+                )
+        if version == 2:
+            digests = {rel: hashlib.sha256(data).hexdigest() for rel, data in files}
+            item["merkleRoot"] = merkle_root(digests)
+            item["files"] = dict(sorted(digests.items()))
+        written[lock.name] = item
+        log(f"LOCK  {lock.name} ({lock.ref})")
+
+    if todo:
+        read_locked_skills(
+            repo_cache_root=repo_cache_root,
+            locks=todo,
+            handle=record,
+            jobs=jobs,
+            per_host_jobs=per_host_jobs,
+            offline=offline,
+            verify=False,
+            allowlist_domains=allowlist_domains,
+        )
+
+    skills: list[dict] = []
+    for item in obj["skills"]:
+        name = item.get("name") if isinstance(item, dict) else None
+        skills.append({**item, **written.pop(name)} if name in written else item)
+    skills.extend(written[name] for name in pins if name in written)
+    if version == 1:
+        skills = [{k: v for k, v in item.items() if k not in _V2_KEYS} for item in skills]
+    obj["skills"] = skills
+    obj["version"] = version
+    return len(todo)
+
+
+def _lock_validator(*, global_sources: Path, project_sources: Optional[Path]) -> Callable[[Path], None]:
+    """Validate a lock as the project lock of project_sources, or else as the global lock."""
+
+    def validate(lock_path: Path) -> None:
+        try:
+            if project_sources is None:
+                policy = load_global_policy(global_path=global_sources, global_lock_path=lock_path)
+                validate_project(policy=policy, project_path=global_sources, project_lock_path=None, require_lock=True)
+            else:
+                policy = load_global_policy(global_path=global_sources, global_lock_path=None)
+                validate_project(
+                    policy=policy, project_path=project_sources, project_lock_path=lock_path, require_lock=True
+                )
+        except ValidationError as e:
+            raise LockError(f"The updated lock does not validate: {e}") from e
+
+    return validate
+
+
+def _main_update(args: argparse.Namespace) -> int:
+    lock_path = Path(args.lock)
+    obj = _load_lock_json(lock_path) if lock_path.exists() else {"version": LOCK_VERSION, "skills": []}
+    texts = list(args.spec)
+    if args.specs_from:
+        if args.specs_from == "-":
+            texts += read_spec_lines(sys.stdin.read().splitlines())
+        else:
+            try:
+                texts += read_spec_lines(Path(args.specs_from).read_text(encoding="utf-8").splitlines())
+            except OSError as e:
+                raise LockError(f"Cannot read {args.specs_from}: {e}") from e
+    specs = [parse_spec(text) for text in texts] if texts else _specs_from_lock(obj)
+    if not specs:
+        raise LockError("No skills to lock: give specs (name@owner/repo[@ref]) or an existing lock")
+
+    repo_cache_root = Path(args.repo_cache)
+    pins = _resolve_specs(
+        specs=specs,
+        repo_cache_root=repo_cache_root,
+        jobs=args.jobs,
+        per_host_jobs=args.per_host_jobs,
+        offline=bool(args.offline),
+    )
+    if args.check:
+        lines = check_lock(obj=obj, pins=pins)
+        for line in lines:
+            print(line)
+        return 0 if all(line.startswith("OK ") for line in lines) else 2
+
+    version = args.lock_version or obj.get("version")
+    if version not in (1, 2):
+        raise LockError(f"{lock_path}: unsupported lock version: {version!r} (expected 1 or 2)")
+    global_sources = Path(args.global_sources)
+    try:
+        policy = load_global_policy(global_path=global_sources, global_lock_path=None)
+    except ValidationError as e:
+        raise LockError(str(e)) from e
+    n = update_lock(
+        obj=obj,
+        pins=pins,
+        version=version,
+        source_id=args.source_id,
+        repo_cache_root=repo_cache_root,
+        allowlist_domains=policy.manifest.allowlist_domains,
+        jobs=args.jobs,
+        per_host_jobs=args.per_host_jobs,
+        offline=bool(args.offline),
+    )
+    write_lock(
+        lock_path,
+        obj,
+        validate=_lock_validator(
+            global_sources=global_sources,
+            project_sources=Path(args.project_sources) if args.project_sources else None,
+        ),
+    )
+    print(f"OK ({n} entries written)")
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    # Options shared by every subcommand that reads skills from git.
+    git_opts = argparse.ArgumentParser(add_help=False)
+    git_opts.add_argument(
+        "--repo-cache",
+        default=str(Path.home() / ".config" / "opencode" / "skill-repos"),
+        help="Local git repo cache directory",
+    )
+    git_opts.add_argument("--jobs", type=int, default=1, help="Number of skills to read concurrently (default: 1)")
+    git_opts.add_argument(
+        "--per-host-jobs",
+        type=int,
+        default=4,
+        help="Max concurrent fetches against one remote host (default: 4)",
+    )
+    git_opts.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never touch the network; fail if a pinned commit is not already in the repo cache",
+    )
+
+    ap = argparse.ArgumentParser(description="Maintain skill lock files (global.lock.json, skills.lock.json).")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    upgrade = sub.add_parser(
+        "upgrade", parents=[git_opts], help="Convert a lock to version 2 (per-file digests and a Merkle root)"
+    )
+    upgrade.add_argument("lock", help="Lock file to convert")
+    upgrade.add_argument("--out", help="Write the converted lock here (default: rewrite LOCK in place)")
+
+    update = sub.add_parser(
+        "update", parents=[git_opts], help="Pin skills to upstream commits and write a validated lock"
+    )
+    update.add_argument("lock", help="Lock file to update (created if missing)")
+    update.add_argument(
+        "spec",
+        nargs="*",
+        help="name@owner/repo[@ref], ref a branch, tag or commit (default: HEAD). "
+        "Default: every entry of the lock, at its repo's HEAD",
+    )
+    update.add_argument("--specs-from", metavar="FILE", help="Read more specs from FILE, one per line ('-' for stdin)")
+    update.add_argument("--source-id", help="sourceId for skills not in the lock yet")
+    update.add_argument(
+        "--lock-version",
+        type=int,
+        choices=(1, 2),
+        help=f"Lock version to write (default: the lock's own, {LOCK_VERSION} for a new lock)",
+    )
+    update.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not write; report entries pinned to another commit than their spec resolves to (exit 2 if any)",
+    )
+    update.add_argument(
+        "--global-sources",
+        default=str(Path(__file__).resolve().parents[1] / "skill-sources" / "global.sources.json"),
+        help="Path to global.sources.json (default: repo skill-sources/global.sources.json)",
+    )
+    update.add_argument(
+        "--project-sources",
+        help="Validate the lock as this project's lock (default: validate it as the global lock)",
+    )
+    args = ap.parse_args(argv)
+
+    if shutil.which("git") is None:
+        print("ERROR: git is required to read locked skills", file=sys.stderr)
+        return 2
+
+    try:
+        if args.command == "upgrade":
+            lock_path = Path(args.lock)
+            n = upgrade_lock(
+                lock_path=lock_path,
+                out_path=Path(args.out) if args.out else lock_path,
+                repo_cache_root=Path(args.repo_cache),
+                jobs=args.jobs,
+                per_host_jobs=args.per_host_jobs,
+                offline=bool(args.offline),
+            )
+            print(f"OK ({n} entries upgraded)")
+        elif args.command == "update":
+            return _main_update(args)
+    except (InstallError, LockError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import functools
+import hashlib
+import io
 import json
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Iterable
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Collection, Generator, Iterable, Iterator, Mapping, Optional, TextIO
+
+import skills_trace
+from skills_scan_cache import CachedFindings, ScanCache, ScanCacheError
 
 
 class ScanError(Exception):
@@ -48,7 +56,7 @@ _SENSITIVE_HANDLING_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
 ]
 
 _MALWARE_LIKE_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
-    ("pipe-to-shell", re.compile(r"(?i)(curl|wget).*(\|\s*)\s*(sh|bash)\b")),
+    ("pipe-to-shell", re.compile(r"(?i)(curl|wget).*\|\s*(sh|bash)\b")),
     ("rm-rf", re.compile(r"(?i)\brm\s+-rf\b")),
     ("sudo", re.compile(r"(?i)\bsudo\b")),
     ("ssh-private-key", re.compile(r"(?i)(id_rsa|id_ed25519|~/.ssh)")),
@@ -62,103 +70,635 @@ _NETWORK_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
     ("network-nc", re.compile(r"(?i)\b(nc|netcat)\b")),
 ]
 
+_SEVERITY_ORDER = {"LOW": 1, "MEDIUM": 2, "HIGH": 3}
+
 _URL_RE = re.compile(r"https?://([A-Za-z0-9.-]+)(?::\d+)?")
 _NETWORK_LINE_HINT = re.compile(r"(?i)\b(curl|wget|npm\s+install|npx\s+|pip\s+install|git\s+clone)\b")
+# Literals every _NETWORK_LINE_HINT match contains (case-insensitively).
+_NETWORK_HINT_WORDS = ("curl", "wget", "npm", "npx", "pip", "git")
 
+# For each rule, lowercase literals that every match of the rule starts with. A rule
+# can only match at a position where one of its prefixes occurs (case-insensitively),
+# so positions without a prefix hit are never evaluated. Word boundaries and the rest
+# of each pattern are checked by the real rule at the hit.
+_RULE_PREFIXES: dict[str, list[str]] = {
+    "prompt-injection-bypass": ["ignore ", "override ", "you are now ", "act as "],
+    "exfiltration-language": ["exfiltrate", "steal", "leak", "send ", "upload to", "webhook"],
+    "rm-rf": ["rm"],
+    "sudo": ["sudo"],
+    # "~/" only: the "." in "~/.ssh" / "~/.aws" is unescaped and matches any character.
+    "ssh-private-key": ["id_rsa", "id_ed25519", "~/"],
+    "aws-credentials": ["~/", "aws_secret_access_key"],
+    "dotenv": [".env"],
+    "network-curl": ["curl"],
+    "network-wget": ["wget"],
+    "network-nc": ["nc", "netcat"],
+}
 
-def _read_text(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8", errors="replace")
-    except Exception as e:  # noqa: BLE001
-        raise ScanError(f"Failed to read {path}: {e}") from e
+# Rules of the form `A.*B.*C` (`.` never crosses a newline), evaluated as ordered
+# keyword positions instead of by the regex: the regex retries every split point of
+# every `.*`, which is polynomial in the line length and lets one long line stall a
+# scan. Same result, linear time: on each line, take the earliest end of a stage-A
+# literal, then the earliest end of a stage-B literal starting at or after it, and so
+# on; the chain exists iff every stage ends on that line and the tail regex (if any)
+# starts on it too. Stages are lowercase ASCII literals (matched case-insensitively);
+# each entry must stay equivalent to the rule's pattern above.
+_SECRET_WORDS = ("api key", "token", "secret", "password", "private key", "cvc", "credit card")
+_ORDERED_RULES: dict[str, tuple[tuple[tuple[str, ...], ...], Optional[str]]] = {
+    "secrets-in-plaintext": ((("save", "store"), _SECRET_WORDS), r"\b(?:plain\s*text|plaintext)"),
+    "print-secrets": ((("print", "echo", "output", "show"), _SECRET_WORDS), None),
+    "pipe-to-shell": ((("curl", "wget"),), r"\|\s*(?:sh|bash)\b"),
+}
+
+# Non-ASCII characters that (?i) matches against an ASCII letter. Folding these plus
+# A-Z keeps the string length, so prefilter positions map 1:1 onto the original text.
+_ASCII_FOLD = {**{c: c + 32 for c in range(ord("A"), ord("Z") + 1)}, 0x130: "i", 0x131: "i", 0x17F: "s", 0x212A: "k"}
+
+
+def _fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        # lower() already maps U+212A to "k"; U+0130 would have changed the length.
+        return lowered.replace("\u017f", "s").replace("\u0131", "i")
+    return text.translate(_ASCII_FOLD)
+
+
+@dataclass(frozen=True)
+class _Rule:
+    name: str
+    severity: str
+    message: str
+    pattern: re.Pattern[str]
+
+
+def _build_rules() -> list[_Rule]:
+    tables = [
+        (_INJECTION_PATTERNS, "HIGH", "Contains prompt-injection / bypass language"),
+        (_SENSITIVE_HANDLING_PATTERNS, "HIGH", "Appears to instruct unsafe secret handling"),
+        (_MALWARE_LIKE_PATTERNS, "HIGH", "Contains potentially dangerous command / credential targeting pattern"),
+        (_NETWORK_PATTERNS, "MEDIUM", "Contains network-capable command reference"),
+    ]
+    rules = [_Rule(name, severity, message, pat) for table, severity, message in tables for name, pat in table]
+    for rule in rules:
+        if not rule.pattern.pattern.startswith("(?i)"):
+            raise ScanError(f"Rule {rule.name!r} must be case-insensitive")
+        if rule.name in _ORDERED_RULES:
+            literals = [lit for stage in _ORDERED_RULES[rule.name][0] for lit in stage]
+        else:
+            literals = _RULE_PREFIXES.get(rule.name, [])
+        if not literals or any(not p.isascii() or p != p.lower() for p in literals):
+            raise ScanError(f"Rule {rule.name!r} needs lowercase ASCII prefilter prefixes or ordered stages")
+    return rules
+
+
+_RULES = _build_rules()
+_ORDERED = {
+    i: (stages, re.compile(tail, re.IGNORECASE) if tail else None)
+    for i, rule in enumerate(_RULES)
+    if rule.name in _ORDERED_RULES
+    for stages, tail in [_ORDERED_RULES[rule.name]]
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def _prefilter_for(remaining: tuple[int, ...]) -> re.Pattern[str]:
+    # Case-sensitive over folded text: a plain literal alternation lets the regex engine
+    # skip ahead on the first character, unlike the same alternation under IGNORECASE.
+    prefixes = sorted({p for i in remaining for p in _RULE_PREFIXES[_RULES[i].name]})
+    return re.compile("|".join(re.escape(p) for p in prefixes))
+
+
+@functools.lru_cache(maxsize=1024)
+def _combined_for(remaining: tuple[int, ...]) -> tuple[re.Pattern[str], tuple[tuple[int, int], ...]]:
+    """One anchored matcher for several rules, with one group per rule.
+
+    Each rule is an optional lookahead, so a single `match(text, pos)` reports every
+    rule that matches starting exactly at pos (an alternation would report only one).
+    Returns the pattern and (rule index, group number) pairs.
+    """
+
+    parts = [f"(?:(?=(?P<r{i}>{_RULES[i].pattern.pattern[len('(?i)'):]})))?" for i in remaining]
+    pattern = re.compile("".join(parts), re.IGNORECASE)
+    return pattern, tuple((i, pattern.groupindex[f"r{i}"]) for i in remaining)
+
+
+def _match_ordered(
+    text: str, folded: str, stages: tuple[tuple[str, ...], ...], tail: Optional[re.Pattern[str]]
+) -> bool:
+    """Same result as the `A.*B.*...tail` regex an _ORDERED_RULES entry stands for."""
+
+    none = len(text) + 1
+    next_at: dict[str, int] = {}
+    tail_match: Optional[re.Match[str]] = None
+    tail_searched = False
+
+    # Search positions only grow, so each literal (and the tail) is scanned through
+    # once: a remembered occurrence at or after the position is still the next one.
+    def stage_end(stage: tuple[str, ...], pos: int) -> int:
+        best = none
+        for lit in stage:
+            at = next_at.get(lit, -1)
+            if at < pos:
+                at = folded.find(lit, pos)
+                at = none if at < 0 else at
+                next_at[lit] = at
+            if at != none:
+                best = min(best, at + len(lit))
+        return best
+
+    def tail_start(pos: int) -> int:
+        nonlocal tail_match, tail_searched
+        assert tail is not None
+        if not tail_searched or (tail_match is not None and tail_match.start() < pos):
+            tail_match = tail.search(text, pos)
+            tail_searched = True
+        return none if tail_match is None else tail_match.start()
+
+    pos = 0
+    while True:
+        cur = stage_end(stages[0], pos)
+        if cur == none:
+            return False
+        line_end = text.find("\n", cur)
+        line_end = len(text) if line_end < 0 else line_end
+        for stage in stages[1:]:
+            cur = stage_end(stage, cur)
+            if cur == none:
+                return False
+            if cur > line_end:
+                break
+        else:
+            if tail is None:
+                return True
+            start = tail_start(cur)
+            if start == none:
+                return False
+            if start <= line_end:
+                return True
+        pos = line_end + 1
+
+
+def _advance_ordered(
+    text: str,
+    folded: str,
+    stages: tuple[tuple[str, ...], ...],
+    tail: Optional[re.Pattern[str]],
+    *,
+    done: int,
+    pos: int,
+    final: bool,
+) -> tuple[int, int, bool]:
+    """_match_ordered for one line read in pieces: continue its chain in the next piece.
+
+    text is a piece of a single line; `done` stages already ended at or before pos.
+    Returns (done, pos, matched) to pass on to the next piece. A tail match that
+    reaches the end of a non-final piece may depend on the next character (`\\b`), so
+    it only counts once it is seen again with that character in the next piece.
+    """
+
+    while done < len(stages):
+        ends = [at + len(lit) for lit in stages[done] for at in [folded.find(lit, pos)] if at >= 0]
+        if not ends:
+            return done, pos, False
+        done, pos = done + 1, min(ends)
+    if tail is None:
+        return done, pos, True
+    m = tail.search(text, pos)
+    return done, pos, m is not None and (final or m.end() < len(text))
+
+
+def _match_rules(text: str, *, skip: Collection[int] = (), start: int = 0, stop: Optional[int] = None) -> set[int]:
+    """Indices of the rules (outside skip) whose pattern matches anywhere in text.
+
+    Same result as `pattern.search(text)` per rule. Ordered rules are evaluated by
+    _match_ordered; for the others, visits every position where a prefilter prefix
+    starts and evaluates all rules that have not matched yet there, in one combined
+    match; stops once every rule matched. With start/stop, only matches that start in
+    text[start:stop] count (the rest of text is context for them).
+    """
+
+    folded = _fold(text)
+    matched = {
+        i for i, (stages, tail) in _ORDERED.items() if i not in skip and _match_ordered(text, folded, stages, tail)
+    }
+    remaining = tuple(i for i in range(len(_RULES)) if i not in skip and i not in _ORDERED)
+    stop = len(text) if stop is None else stop
+    hit = _prefilter_for(remaining).search(folded, start) if remaining else None
+    while hit is not None and hit.start() < stop:
+        pos = hit.start()
+        combined, groups = _combined_for(remaining)
+        m = combined.match(text, pos)
+        found = {i for i, group in groups if m.start(group) >= 0}
+        if found:
+            matched |= found
+            remaining = tuple(i for i in remaining if i not in found)
+            if not remaining:
+                break
+        # pos + 1 (not hit.end()): another prefix may start inside this hit.
+        hit = _prefilter_for(remaining).search(folded, pos + 1)
+    return matched
+
+
+_BINARY_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".pdf", ".zip", ".tar", ".gz", ".bz2", ".xz", ".bin"}
+_SCRIPT_SUFFIXES = {".sh", ".bash", ".zsh", ".py", ".js", ".ts"}
+# Files an agent reads as text (or may run). A NUL byte does not make them binary: it
+# is a gating finding and the file is scanned anyway. So are extensionless files
+# (scripts, LICENSE, ...) whose first block is a script or UTF-8 (_looks_like_text).
+# Other files with a NUL in their first block are skipped as binary.
+_TEXT_SUFFIXES = _SCRIPT_SUFFIXES | {
+    ".md", ".markdown", ".mdx", ".txt", ".rst", ".json", ".jsonl", ".yaml", ".yml", ".toml", ".ini",
+    ".cfg", ".xml", ".html", ".htm", ".csv", ".tsv", ".rb", ".pl", ".php", ".ps1", ".bat", ".cmd", ".fish",
+    ".mjs", ".cjs", ".tsx", ".jsx", ".lua", ".go", ".rs", ".java", ".kt", ".swift", ".c", ".h", ".cpp",
+}  # fmt: skip
+
+# Findings about the file rather than its rules. A NUL gates an install: it can hide
+# the rest of a text file from tools that sniff for binaries. Long lines are only noted.
+_NUL_FINDING = ("nul-in-text-file", "HIGH", "Text file contains NUL bytes")
+_LONG_LINE_FINDING = ("long-line", "LOW", "Has lines over {} characters; they were scanned in pieces")
+
+# Files are streamed, never loaded whole: rules are matched over windows of about
+# _WINDOW_CHARS of whole lines, and lines longer than _MAX_LINE_CHARS are read in
+# pieces that overlap by _LINE_OVERLAP_CHARS (see _Piece). Within such a line, runs of
+# whitespace are cut to _MAX_SPACE_RUN characters first: every rule needs either a
+# fixed number of whitespace characters or any run (`\s+`, `\s*`), so that changes no
+# result, and it bounds every match but the ordered rules' `.*` (and URLs) to far less
+# than the overlap.
+_SNIFF_BYTES = 8192
+_WINDOW_CHARS = 64 * 1024
+_MAX_LINE_CHARS = 1024 * 1024
+_LINE_OVERLAP_CHARS = 4096
+_MAX_SPACE_RUN = 256
+
+_LONG_SPACE_RUN = re.compile(r"[^\S\n]{%d,}" % (_MAX_SPACE_RUN + 1))
+_WORD_CHAR = re.compile(r"\w")
+_WORD_RUN = re.compile(r"\w*")
+_HOST_CHARS = re.compile(r"[A-Za-z0-9.-]*")
+# Where str.splitlines() also ends a line ("\r" is gone after universal newlines).
+_LINE_BREAKS = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 
 def _iter_candidate_files(root: Path) -> Iterable[Path]:
     for p in root.rglob("*"):
         if not p.is_file():
             continue
-        # Scan text-ish files. (Binary files are skipped by extension.)
-        if p.suffix.lower() in {".png", ".jpg", ".jpeg", ".gif", ".pdf", ".zip", ".tar", ".gz", ".bz2", ".xz", ".bin"}:
+        # Scan text-ish files. (Known binary extensions are skipped here, other binary
+        # files by content in _scan_stream.)
+        if p.suffix.lower() in _BINARY_SUFFIXES:
             continue
         yield p
 
 
-def scan_skill_dir(*, root: Path, allowlist_domains: set[str]) -> list[Finding]:
-    if not root.exists() or not root.is_dir():
-        raise ScanError(f"Not a directory: {root}")
+def _is_blank(line: str) -> bool:
+    return not line or line.isspace()
 
-    findings: list[Finding] = []
-    for p in _iter_candidate_files(root):
-        text = _read_text(p)
-        rel = p.relative_to(root).as_posix()
 
-        lines = text.splitlines() or [text]
+def _cut_space_run(m: re.Match[str]) -> str:
+    run = m.group()
+    head = run[:_MAX_SPACE_RUN]
+    # Keep one line break (of str.splitlines(); URL severity is per line) if any.
+    brk = None if _LINE_BREAKS.search(head) else _LINE_BREAKS.search(run, _MAX_SPACE_RUN)
+    return head if brk is None else head + brk.group()
 
-        is_script_like = p.suffix.lower() in {".sh", ".bash", ".zsh", ".py", ".js", ".ts"}
 
-        # URLs to non-allowlisted domains are HIGH.
-        for line in lines:
-            for m in _URL_RE.finditer(line):
-                domain = m.group(1).lower().strip().strip(". ")
-                if domain in allowlist_domains:
+def _squeeze_onto(text: str, more: str) -> str:
+    """text + more, with whitespace runs over _MAX_SPACE_RUN cut (text already is).
+
+    text has no newline, so its trailing whitespace run is what rstrip() removes.
+    """
+
+    run = len(text.rstrip())
+    return text[:run] + _LONG_SPACE_RUN.sub(_cut_space_run, text[run:] + more)
+
+
+@dataclass(frozen=True)
+class _Piece:
+    """One piece of an over-long line, as scanned.
+
+    text[line_start:] is the line from its character `offset` on (whitespace runs
+    cut); before it is context: the last non-blank line and a newline in the first
+    piece, else one character of the previous piece. Matches count when they start
+    in text[start:stop]. Pieces overlap by _LINE_OVERLAP_CHARS, so a match that starts
+    before stop also ends inside text, unless it is an ordered rule (carried from
+    piece to piece by _advance_ordered) or a URL with an absurdly long host.
+    """
+
+    text: str
+    line_start: int
+    start: int
+    stop: int
+    offset: int
+    last: bool
+
+
+def _line_tail(line: str) -> str:
+    """What later windows see of an over-long line: its last _LINE_OVERLAP_CHARS.
+
+    That covers any match that crosses the newline after it (see _Piece). A word cut
+    at the front would look whole to `\\b`, so it is dropped.
+    """
+
+    cut = max(len(line) - _LINE_OVERLAP_CHARS, 0)
+    if cut and _WORD_CHAR.match(line, cut - 1):
+        cut = _WORD_RUN.match(line, cut).end()
+    return line[cut:]
+
+
+def _iter_windows(reader: TextIO) -> Iterator[tuple[str, str, Optional[_Piece]]]:
+    """Split a text stream into bounded windows: (rules_text, url_text, piece).
+
+    url_text is new text not seen in any earlier window. rules_text is url_text with
+    the last non-blank line before it in front: rule matches only cross a newline over
+    whitespace (`\\s`), so that line is all a cross-window match can start on, and any
+    blank lines in between collapse to one newline without changing the result.
+    Over-long lines come as pieces instead (rules_text is piece.text, url_text empty).
+    """
+
+    carry = ""
+    block: list[str] = []
+    size = 0
+
+    def flush() -> Iterator[tuple[str, str, Optional[_Piece]]]:
+        nonlocal carry, block, size
+        if not block:
+            return
+        text = "".join(block)
+        yield (f"{carry}\n{text}" if carry else text), text, None
+        for line in reversed(block):
+            if not _is_blank(line):
+                carry = line.rstrip("\n")
+                break
+        block, size = [], 0
+
+    while True:
+        line = reader.readline(_MAX_LINE_CHARS)
+        if not line:
+            break
+        if len(line) < _MAX_LINE_CHARS or line.endswith("\n"):
+            block.append(line)
+            size += len(line)
+            if size >= _WINDOW_CHARS:
+                yield from flush()
+            continue
+
+        yield from flush()
+        prefix = f"{carry}\n" if carry else ""
+        text = prefix + _squeeze_onto("", line)
+        line_start, start, offset, ended = len(prefix), 0, 0, False
+        while True:
+            while not ended and len(text) - max(start, line_start) < _MAX_LINE_CHARS:
+                more = reader.readline(_MAX_LINE_CHARS)
+                ended = not more or more.endswith("\n")
+                text = text[:line_start] + _squeeze_onto(text[line_start:], more)
+            if ended:
+                yield text, "", _Piece(text, line_start, start, len(text), offset, last=True)
+                break
+            stop = len(text) - _LINE_OVERLAP_CHARS
+            yield text, "", _Piece(text, line_start, start, stop, offset, last=False)
+            offset += stop - 1 - line_start
+            text, line_start, start = text[stop - 1 :], 0, 1
+        carry = _line_tail(text[line_start:].rstrip("\n"))
+    yield from flush()
+
+
+def _url_domain(m: re.Match[str]) -> str:
+    return m.group(1).lower().strip().strip(". ")
+
+
+def _url_findings(*, rel: str, text: str, is_script_like: bool, allowlist_domains: set[str]) -> Iterator[Finding]:
+    # URLs need "http"; skip the per-line pass (and the split) for text without it.
+    if "http" not in text:
+        return
+    for line in text.splitlines():
+        if "http" not in line:
+            continue
+        for m in _URL_RE.finditer(line):
+            domain = _url_domain(m)
+            if domain in allowlist_domains:
+                continue
+            # Heuristic severity: docs links in .md are LOW unless paired with a network command.
+            severity = "HIGH" if is_script_like else "LOW"
+            if _NETWORK_LINE_HINT.search(line):
+                severity = "HIGH"
+            yield _url_finding(rel, severity, domain)
+
+
+def _url_finding(rel: str, severity: str, domain: str) -> Finding:
+    return Finding(
+        severity=severity,
+        file=rel,
+        rule="url-domain-not-allowlisted",
+        message=f"Found URL domain '{domain}' not in allowlist",
+    )
+
+
+def _rule_finding(rel: str, i: int) -> Finding:
+    rule = _RULES[i]
+    return Finding(severity=rule.severity, file=rel, rule=rule.name, message=rule.message)
+
+
+class _LineScan:
+    """Scans the pieces of over-long lines with the same result as whole lines.
+
+    Keeps, for the current line, how far each ordered rule's chain got, where the
+    last URL ended, whether a network command was seen (which makes every URL on the
+    line HIGH) and the LOW URL findings that one later on the line would upgrade.
+    """
+
+    def __init__(self, *, rel: str, is_script_like: bool, allowlist_domains: set[str], matched: set[int]) -> None:
+        self.rel = rel
+        self.is_script_like = is_script_like
+        self.allowlist_domains = allowlist_domains
+        self.matched = matched
+        self._reset()
+
+    def _reset(self) -> None:
+        self.chains: dict[int, tuple[int, int]] = {}
+        # Rules whose chain, but not tail, was found on the last line: where in the
+        # next window the tail may start, and where that line ends.
+        self.tails: dict[int, tuple[int, int]] = {}
+        self.url_end = 0
+        self.in_host = False
+        self.hint = False
+        self.pending: dict[str, None] = {}
+
+    def scan(self, piece: _Piece) -> Iterator[Finding]:
+        text, offset = piece.text, piece.offset
+        lo = max(piece.start, piece.line_start)
+        folded = _fold(text)
+
+        # URL severity is per str.splitlines() line, which more than "\n" ends.
+        hints = not self.is_script_like and any(word in folded for word in _NETWORK_HINT_WORDS)
+        at = lo
+        while hints or self.hint or self.pending or "http" in text:
+            brk = _LINE_BREAKS.search(text, at)
+            end = len(text) if brk is None else brk.start()
+            yield from self._urls(piece, at, end, hints=hints)
+            if brk is None or end >= piece.stop:
+                break
+            yield from self._end_url_line()
+            at = brk.end()
+
+        if len(self.matched) < len(_RULES):
+            found = _match_rules(text, skip=self.matched | _ORDERED.keys(), start=piece.start, stop=piece.stop)
+            found |= self.carried_tails(text)
+            line_text = text[piece.line_start :]
+            folded = folded[piece.line_start :]
+            for i, (stages, tail) in _ORDERED.items():
+                if i in self.matched:
                     continue
-                # Heuristic severity: docs links in .md are LOW unless paired with a network command.
-                severity = "HIGH" if is_script_like else "LOW"
-                if _NETWORK_LINE_HINT.search(line):
-                    severity = "HIGH"
-                findings.append(
-                    Finding(
-                        severity=severity,
-                        file=rel,
-                        rule="url-domain-not-allowlisted",
-                        message=f"Found URL domain '{domain}' not in allowlist",
-                    )
+                done, end = self.chains.get(i, (0, 0))
+                pos = max(end - offset, lo - piece.line_start)
+                done, pos, hit = _advance_ordered(
+                    line_text, folded, stages, tail, done=done, pos=pos, final=piece.last
                 )
+                self.chains[i] = (done, offset + pos)
+                if hit:
+                    found.add(i)
+            self.matched |= found
+            yield from (_rule_finding(self.rel, i) for i in sorted(found))
 
-        for rule, pat in _INJECTION_PATTERNS:
-            if pat.search(text):
-                findings.append(
-                    Finding(
-                        severity="HIGH",
-                        file=rel,
-                        rule=rule,
-                        message="Contains prompt-injection / bypass language",
-                    )
-                )
+        if piece.last:
+            yield from self._end_url_line()
+            # A tail may start at the end of the line and cross the newline (`\s*`):
+            # left for the next window, which starts with the end of this line.
+            rest = text[piece.line_start :].rstrip("\n")
+            carried = _line_tail(rest)
+            base = offset + len(rest) - len(carried)
+            chains = self.chains
+            self._reset()
+            if carried:
+                self.tails = {
+                    i: (max(end - base, 0), len(carried))
+                    for i, (done, end) in chains.items()
+                    if i not in self.matched and done == len(_ORDERED[i][0])
+                }
 
-        for rule, pat in _SENSITIVE_HANDLING_PATTERNS:
-            if pat.search(text):
-                findings.append(
-                    Finding(
-                        severity="HIGH",
-                        file=rel,
-                        rule=rule,
-                        message="Appears to instruct unsafe secret handling",
-                    )
-                )
+    def carried_tails(self, text: str) -> set[int]:
+        """Ordered rules (see tails) whose tail starts in the line in front of text."""
 
-        for rule, pat in _MALWARE_LIKE_PATTERNS:
-            if pat.search(text):
-                findings.append(
-                    Finding(
-                        severity="HIGH",
-                        file=rel,
-                        rule=rule,
-                        message="Contains potentially dangerous command / credential targeting pattern",
-                    )
-                )
+        tails, self.tails = self.tails, {}
+        found = {
+            i
+            for i, (pos, line_end) in tails.items()
+            if (m := _ORDERED[i][1].search(text, pos)) is not None and m.start() <= line_end
+        }
+        if tails and _is_blank(text[next(iter(tails.values()))[1] :]):
+            # Only blank lines so far: the next window still starts with that line.
+            self.tails = {i: tail for i, tail in tails.items() if i not in found}
+        return found
 
-        for rule, pat in _NETWORK_PATTERNS:
-            if pat.search(text):
-                findings.append(
-                    Finding(
-                        severity="MEDIUM",
-                        file=rel,
-                        rule=rule,
-                        message="Contains network-capable command reference",
-                    )
-                )
+    def _urls(self, piece: _Piece, pos: int, end: int, *, hints: bool) -> Iterator[Finding]:
+        # URLs (and network commands, if hints) starting in text[pos:end], all on one line.
+        text, offset = piece.text, piece.offset
+        if hints and not self.hint:
+            hint = _NETWORK_LINE_HINT.search(text, pos, end)
+            if hint is not None and hint.start() < piece.stop:
+                self.hint = True
+                yield from (_url_finding(self.rel, "HIGH", d) for d in self.pending)
+                self.pending.clear()
+        severity = "HIGH" if self.is_script_like or self.hint else "LOW"
+        pos = max(pos, self.url_end - offset + piece.line_start)
+        if self.in_host:
+            # The previous piece ended inside a URL's host: skip the rest of it.
+            pos = _HOST_CHARS.match(text, pos).end()
+            self.url_end = pos - piece.line_start + offset
+            self.in_host = pos == len(text) and not piece.last
+        for m in _URL_RE.finditer(text, pos, end):
+            if m.start() >= piece.stop:
+                break
+            self.url_end = m.end() - piece.line_start + offset
+            # Only a host of thousands of characters gets here; it is reported cut short.
+            self.in_host = m.end() == len(text) and not piece.last
+            domain = _url_domain(m)
+            if domain in self.allowlist_domains:
+                continue
+            if severity == "HIGH":
+                yield _url_finding(self.rel, severity, domain)
+            else:
+                # Moved to the end: of several, the last one's message is reported.
+                self.pending.pop(domain, None)
+                self.pending[domain] = None
 
+    def _end_url_line(self) -> Iterator[Finding]:
+        yield from (_url_finding(self.rel, "LOW", d) for d in self.pending)
+        self.pending.clear()
+        self.hint = False
+
+
+def _looks_like_text(head: bytes) -> bool:
+    # A script (shebang), or UTF-8 except maybe for a character cut at the block end.
+    if head.startswith(b"#!"):
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _iter_stream(*, rel: str, suffix: str, fh: BinaryIO, allowlist_domains: set[str]) -> Iterator[Finding]:
+    """Scan one file from a binary stream in bounded memory, yielding findings as found.
+
+    Text is decoded like Path.read_text(errors="replace") (universal newlines). Files
+    with a NUL byte in their first block are treated as binary and skipped, unless their
+    suffix is a text one (_TEXT_SUFFIXES) or they are extensionless and look like text:
+    those get a HIGH finding and are scanned.
+    """
+
+    head = fh.read(_SNIFF_BYTES)
+    if b"\0" in head:
+        if suffix not in _TEXT_SUFFIXES and not (suffix == "" and _looks_like_text(head)):
+            return
+        rule, severity, message = _NUL_FINDING
+        yield Finding(severity=severity, file=rel, rule=rule, message=message)
+    fh.seek(0)
+    reader = io.TextIOWrapper(fh, encoding="utf-8", errors="replace", newline=None)
+
+    is_script_like = suffix in _SCRIPT_SUFFIXES
+    matched: set[int] = set()
+    lines = _LineScan(rel=rel, is_script_like=is_script_like, allowlist_domains=allowlist_domains, matched=matched)
+    long_line = False
+    for rules_text, url_text, piece in _iter_windows(reader):
+        if piece is not None:
+            long_line = True
+            yield from lines.scan(piece)
+            continue
+        # URLs to non-allowlisted domains are HIGH.
+        yield from _url_findings(
+            rel=rel, text=url_text, is_script_like=is_script_like, allowlist_domains=allowlist_domains
+        )
+        if len(matched) < len(_RULES):
+            found = _match_rules(rules_text, skip=matched) | lines.carried_tails(rules_text)
+            matched |= found
+            yield from (_rule_finding(rel, i) for i in sorted(found))
+    reader.detach()
+
+    if long_line:
+        rule, severity, message = _LONG_LINE_FINDING
+        yield Finding(severity=severity, file=rel, rule=rule, message=message.format(_MAX_LINE_CHARS))
+
+
+def _iter_path(root: Path, path: Path, allowlist_domains: set[str]) -> Iterator[Finding]:
+    try:
+        with path.open("rb") as fh:
+            yield from _iter_stream(
+                rel=path.relative_to(root).as_posix(),
+                suffix=path.suffix.lower(),
+                fh=fh,
+                allowlist_domains=allowlist_domains,
+            )
+            skills_trace.add(bytes=fh.tell())
+    except OSError as e:
+        raise ScanError(f"Failed to read {path}: {e}") from e
+
+
+def _scan_path(root: Path, path: Path, allowlist_domains: set[str]) -> list[Finding]:
+    return list(_iter_path(root, path, allowlist_domains))
+
+
+def _dedupe_sorted(findings: Iterable[Finding]) -> list[Finding]:
     # Deduplicate exact duplicates
     uniq: dict[tuple[str, str, str], Finding] = {}
     for f in findings:
@@ -168,6 +708,251 @@ def scan_skill_dir(*, root: Path, allowlist_domains: set[str]) -> list[Finding]:
     return out
 
 
+def _ruleset_fingerprint() -> str:
+    """sha256 over everything that decides the findings for given file bytes.
+
+    Derived from the compiled rule tables, the prefilter literals and scan limits, so
+    editing a pattern, prefix, message or limit changes it (and with it every scan
+    cache key) automatically.
+    """
+
+    parts: list[object] = [[r.name, r.severity, r.message, r.pattern.pattern, int(r.pattern.flags)] for r in _RULES]
+    parts += [[p.pattern, int(p.flags)] for p in (_URL_RE, _NETWORK_LINE_HINT)]
+    parts += [[name, [list(stage) for stage in stages], tail] for name, (stages, tail) in sorted(_ORDERED_RULES.items())]
+    parts += [[name, prefixes] for name, prefixes in sorted(_RULE_PREFIXES.items())]
+    parts += [list(_NETWORK_HINT_WORDS)]
+    parts += [_SNIFF_BYTES, _MAX_LINE_CHARS, _LINE_OVERLAP_CHARS, _MAX_SPACE_RUN]
+    parts += [list(_NUL_FINDING), list(_LONG_LINE_FINDING)]
+    parts += [sorted(_TEXT_SUFFIXES)]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+_RULESET_FINGERPRINT = _ruleset_fingerprint()
+
+
+def _allowlist_fingerprint(allowlist_domains: set[str]) -> str:
+    return hashlib.sha256("\n".join(sorted(allowlist_domains)).encode("utf-8")).hexdigest()
+
+
+def scan_policy_fingerprint(allowlist_domains: set[str]) -> str:
+    """Fingerprint of everything besides file content that decides findings.
+
+    Two scans of the same bytes under equal fingerprints give the same findings, so
+    a file that passed under this fingerprint need not be scanned again.
+    """
+
+    return hashlib.sha256(f"{_RULESET_FINGERPRINT}:{_allowlist_fingerprint(allowlist_domains)}".encode()).hexdigest()
+
+
+def _cache_key(*, digest: str, suffix: str, allowlist_domains: set[str]) -> str:
+    # The suffix only matters through script-likeness (URL severity) and text-ness (NUL bytes,
+    # decided by content for extensionless files).
+    if suffix in _SCRIPT_SUFFIXES:
+        kind = "script"
+    else:
+        kind = "text" if suffix in _TEXT_SUFFIXES else "bare" if suffix == "" else "other"
+    return f"{digest}:{kind}:{_RULESET_FINGERPRINT[:16]}:{_allowlist_fingerprint(allowlist_domains)[:16]}"
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    try:
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                h.update(chunk)
+    except OSError as e:
+        raise ScanError(f"Failed to read {path}: {e}") from e
+    return h.hexdigest()
+
+
+def _to_cached(findings: list[Finding]) -> CachedFindings:
+    return [(f.severity, f.rule, f.message) for f in findings]
+
+
+def _from_cached(rel: str, cached: CachedFindings) -> list[Finding]:
+    return [Finding(severity=sev, file=rel, rule=rule, message=msg) for sev, rule, msg in cached]
+
+
+def _iter_dir_raw(
+    *, root: Path, allowlist_domains: set[str], jobs: int, cache: Optional[ScanCache]
+) -> Generator[Finding, None, None]:
+    # Every finding of every file (duplicates included), file by file in walk order.
+    if not root.exists() or not root.is_dir():
+        raise ScanError(f"Not a directory: {root}")
+
+    paths = list(_iter_candidate_files(root))
+    keys: list[Optional[str]] = [None] * len(paths)
+    hits: dict[str, CachedFindings] = {}
+    if cache is not None:
+        keys = [
+            _cache_key(digest=_file_sha256(p), suffix=p.suffix.lower(), allowlist_domains=allowlist_domains)
+            for p in paths
+        ]
+        hits = cache.get_many(k for k in keys if k is not None)
+    todo = [p for p, key in zip(paths, keys) if key not in hits]
+
+    pool: Optional[ProcessPoolExecutor] = None
+    if jobs > 1 and len(todo) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(todo)))
+        scan = functools.partial(_scan_path, root, allowlist_domains=allowlist_domains)
+        scanned: Iterator[list[Finding]] = pool.map(scan, todo, chunksize=max(1, len(todo) // (jobs * 4)))
+
+    # Results of fully scanned files are cached even when the caller stops early.
+    fresh: list[tuple[str, CachedFindings]] = []
+    try:
+        for p, key in zip(paths, keys):
+            if key in hits:
+                yield from _from_cached(p.relative_to(root).as_posix(), hits[key])
+                continue
+            file_findings: list[Finding] = []
+            for f in next(scanned) if pool is not None else _iter_path(root, p, allowlist_domains):
+                file_findings.append(f)
+                yield f
+            if key is not None:
+                fresh.append((key, _to_cached(file_findings)))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if cache is not None:
+            cache.put_many(fresh)
+
+
+def _iter_files_raw(
+    *,
+    files: Iterable[tuple[str, bytes]],
+    allowlist_domains: set[str],
+    cache: Optional[ScanCache],
+    digests: Optional[Mapping[str, str]],
+) -> Generator[Finding, None, None]:
+    candidates = [(rel, data) for rel, data in files if PurePosixPath(rel).suffix.lower() not in _BINARY_SUFFIXES]
+    keys: dict[str, str] = {}
+    hits: dict[str, CachedFindings] = {}
+    if cache is not None:
+        for rel, data in candidates:
+            digest = (digests or {}).get(rel) or hashlib.sha256(data).hexdigest()
+            suffix = PurePosixPath(rel).suffix.lower()
+            keys[rel] = _cache_key(digest=digest, suffix=suffix, allowlist_domains=allowlist_domains)
+        hits = cache.get_many(keys.values())
+
+    fresh: list[tuple[str, CachedFindings]] = []
+    try:
+        for rel, data in candidates:
+            key = keys.get(rel)
+            if key in hits:
+                yield from _from_cached(rel, hits[key])
+                continue
+            file_findings: list[Finding] = []
+            suffix = PurePosixPath(rel).suffix.lower()
+            for f in _iter_stream(rel=rel, suffix=suffix, fh=io.BytesIO(data), allowlist_domains=allowlist_domains):
+                file_findings.append(f)
+                yield f
+            skills_trace.add(bytes=len(data))
+            if key is not None:
+                fresh.append((key, _to_cached(file_findings)))
+    finally:
+        if cache is not None:
+            cache.put_many(fresh)
+
+
+def _iter_limited(
+    raw: Generator[Finding, None, None], *, stop_at: Optional[str], max_findings: Optional[int]
+) -> Iterator[Finding]:
+    """Yield each distinct (severity, file, rule) once, as found, then stop when told to.
+
+    Scanning stops after max_findings findings at or above stop_at (all findings when
+    stop_at is None); stop_at alone stops at the first such finding.
+    """
+
+    if stop_at is not None and stop_at not in _SEVERITY_ORDER:
+        raise ScanError(f"Unknown severity: {stop_at!r}")
+    if stop_at is not None and max_findings is None:
+        max_findings = 1
+    threshold = _SEVERITY_ORDER[stop_at] if stop_at is not None else 0
+    seen: set[tuple[str, str, str]] = set()
+    counted = 0
+    try:
+        for f in raw:
+            key = (f.severity, f.file, f.rule)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield f
+            if max_findings is not None and _SEVERITY_ORDER.get(f.severity, 0) >= threshold:
+                counted += 1
+                if counted >= max_findings:
+                    return
+    finally:
+        raw.close()
+
+
+def iter_skill_dir(
+    *,
+    root: Path,
+    allowlist_domains: set[str],
+    stop_at: Optional[str] = None,
+    max_findings: Optional[int] = None,
+    jobs: int = 1,
+    cache: Optional[ScanCache] = None,
+) -> Iterator[Finding]:
+    """Stream the findings of scan_skill_dir as they are found, unsorted.
+
+    Each (severity, file, rule) is yielded once, with the message of its first
+    occurrence. Stops early per stop_at / max_findings (see _iter_limited); closing
+    the generator also stops the scan.
+    """
+
+    raw = _iter_dir_raw(root=root, allowlist_domains=allowlist_domains, jobs=jobs, cache=cache)
+    return _iter_limited(raw, stop_at=stop_at, max_findings=max_findings)
+
+
+def iter_skill_files(
+    *,
+    files: Iterable[tuple[str, bytes]],
+    allowlist_domains: set[str],
+    stop_at: Optional[str] = None,
+    max_findings: Optional[int] = None,
+    cache: Optional[ScanCache] = None,
+    digests: Optional[Mapping[str, str]] = None,
+) -> Iterator[Finding]:
+    """Streaming counterpart of scan_skill_files; same semantics as iter_skill_dir."""
+
+    raw = _iter_files_raw(files=files, allowlist_domains=allowlist_domains, cache=cache, digests=digests)
+    return _iter_limited(raw, stop_at=stop_at, max_findings=max_findings)
+
+
+def scan_skill_dir(
+    *, root: Path, allowlist_domains: set[str], jobs: int = 1, cache: Optional[ScanCache] = None
+) -> list[Finding]:
+    """Scan every candidate file under root; with jobs > 1, files are scanned in a process pool.
+
+    Per-file results are merged in directory-walk order, so the output does not depend
+    on jobs. With a cache, files whose content was scanned before (under the same rules
+    and allowlist) are looked up instead of scanned.
+    """
+
+    with skills_trace.span("scan"):
+        return _dedupe_sorted(_iter_dir_raw(root=root, allowlist_domains=allowlist_domains, jobs=jobs, cache=cache))
+
+
+def scan_skill_files(
+    *,
+    files: Iterable[tuple[str, bytes]],
+    allowlist_domains: set[str],
+    cache: Optional[ScanCache] = None,
+    digests: Optional[Mapping[str, str]] = None,
+) -> list[Finding]:
+    """Scan in-memory skill files given as (relpath, bytes); same results as scan_skill_dir.
+
+    digests (relpath -> sha256), when the caller already has them, saves rehashing
+    for cache lookups.
+    """
+
+    with skills_trace.span("scan"):
+        return _dedupe_sorted(
+            _iter_files_raw(files=files, allowlist_domains=allowlist_domains, cache=cache, digests=digests)
+        )
+
+
 def main(argv: list[str]) -> int:
     ap = argparse.ArgumentParser(description="Static scan of an Agent Skill directory for common security issues.")
     ap.add_argument("--root", required=True, help="Path to the skill directory")
@@ -179,9 +964,9 @@ def main(argv: list[str]) -> int:
     )
     ap.add_argument(
         "--format",
-        choices=["text", "json"],
+        choices=["text", "json", "ndjson"],
         default="text",
-        help="Output format",
+        help="Output format (ndjson streams one finding per line as found, unsorted)",
     )
     ap.add_argument(
         "--fail-on",
@@ -189,21 +974,62 @@ def main(argv: list[str]) -> int:
         default="HIGH",
         help="Exit non-zero if findings at/above this severity exist",
     )
+    ap.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop scanning at the first finding at/above --fail-on",
+    )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of files to scan in parallel processes (default: 1)",
+    )
+    ap.add_argument(
+        "--cache",
+        help="SQLite scan cache; files scanned before (same content, rules, allowlist) are looked up",
+    )
+    ap.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON (per-phase, per-skill timing) to FILE and print a summary to stderr",
+    )
     args = ap.parse_args(argv)
 
+    with skills_trace.profiling(Path(args.profile) if args.profile else None, name="skills_scan"):
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> int:
     allowlist = {d.lower() for d in args.allowlist_domain}
     if not allowlist:
         raise SystemExit("ERROR: at least one --allowlist-domain is required")
 
+    stop_at = args.fail_on if args.fail_fast and args.fail_on != "NONE" else None
+    cache: Optional[ScanCache] = None
     try:
-        findings = scan_skill_dir(root=Path(args.root), allowlist_domains=allowlist)
-    except ScanError as e:
+        cache = ScanCache(Path(args.cache)) if args.cache else None
+        if args.format == "ndjson" or stop_at is not None:
+            streamed: list[Finding] = []
+            for f in iter_skill_dir(
+                root=Path(args.root), allowlist_domains=allowlist, stop_at=stop_at, jobs=args.jobs, cache=cache
+            ):
+                if args.format == "ndjson":
+                    print(json.dumps(f.__dict__, sort_keys=True), flush=True)
+                streamed.append(f)
+            findings = _dedupe_sorted(streamed)
+        else:
+            findings = scan_skill_dir(root=Path(args.root), allowlist_domains=allowlist, jobs=args.jobs, cache=cache)
+    except (ScanError, ScanCacheError) as e:
         print(f"ERROR: {e}", file=sys.stderr)
         return 2
+    finally:
+        if cache is not None:
+            cache.close()
 
     if args.format == "json":
         print(json.dumps([f.__dict__ for f in findings], indent=2, sort_keys=True))
-    else:
+    elif args.format == "text":
         if not findings:
             print("OK")
         else:
@@ -213,11 +1039,10 @@ def main(argv: list[str]) -> int:
     if args.fail_on == "NONE":
         return 0
 
-    order = {"LOW": 1, "MEDIUM": 2, "HIGH": 3}
-    threshold = order.get(args.fail_on, 3)
+    threshold = _SEVERITY_ORDER.get(args.fail_on, 3)
     worst = 0
     for f in findings:
-        worst = max(worst, order.get(f.severity, 0))
+        worst = max(worst, _SEVERITY_ORDER.get(f.severity, 0))
 
     return 2 if worst >= threshold else 0
 
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Cached per-file result: findings as (severity, rule, message), in scan order.
+CachedFindings = list[tuple[str, str, str]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_results (
+    key TEXT PRIMARY KEY,
+    findings TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_results_last_used ON scan_results (last_used);
+"""
+
+
+class ScanCacheError(Exception):
+    pass
+
+
+class ScanCache:
+    """Persistent per-file scan results in a SQLite database, evicted LRU by size.
+
+    Keys are opaque strings built by the scanner from the file sha256, the ruleset
+    fingerprint and the allowlist fingerprint, so entries never need invalidating:
+    a changed rule or allowlist simply stops hitting the old entries, which then age
+    out. Hits refresh their last-use time; the database is trimmed to max_bytes of
+    stored findings on close. Safe to share between threads.
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, path: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db: Optional[sqlite3.Connection] = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            raise ScanCacheError(f"Cannot open scan cache {path}: {e}") from e
+
+    def __enter__(self) -> "ScanCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, CachedFindings]:
+        wanted = list(dict.fromkeys(keys))
+        out: dict[str, CachedFindings] = {}
+        with self._lock, self._errors():
+            db = self._conn()
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, findings in db.execute(
+                    f"SELECT key, findings FROM scan_results WHERE key IN ({marks})", chunk
+                ):
+                    out[key] = [tuple(f) for f in json.loads(findings)]
+            if out:
+                now = time.time_ns()
+                with db:
+                    db.executemany(
+                        "UPDATE scan_results SET last_used = ? WHERE key = ?", [(now, k) for k in out]
+                    )
+        return out
+
+    def put_many(self, items: Iterable[tuple[str, CachedFindings]]) -> None:
+        now = time.time_ns()
+        rows = []
+        for key, findings in items:
+            data = json.dumps([list(f) for f in findings], separators=(",", ":"))
+            rows.append((key, data, len(key) + len(data), now))
+        if not rows:
+            return
+        with self._lock, self._errors():
+            db = self._conn()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO scan_results (key, findings, size, last_used) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+
+    def close(self) -> None:
+        with self._lock, self._errors():
+            if self._db is None:
+                return
+            try:
+                self._evict()
+            finally:
+                self._db.close()
+                self._db = None
+
+    @contextlib.contextmanager
+    def _errors(self) -> Iterator[None]:
+        try:
+            yield
+        except sqlite3.Error as e:
+            raise ScanCacheError(f"Scan cache {self.path}: {e}") from e
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise ScanCacheError(f"Scan cache {self.path} is closed")
+        return self._db
+
+    def _evict(self) -> None:
+        db = self._conn()
+        with db:
+            # Keep the most recently used entries whose sizes add up to max_bytes.
+            db.execute(
+                """
+                DELETE FROM scan_results WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                        FROM scan_results
+                    ) WHERE running > ?
+                )
+                """,
+                (self.max_bytes,),
+            )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): copy-on-write clone on btrfs/xfs/etc.
+_FICLONE = 0x40049409
+
+
+class ObjectStore:
+    """Content-addressed file store keyed by file sha256.
+
+    Layout: <root>/sha256/<first 2 hex>/<remaining 62 hex>. Objects are written
+    atomically and made read-only; an existing object is only reused after its content
+    is checked. Installs share the objects' disk blocks, so identical files across
+    skills, updates, backups and projects are stored once: as reflinks (copy-on-write
+    clones: Linux FICLONE, macOS clonefile) where the filesystem supports them, else as
+    read-only hardlinks. An install edited through a hardlink (after a chmod) changes
+    every install of that file; --verify reports them, and put() replaces the damaged
+    object instead of reusing it. Only where neither works are files copied, with a
+    warning that the store saves nothing there.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._clone_ok = sys.platform.startswith("linux") or sys.platform == "darwin"
+        self._link_ok = True
+        self._warned = False
+
+    def path(self, digest: str) -> Path:
+        return self.root / "sha256" / digest[:2] / digest[2:]
+
+    def has(self, digest: str) -> bool:
+        return self.path(digest).is_file()
+
+    def put(self, digest: str, data: bytes) -> Path:
+        dst = self.path(digest)
+        if self._holds(dst, data):
+            return dst
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.tmp-{os.getpid()}-{os.urandom(4).hex()}")
+        try:
+            tmp.write_bytes(data)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, dst)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return dst
+
+    @staticmethod
+    def _holds(path: Path, data: bytes) -> bool:
+        """Whether path is a file with exactly `data` (a damaged object is rewritten)."""
+
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size != len(data):
+                    return False
+                return f.read() == data
+        except OSError:
+            return False
+
+    def materialize(self, digest: str, dst: Path) -> None:
+        """Create `dst` with the content of `digest` (put() just before): reflink, hardlink or copy."""
+
+        src = self.path(digest)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if self._clone_ok and self._clone(src, dst):
+            return
+        if self._link_ok:
+            try:
+                os.link(src, dst)
+                return
+            except OSError as e:
+                # Another filesystem, or no hardlinks there: stop trying. (Other errors,
+                # e.g. too many links to one object, only copy this file.)
+                if e.errno in (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    self._link_ok = False
+        if not self._link_ok and not self._warned:
+            self._warned = True
+            print(
+                f"WARNING: object store {self.root} cannot share files with {dst.parent} "
+                "(no reflinks or hardlinks across them); copying. Use a store on the same filesystem.",
+                file=sys.stderr,
+            )
+        shutil.copyfile(src, dst)
+
+    def _clone(self, src: Path, dst: Path) -> bool:
+        if _clone(src, dst):
+            return True
+        # Not supported here (ext4, tmpfs, not APFS, cross-device): stop trying.
+        self._clone_ok = False
+        return False
+
+
+def _clone(src: Path, dst: Path) -> bool:
+    """Create `dst` as a copy-on-write clone of `src`; False (and no dst) where unsupported."""
+
+    if sys.platform == "darwin":
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    with open(src, "rb") as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, _FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    dst.unlink()
+    return False
+
+
+def reflink_or_copy(src: Path, dst: Path) -> None:
+    """Create `dst` with the content of `src` as a reflink where supported, else a copy.
+
+    Unlike a hardlink, dst is a file of its own: writing to one never changes the other.
+    """
+
+    if not _clone(src, dst):
+        shutil.copyfile(src, dst)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterator, Optional, TextIO, TypeVar
+
+# Span args that nested spans inherit from their parent, so work done deep inside a
+# skill's install (a git read, a scan) is attributed to that skill.
+_INHERITED = ("skill", "project")
+
+
+@dataclass
+class Span:
+    name: str
+    args: dict[str, object]
+    tid: int
+    start_ns: int
+    end_ns: int = 0
+    bytes: int = 0
+    subprocesses: int = 0
+    owner: Optional[str] = None  # the skill this span was opened for (not inherited)
+
+
+class Tracer:
+    """Collects timed spans, with byte and subprocess counters, from every thread.
+
+    Spans nest per thread; counters added with `add` go to the innermost open span.
+    Results are exported as a Chrome trace-event file (chrome://tracing, Perfetto) and
+    summarized per phase (span name) and per skill.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans: list[Span] = []
+        self._threads: dict[int, str] = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            with self._lock:
+                self._threads.setdefault(threading.get_ident(), threading.current_thread().name)
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: object) -> Iterator[Span]:
+        stack = self._stack()
+        owner = str(args["skill"]) if "skill" in args else None
+        if stack:
+            for key in _INHERITED:
+                if key not in args and key in stack[-1].args:
+                    args[key] = stack[-1].args[key]
+        span = Span(name=name, args=args, tid=threading.get_ident(), start_ns=time.perf_counter_ns(), owner=owner)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            stack.pop()
+            with self._lock:
+                self._spans.append(span)
+
+    def add(self, *, bytes: int = 0, subprocesses: int = 0) -> None:
+        stack = self._stack()
+        if stack:
+            stack[-1].bytes += bytes
+            stack[-1].subprocesses += subprocesses
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return sorted(self._spans, key=lambda s: s.start_ns)
+
+    def chrome_trace(self) -> dict:
+        with self._lock:
+            threads = dict(self._threads)
+        tids = {ident: n for n, ident in enumerate(threads, start=1)}
+        pid = os.getpid()
+        events: list[dict] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[ident], "args": {"name": name}}
+            for ident, name in threads.items()
+        ]
+        for span in self.spans():
+            args = {k: str(v) for k, v in span.args.items()}
+            if span.bytes:
+                args["bytes"] = str(span.bytes)
+            if span.subprocesses:
+                args["subprocesses"] = str(span.subprocesses)
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": str(span.args.get("skill", "")) or "run",
+                    "ph": "X",
+                    "ts": (span.start_ns - self._origin_ns) / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": tids.get(span.tid, 0),
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> list[str]:
+        """Summary table lines: per phase, then per skill (wall time is summed over
+        concurrent spans, so it can exceed the run's elapsed time)."""
+
+        spans = self.spans()
+        phases: dict[str, list[float]] = {}
+        for span in spans:
+            row = phases.setdefault(span.name, [0, 0.0, 0, 0])
+            row[0] += 1
+            row[1] += (span.end_ns - span.start_ns) / 1e9
+            row[2] += span.bytes
+            row[3] += span.subprocesses
+        skills: dict[str, list[float]] = {}
+        for span in spans:
+            skill = span.args.get("skill")
+            if skill is None:
+                continue
+            row = skills.setdefault(str(skill), [0.0, 0, 0])
+            if span.owner is not None:
+                row[0] += (span.end_ns - span.start_ns) / 1e9
+            row[1] += span.bytes
+            row[2] += span.subprocesses
+
+        width = max([len("phase"), len("skill"), *map(len, phases), *map(len, skills)])
+        lines = [f"{'phase':<{width}}  {'calls':>7}  {'wall s':>9}  {'MiB':>9}  {'procs':>6}"]
+        for name, (calls, wall, nbytes, procs) in sorted(phases.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"{name:<{width}}  {calls:>7}  {wall:>9.3f}  {nbytes / 2**20:>9.2f}  {procs:>6}")
+        if skills:
+            lines.append("")
+            lines.append(f"{'skill':<{width}}  {'':>7}  {'wall s':>9}  {'MiB':>9}  {'procs':>6}")
+            for name, (wall, nbytes, procs) in sorted(skills.items(), key=lambda kv: -kv[1][0]):
+                lines.append(f"{name:<{width}}  {'':>7}  {wall:>9.3f}  {nbytes / 2**20:>9.2f}  {procs:>6}")
+        return lines
+
+
+# The hook API. Instrumented code calls span()/traced()/add() unconditionally; they are
+# no-ops (a shared null context, one global read) unless a tracer is enabled.
+_tracer: Optional[Tracer] = None
+_NULL_SPAN: ContextManager[Optional[Span]] = contextlib.nullcontext()
+
+
+def enable() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def span(name: str, **args: object) -> ContextManager[Optional[Span]]:
+    """Time a phase; `skill=`/`project=` args attribute it (and spans nested in it)."""
+
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def traced(name: str) -> Callable[[_F], _F]:
+    """Decorator form of span(name) for a function that is one phase."""
+
+    def wrap(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def run(*args: Any, **kwargs: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return run  # type: ignore[return-value]
+
+    return wrap
+
+
+def add(*, bytes: int = 0, subprocesses: int = 0) -> None:
+    """Count bytes processed / subprocesses spawned against the current span."""
+
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add(bytes=bytes, subprocesses=subprocesses)
+
+
+@contextlib.contextmanager
+def profiling(trace_path: Optional[Path], *, name: str, out: TextIO = sys.stderr) -> Iterator[None]:
+    """For a CLI's --profile: trace the block as one `name` span, then write the
+    Chrome trace to trace_path and print the summary table to `out`. A no-op when
+    trace_path is None."""
+
+    if trace_path is None:
+        yield
+        return
+    tracer = enable()
+    try:
+        with tracer.span(name):
+            yield
+    finally:
+        disable()
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        trace_path.write_text(json.dumps(tracer.chrome_trace()) + "\n", encoding="utf-8")
+        for line in tracer.summary():
+            print(line, file=out)
+        print(f"trace written to {trace_path}", file=out)
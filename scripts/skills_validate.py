@@ -4,13 +4,18 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from urllib.parse import urlparse
 
+import skills_trace
+from skills_common import merkle_root
+
 
 class ValidationError(Exception):
     pass
@@ -81,8 +86,8 @@ def _parse_lock(obj: dict, *, label: str) -> LockManifest:
         raise ValidationError(f"{label}: expected object")
 
     version = obj.get("version")
-    if version != 1:
-        raise ValidationError(f"{label}: unsupported version: {version!r} (expected 1)")
+    if version not in (1, 2):
+        raise ValidationError(f"{label}: unsupported version: {version!r} (expected 1 or 2)")
 
     skills = obj.get("skills")
     if not isinstance(skills, list) or not all(isinstance(x, dict) for x in skills):
@@ -95,25 +100,17 @@ _SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
 _GIT_COMMIT_RE = re.compile(r"^[0-9a-f]{40}$")
 
 
-def _source_ids(manifest: SourcesManifest) -> set[str]:
-    ids: set[str] = set()
-    for idx, src in enumerate(manifest.sources):
-        src_id = src.get("id")
-        if not isinstance(src_id, str) or not src_id.strip():
-            raise ValidationError(f"sources[{idx}].id must be a non-empty string")
-        if src_id in ids:
-            raise ValidationError(f"duplicate source id: {src_id!r}")
-        ids.add(src_id)
-    return ids
-
+def _index_sources(manifest: SourcesManifest) -> dict[str, str]:
+    """Map each source id to its url domain, checking ids and urls in a single pass."""
 
-def _source_domain_by_id(manifest: SourcesManifest) -> dict[str, str]:
     by_id: dict[str, str] = {}
     for idx, src in enumerate(manifest.sources):
         src_id = src.get("id")
         url = src.get("url")
         if not isinstance(src_id, str) or not src_id.strip():
             raise ValidationError(f"sources[{idx}].id must be a non-empty string")
+        if src_id in by_id:
+            raise ValidationError(f"duplicate source id: {src_id!r}")
         if not isinstance(url, str) or not url.strip():
             raise ValidationError(f"sources[{idx}].url must be a non-empty string")
         by_id[src_id] = _domain_from_url(url)
@@ -180,20 +177,64 @@ def _validate_lock(
                 f"{label}.skills[{idx}].sha256 must be 64 lowercase hex chars (got {sha256!r})"
             )
 
+        if lock.version == 2:
+            _validate_lock_files(item, label=f"{label}.skills[{idx}]")
 
-def validate(
+
+def _validate_lock_files(item: dict, *, label: str) -> None:
+    """Lock v2: a per-file digest index with safe relative paths, bound by its merkleRoot."""
+
+    files = item.get("files")
+    if not isinstance(files, dict) or not files:
+        raise ValidationError(f"{label}.files must be a non-empty object mapping paths to sha256")
+    for rel, digest in files.items():
+        if rel.startswith("/") or any(part in {"", ".", ".."} for part in rel.split("/")):
+            raise ValidationError(f"{label}.files has an unsafe path: {rel!r}")
+        if not isinstance(digest, str) or not _SHA256_RE.fullmatch(digest.lower()):
+            raise ValidationError(f"{label}.files[{rel!r}] must be 64 lowercase hex chars (got {digest!r})")
+
+    root = item.get("merkleRoot")
+    if not isinstance(root, str) or not _SHA256_RE.fullmatch(root.lower()):
+        raise ValidationError(f"{label}.merkleRoot is required and must be 64 lowercase hex chars (got {root!r})")
+    if merkle_root({rel: digest.lower() for rel, digest in files.items()}) != root.lower():
+        raise ValidationError(f"{label}.merkleRoot does not match its files")
+
+
+@dataclass(frozen=True)
+class GlobalPolicy:
+    """The global manifest (and optional global lock), parsed and indexed once."""
+
+    manifest: SourcesManifest
+    domain_by_id: dict[str, str]
+    lock: Optional[LockManifest]
+
+
+@dataclass(frozen=True)
+class ProjectResult:
+    project: str
+    lock: Optional[str]
+    ok: bool
+    error: Optional[str]
+
+
+@skills_trace.traced("load_policy")
+def load_global_policy(*, global_path: Path, global_lock_path: Optional[Path]) -> GlobalPolicy:
+    manifest = _parse_manifest(_load_json(global_path), label="global")
+    lock = None
+    if global_lock_path is not None:
+        lock = _parse_lock(_load_json(global_lock_path), label="global-lock")
+    return GlobalPolicy(manifest=manifest, domain_by_id=_index_sources(manifest), lock=lock)
+
+
+def validate_project(
     *,
-    global_path: Path,
+    policy: GlobalPolicy,
     project_path: Path,
-    global_lock_path: Optional[Path],
     project_lock_path: Optional[Path],
     require_lock: bool,
 ) -> None:
-    global_obj = _load_json(global_path)
-    project_obj = _load_json(project_path)
-
-    global_m = _parse_manifest(global_obj, label="global")
-    project_m = _parse_manifest(project_obj, label="project")
+    global_m = policy.manifest
+    project_m = _parse_manifest(_load_json(project_path), label="project")
 
     # Option A: project cannot expand trust
     missing = project_m.allowlist_domains - global_m.allowlist_domains
@@ -214,24 +255,23 @@ def validate(
                 f"project.sources[{idx}].url domain '{domain}' is not in global.allowlistDomains"
             )
 
-    if require_lock and (global_lock_path is None and project_lock_path is None):
+    if require_lock and (policy.lock is None and project_lock_path is None):
         raise ValidationError(
             "Lock validation required, but no lock file was provided. "
             "Pass --project-lock (and optionally --global-lock)."
         )
 
-    allowed_source_domains = set(global_m.allowlist_domains)
-    combined_source_ids = _source_ids(global_m) | _source_ids(project_m)
-    domain_by_id = _source_domain_by_id(global_m)
-    domain_by_id.update(_source_domain_by_id(project_m))
+    # Project sources may shadow global ones; the global lock is checked against the merged view.
+    domain_by_id = dict(policy.domain_by_id)
+    domain_by_id.update(_index_sources(project_m))
+    allowed_source_ids = set(domain_by_id)
+    allowed_source_domains = global_m.allowlist_domains
 
-    if global_lock_path is not None:
-        global_lock_obj = _load_json(global_lock_path)
-        global_lock = _parse_lock(global_lock_obj, label="global-lock")
+    if policy.lock is not None:
         _validate_lock(
-            lock=global_lock,
+            lock=policy.lock,
             label="global-lock",
-            allowed_source_ids=combined_source_ids,
+            allowed_source_ids=allowed_source_ids,
             allowed_source_domains=allowed_source_domains,
             source_domain_by_id=domain_by_id,
         )
@@ -242,39 +282,220 @@ def validate(
         _validate_lock(
             lock=project_lock,
             label="project-lock",
-            allowed_source_ids=combined_source_ids,
+            allowed_source_ids=allowed_source_ids,
             allowed_source_domains=allowed_source_domains,
             source_domain_by_id=domain_by_id,
         )
 
 
+def validate(
+    *,
+    global_path: Path,
+    project_path: Path,
+    global_lock_path: Optional[Path],
+    project_lock_path: Optional[Path],
+    require_lock: bool,
+) -> None:
+    validate_project(
+        policy=load_global_policy(global_path=global_path, global_lock_path=global_lock_path),
+        project_path=project_path,
+        project_lock_path=project_lock_path,
+        require_lock=require_lock,
+    )
+
+
+_PROJECT_SOURCES = Path(".opencode") / "skill-sources.json"
+_PROJECT_LOCK_NAME = "skills.lock.json"
+_DISCOVER_SKIP_DIRS = {".git", "node_modules"}
+
+
+def _sibling_lock(project_path: Path) -> Optional[Path]:
+    lock = project_path.parent / _PROJECT_LOCK_NAME
+    return lock if lock.is_file() else None
+
+
+def discover_projects(roots: Iterable[Path]) -> list[tuple[Path, Optional[Path]]]:
+    """Find `.opencode/skill-sources.json` under each root, paired with the sibling lock if any."""
+
+    found: dict[Path, Optional[Path]] = {}
+    for root in roots:
+        if not root.is_dir():
+            raise ValidationError(f"Not a directory: {root}")
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in _DISCOVER_SKIP_DIRS)
+            candidate = Path(dirpath) / _PROJECT_SOURCES
+            if candidate.is_file():
+                found.setdefault(candidate, _sibling_lock(candidate))
+    return list(found.items())
+
+
+def _validate_one(
+    policy: GlobalPolicy, project_path: Path, project_lock_path: Optional[Path], require_lock: bool
+) -> ProjectResult:
+    try:
+        with skills_trace.span("validate", project=str(project_path)):
+            validate_project(
+                policy=policy,
+                project_path=project_path,
+                project_lock_path=project_lock_path,
+                require_lock=require_lock,
+            )
+    except ValidationError as e:
+        error: Optional[str] = str(e)
+    except (OSError, UnicodeDecodeError) as e:
+        # An unreadable manifest or lock fails this project, not the whole batch.
+        error = f"Cannot read {getattr(e, 'filename', None) or project_path}: {e}"
+    else:
+        error = None
+    return ProjectResult(
+        project=str(project_path),
+        lock=str(project_lock_path) if project_lock_path is not None else None,
+        ok=error is None,
+        error=error,
+    )
+
+
+def validate_many(
+    *,
+    policy: GlobalPolicy,
+    projects: Iterable[tuple[Path, Optional[Path]]],
+    require_lock: bool,
+    jobs: int = 1,
+) -> Iterator[ProjectResult]:
+    """Validate many (manifest, lock) pairs against one parsed policy; results in input order."""
+
+    pairs = list(projects)
+    if jobs <= 1:
+        for project_path, lock_path in pairs:
+            yield _validate_one(policy, project_path, lock_path, require_lock)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(
+            lambda pair: _validate_one(policy, pair[0], pair[1], require_lock),
+            pairs,
+        )
+
+
+def _read_project_list(path: str) -> list[Path]:
+    try:
+        text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    except OSError as e:
+        raise ValidationError(f"Cannot read project list {path}: {e}") from e
+    return [Path(line.strip()) for line in text.splitlines() if line.strip()]
+
+
 def main(argv: list[str]) -> int:
     p = argparse.ArgumentParser(description="Validate project external-skill sources against global policy.")
     p.add_argument("--global", dest="global_path", required=True, help="Path to global.sources.json")
-    p.add_argument("--project", dest="project_path", required=True, help="Path to project skill-sources.json")
+    p.add_argument(
+        "--project",
+        dest="project_paths",
+        action="append",
+        default=[],
+        help="Path to project skill-sources.json (repeatable)",
+    )
     p.add_argument("--global-lock", dest="global_lock_path", help="Path to global skills lock json")
-    p.add_argument("--project-lock", dest="project_lock_path", help="Path to project skills lock json")
+    p.add_argument(
+        "--project-lock",
+        dest="project_lock_path",
+        help="Path to project skills lock json (single --project only)",
+    )
     p.add_argument(
         "--require-lock",
         action="store_true",
         help="Fail validation if no lock file is provided (recommended for secure setups).",
     )
+    p.add_argument(
+        "--discover",
+        action="append",
+        default=[],
+        help="Validate every .opencode/skill-sources.json under this directory (repeatable)",
+    )
+    p.add_argument(
+        "--projects-from",
+        help="File with one project skill-sources.json path per line ('-' for stdin)",
+    )
+    p.add_argument(
+        "--format",
+        choices=["text", "json", "ndjson"],
+        default="text",
+        help="Output format (json/ndjson report one result per project)",
+    )
+    p.add_argument("--jobs", type=int, default=1, help="Number of projects to validate in parallel (default: 1)")
+    p.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON (per-phase, per-skill timing) to FILE and print a summary to stderr",
+    )
     args = p.parse_args(argv)
 
+    with skills_trace.profiling(Path(args.profile) if args.profile else None, name="skills_validate"):
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> int:
     try:
-        validate(
+        # One --project keeps the classic interface; batch entries use the skills.lock.json
+        # next to each manifest.
+        single = len(args.project_paths) == 1 and not args.discover and not args.projects_from
+        if args.project_lock_path and not single:
+            raise ValidationError("--project-lock needs exactly one --project (batch mode uses sibling locks)")
+        projects: list[tuple[Path, Optional[Path]]] = []
+        if single:
+            lock = Path(args.project_lock_path) if args.project_lock_path else None
+            projects.append((Path(args.project_paths[0]), lock))
+        else:
+            listed = [Path(x) for x in args.project_paths]
+            if args.projects_from:
+                listed.extend(_read_project_list(args.projects_from))
+            projects.extend((x, _sibling_lock(x)) for x in listed)
+            projects.extend(discover_projects(Path(d) for d in args.discover))
+        if not projects:
+            raise ValidationError("No project manifests to validate (use --project, --projects-from or --discover)")
+
+        policy = load_global_policy(
             global_path=Path(args.global_path),
-            project_path=Path(args.project_path),
             global_lock_path=Path(args.global_lock_path) if args.global_lock_path else None,
-            project_lock_path=Path(args.project_lock_path) if args.project_lock_path else None,
-            require_lock=bool(args.require_lock),
         )
     except ValidationError as e:
         print(f"ERROR: {e}", file=sys.stderr)
         return 2
 
-    print("OK")
-    return 0
+    results = validate_many(
+        policy=policy,
+        projects=projects,
+        require_lock=bool(args.require_lock),
+        jobs=max(1, args.jobs),
+    )
+
+    if args.format == "text" and single:
+        result = next(results)
+        if not result.ok:
+            print(f"ERROR: {result.error}", file=sys.stderr)
+            return 2
+        print("OK")
+        return 0
+
+    collected: list[ProjectResult] = []
+    for result in results:
+        collected.append(result)
+        if args.format == "ndjson":
+            print(json.dumps(result.__dict__, sort_keys=True), flush=True)
+        elif args.format == "text":
+            print(f"OK    {result.project}" if result.ok else f"FAIL  {result.project}: {result.error}")
+
+    failed = sum(1 for r in collected if not r.ok)
+    if args.format == "json":
+        report = {
+            "ok": failed == 0,
+            "total": len(collected),
+            "failed": failed,
+            "results": [r.__dict__ for r in collected],
+        }
+        print(json.dumps(report, indent=2, sort_keys=True))
+    elif args.format == "text":
+        print(f"{len(collected) - failed}/{len(collected)} projects OK")
+    return 2 if failed else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import skills_install  # noqa: E402
+from skills_bench import Corpus, CorpusShape, _git, _git_redirect, build_corpus  # noqa: E402
+from skills_common import merkle_root, sha256_tree_files  # noqa: E402
+
+SMALL = CorpusShape(repos=1, skills=4, files_per_skill=3, max_depth=2, huge_files=0, adversarial_kb=1)
+
+
+def small_corpus(root: Path) -> Corpus:
+    """A few skills in one local repo (see skills_bench.build_corpus)."""
+
+    return build_corpus(root / "corpus", SMALL)
+
+
+def add_skill(corpus: Corpus, name: str, files: dict[str, bytes]) -> dict:
+    """Commit one more skill to the corpus repo; returns its (v2) lock entry."""
+
+    work = corpus.root / "src" / "skills-0"
+    skill_dir = work / "skills" / name
+    for rel, data in files.items():
+        (skill_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+        (skill_dir / rel).write_bytes(data)
+    _git(["add", "-A"], cwd=work)
+    _git(["commit", "-q", "-m", f"add {name}"], cwd=work)
+    commit = _git(["rev-parse", "HEAD"], cwd=work).strip()
+    _git(["push", "-q", str(corpus.repos_dir / "skills-0.git"), f"HEAD:refs/heads/{name}"], cwd=work)
+    tree, digests = sha256_tree_files(skill_dir)
+    return {
+        "name": name,
+        "sourceId": "bench",
+        "ref": f"bench/skills-0@{commit}",
+        "sha256": tree,
+        "merkleRoot": merkle_root(digests),
+        "files": dict(sorted(digests.items())),
+    }
+
+
+def write_sources(path: Path, allowlist_domains: list[str]) -> Path:
+    obj = {
+        "version": 1,
+        "policy": {"mode": "allowlist", "allowlistDomains": allowlist_domains},
+        "sources": [{"id": "bench", "type": "git", "url": "https://github.com/bench/"}],
+    }
+    path.write_text(json.dumps(obj), encoding="utf-8")
+    return path
+
+
+def write_lock(corpus: Corpus, path: Path, edit=None, *, skills: Optional[list[dict]] = None) -> Path:
+    """The corpus lock, or a lock of just `skills`, after edit(skills) if given."""
+
+    obj = json.loads(corpus.lock_path.read_text(encoding="utf-8"))
+    if skills is not None:
+        obj["skills"] = skills
+    if edit is not None:
+        edit(obj["skills"])
+    path.write_text(json.dumps(obj), encoding="utf-8")
+    return path
+
+
+@contextlib.contextmanager
+def serving(corpus: Corpus) -> Iterator[None]:
+    """Let the installer fetch the corpus repos over file://."""
+
+    with _git_redirect(corpus.repos_dir):
+        yield
+
+
+def install(
+    corpus: Corpus, *, dest: Path, lock: Path, sources: Optional[Path] = None, args: tuple = ()
+) -> tuple[int, str]:
+    """Run the installer in-process (sources as both global and project sources); (exit code, output)."""
+
+    sources = sources or corpus.sources_path
+    argv = [
+        "--global-sources", str(sources),
+        "--project-sources", str(sources),
+        "--project-lock", str(lock),
+        "--dest", str(dest),
+        "--repo-cache", str(corpus.root / "repo-cache"),
+        *args,
+    ]  # fmt: skip
+    out = io.StringIO()
+    with serving(corpus), contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        rc = skills_install.main(argv)
+    return rc, out.getvalue()
+
+
+def installed(dest: Path) -> list[str]:
+    return sorted(p.name for p in dest.iterdir() if p.is_dir() and not p.name.startswith(".")) if dest.exists() else []
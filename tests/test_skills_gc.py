@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import functools
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import install, small_corpus, write_lock
+
+from skills_common import SHARED_OBJECTS_DIR
+from skills_gc import CachedRepo, GcPolicy, run_gc, select_repos
+
+
+class PruneEstimateTest(unittest.TestCase):
+    def test_dry_run_does_not_count_hardlinked_objects(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = small_corpus(Path(tmp))
+            rc, out = install(corpus, dest=Path(tmp) / "dest", lock=write_lock(corpus, Path(tmp) / "lock.json"))
+            self.assertEqual(rc, 0, out)
+            cache = corpus.root / "repo-cache"
+            # Pinned repo, no pinned commits: pruning would drop every object.
+            gc = dict(cache_root=cache, pins={"bench__skills-0": set()}, backup_dirs=[], dry_run=True, log=str)
+            policy = GcPolicy(prune_objects=True)
+            self.assertGreater(run_gc(policy=policy, **gc), 0)
+
+            elsewhere = Path(tmp) / "linked"
+            elsewhere.mkdir()
+            for n, path in enumerate(p for p in (cache / SHARED_OBJECTS_DIR).rglob("*") if p.is_file()):
+                os.link(path, elsewhere / str(n))
+            self.assertEqual(run_gc(policy=policy, **gc), 0)
+
+
+class CacheBudgetTest(unittest.TestCase):
+    def test_evicts_only_while_the_budget_is_reachable(self) -> None:
+        repos = [
+            CachedRepo(key="a", path=Path("a"), last_used=1.0, size=100),
+            CachedRepo(key="b", path=Path("b"), last_used=2.0, size=100),
+            CachedRepo(key="pinned", path=Path("pinned"), last_used=0.0, size=100),
+        ]
+        # 300 in repos plus 1000 in shared objects, which eviction does not free.
+        select = functools.partial(select_repos, repos, referenced={"pinned"}, cache_bytes=1300, now=3.0)
+        self.assertEqual([r.key for r in select(policy=GcPolicy(cache_budget=1200))], ["a"])
+        self.assertEqual([r.key for r in select(policy=GcPolicy(cache_budget=1100))], ["a", "b"])
+        self.assertEqual(select(policy=GcPolicy(cache_budget=1000)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+from unittest import mock
+
+from helpers import add_skill, install, installed, small_corpus, write_lock, write_sources
+
+from skills_store import ObjectStore
+
+
+class InstallOrderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.corpus = small_corpus(self.tmp)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _installed_with_bad_entry(self, index: int, jobs: int) -> list[str]:
+        def corrupt(skills: list[dict]) -> None:
+            skills[index]["sha256"] = "0" * 64
+
+        lock = write_lock(self.corpus, self.tmp / f"bad-{index}.json", corrupt)
+        dest = self.tmp / f"dest-{index}-{jobs}"
+        rc, out = install(self.corpus, dest=dest, lock=lock, args=("--jobs", str(jobs)))
+        self.assertEqual(rc, 2, out)
+        self.assertIn("sha256 mismatch", out)
+        return installed(dest)
+
+    def test_failure_stops_later_skills_regardless_of_jobs(self) -> None:
+        for index, expected in ((0, []), (2, ["bench-000", "bench-001"])):
+            with self.subTest(bad_entry=index):
+                self.assertEqual(self._installed_with_bad_entry(index, jobs=1), expected)
+                self.assertEqual(self._installed_with_bad_entry(index, jobs=4), expected)
+
+
+class ScanPolicyTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.corpus = small_corpus(self.tmp)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_tightened_allowlist_rescans_installed_skill(self) -> None:
+        entry = add_skill(
+            self.corpus,
+            "linked",
+            {"SKILL.md": b"# Linked\n", "fetch.py": b"URL = 'https://docs.example.com/guide'\n"},
+        )
+        lock = write_lock(self.corpus, self.tmp / "lock.json", skills=[entry])
+        dest = self.tmp / "dest"
+        loose = write_sources(self.tmp / "loose.json", ["github.com", "docs.example.com"])
+        strict = write_sources(self.tmp / "strict.json", ["github.com"])
+
+        rc, out = install(self.corpus, dest=dest, lock=lock, sources=loose)
+        self.assertEqual(rc, 0, out)
+        rc, out = install(self.corpus, dest=dest, lock=lock, sources=loose)
+        self.assertEqual(rc, 0, out)
+        self.assertIn("SKIP  linked", out)
+
+        rc, out = install(self.corpus, dest=dest, lock=lock, sources=strict)
+        self.assertEqual(rc, 2, out)
+        self.assertIn("url-domain-not-allowlisted", out)
+
+
+class UpgradeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.corpus = small_corpus(self.tmp)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_kept_files_are_not_linked_to_the_backup(self) -> None:
+        dest = self.tmp / "dest"
+        v1 = add_skill(self.corpus, "grow", {"SKILL.md": b"# Grow\n", "notes.md": b"v1\n"})
+        rc, out = install(self.corpus, dest=dest, lock=write_lock(self.corpus, self.tmp / "v1.json", skills=[v1]))
+        self.assertEqual(rc, 0, out)
+        v2 = add_skill(self.corpus, "grow", {"notes.md": b"v2\n"})
+        rc, out = install(self.corpus, dest=dest, lock=write_lock(self.corpus, self.tmp / "v2.json", skills=[v2]))
+        self.assertEqual(rc, 0, out)
+        self.assertIn("UPDATE grow (1 changed", out)
+
+        kept = dest / "grow" / "SKILL.md"
+        backup = next(dest.glob("grow.bak.*")) / "SKILL.md"
+        self.assertNotEqual(kept.stat().st_ino, backup.stat().st_ino)
+        kept.write_bytes(b"# Edited\n")
+        self.assertEqual(backup.read_bytes(), b"# Grow\n")
+
+
+class ObjectStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.corpus = small_corpus(self.tmp)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_edits_and_damaged_objects_do_not_reach_later_installs(self) -> None:
+        lock = write_lock(self.corpus, self.tmp / "lock.json")
+        store = ("--object-store", str(self.tmp / "store"))
+        rc, out = install(self.corpus, dest=self.tmp / "p1", lock=lock, args=store)
+        self.assertEqual(rc, 0, out)
+
+        # Same-size edit of an installed file (maybe a hardlink to its object), and of
+        # another store object.
+        skill_md = self.tmp / "p1" / "bench-000" / "SKILL.md"
+        original = skill_md.read_bytes()
+        skill_md.chmod(0o644)
+        skill_md.write_bytes(original.upper())
+        obj = next(p for p in (self.tmp / "store").rglob("*") if p.is_file() and p.read_bytes() != original)
+        obj.chmod(0o644)
+        obj.write_bytes(bytes(len(obj.read_bytes())))
+
+        rc, out = install(self.corpus, dest=self.tmp / "p2", lock=lock, args=store)
+        self.assertEqual(rc, 0, out)
+        rc, out = install(self.corpus, dest=self.tmp / "p2", lock=lock, args=("--verify",))
+        self.assertEqual(rc, 0, out)
+        self.assertEqual((self.tmp / "p2" / "bench-000" / "SKILL.md").read_bytes(), original)
+
+    def test_installs_share_objects_or_warn(self) -> None:
+        store = ObjectStore(self.tmp / "store")
+        store._clone_ok = False
+        digest = hashlib.sha256(b"data").hexdigest()
+        store.put(digest, b"data")
+        store.materialize(digest, self.tmp / "a" / "f")
+        linked = (self.tmp / "a" / "f").stat()
+        self.assertEqual(linked.st_ino, store.path(digest).stat().st_ino)
+        self.assertEqual(linked.st_mode & 0o777, 0o444)
+
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+        with mock.patch("os.link", side_effect=cross_device), redirect_stderr(io.StringIO()) as err:
+            store.materialize(digest, self.tmp / "b" / "f")
+            store.materialize(digest, self.tmp / "c" / "f")
+        self.assertEqual((self.tmp / "c" / "f").read_bytes(), b"data")
+        self.assertEqual(err.getvalue().count("WARNING: object store"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
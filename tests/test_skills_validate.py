@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import write_sources
+
+from skills_validate import load_global_policy, validate_many
+
+
+class ValidateManyTest(unittest.TestCase):
+    def test_unreadable_lock_fails_only_its_project(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            sources = write_sources(root / "global.json", ["github.com"])
+            good_lock = root / "good.lock.json"
+            good_lock.write_text('{"version": 1, "skills": []}', encoding="utf-8")
+            bad_lock = root / "bad.lock.json"
+            bad_lock.mkdir()  # read_text raises IsADirectoryError
+
+            policy = load_global_policy(global_path=sources, global_lock_path=None)
+            for jobs in (1, 2):
+                with self.subTest(jobs=jobs):
+                    results = list(
+                        validate_many(
+                            policy=policy,
+                            projects=[(sources, bad_lock), (sources, good_lock)],
+                            require_lock=True,
+                            jobs=jobs,
+                        )
+                    )
+                    self.assertEqual([r.ok for r in results], [False, True])
+                    self.assertIn("Cannot read", results[0].error or "")
+
+
+if __name__ == "__main__":
+    unittest.main()